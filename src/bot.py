@@ -1,37 +1,45 @@
+import datetime
 import logging
 import re
+import signal
+import threading
 import traceback
 import locale
 
 # force UTF-8 encoding to handle emojis properly
 locale.setlocale(locale.LC_ALL, "C.UTF-8")
 
-from telegram.ext import Updater
+from telegram.ext import Filters, Updater
 
-from commands import Sign, Tarot, SignGPT, TarotGPT, GroupSummary, TypoDetector, Salmo
+from commands import CommandRegistry
 from environment import Environment
+from modules import SendQueue
 
-# load env
-env = Environment()
 
-# load commands
-commands = [Sign(), Tarot(), SignGPT(), TarotGPT(), Salmo()]
+def make_registry(env=None):
+    registry = CommandRegistry()
 
-# load message handlers (non-command handlers)
-message_handlers = [GroupSummary(), TypoDetector()]
+    # commands, loaded on first use
+    registry.add_command("bidu_old", "commands.sign:Sign")
+    registry.add_command("tarot_old", "commands.tarot:Tarot")
+    registry.add_command("bidu", "commands.sign_gpt:SignGPT")
+    registry.add_command("tarot", "commands.tarot_gpt:TarotGPT")
+    registry.add_command("salmo", "commands.salmo:Salmo")
 
-# fetch updater and job queue
-logging.info("Starting bot...")
-updater = Updater(token=env.telegram_token, use_context=True)
-dispatcher = updater.dispatcher
+    # message handlers (non-command handlers)
+    registry.add_message_handler("commands.group_summary:GroupSummary", Filters.text & Filters.group, group=0)
+    registry.add_message_handler("commands.typo_detector:TypoDetector", Filters.text & Filters.group, group=1)
+    registry.add_message_handler(
+        "commands.typo_detector:TypoDetector", Filters.photo & Filters.group & Filters.caption, group=1
+    )
 
-# setup commands
-for command in commands:
-    command.setup(dispatcher)
+    # sees group messages before the other handlers, only when capturing
+    if env is not None and env.traffic_capture_path:
+        registry.add_message_handler(
+            "commands.traffic_recorder:TrafficRecorder", (Filters.text | Filters.caption) & Filters.group, group=-1
+        )
 
-# setup message handlers
-for handler in message_handlers:
-    handler.setup(dispatcher)
+    return registry
 
 
 def prepare_message(msg, hard_parse=False):
@@ -61,15 +69,98 @@ def error_handler(update, context):
     text += traceback.format_exc()
     text += "```"
 
-    # send error message
-    update.message.reply_text(
+    # send error message through context.bot so it goes through the send queue
+    if not update or not update.effective_chat:
+        return
+    context.bot.send_message(
+        chat_id=update.effective_chat.id,
         text=prepare_message(text, hard_parse=False),
         parse_mode="MarkdownV2",
+        reply_to_message_id=update.message.message_id if update.message else None,
     )
 
 
-dispatcher.add_error_handler(error_handler)
+# generate all horoscopes for the day in one batch right after midnight (BRT)
+def pregenerate_signs(context):
+    from commands import Sign
+    from modules import PredictionModule
+
+    logging.info("Pre-generating horoscopes for all signs...")
+    PredictionModule().pregenerate_sign_predictions(Sign.sign_map.keys())
+
+
+def build(env, bot=None):
+    # fetch updater and job queue, `bot` replaces the real one (see `tools/load_bench.py`)
+    if bot is not None:
+        updater = Updater(bot=bot, use_context=True)
+    else:
+        updater = Updater(token=env.telegram_token, use_context=True)
+    dispatcher = updater.dispatcher
+
+    # every reply goes through the send queue, which keeps us under telegram's flood limits
+    send_queue = SendQueue(env.send_global_rate, env.send_chat_rate, env.send_group_rate)
+    dispatcher.bot = send_queue.wrap(updater.bot)
+
+    registry = make_registry(env)
+    registry.setup(dispatcher)
+    if env.preload_commands:
+        registry.preload()
+
+    dispatcher.add_error_handler(error_handler)
+
+    if env.pregenerate_signs:
+        brt = datetime.timezone(datetime.timedelta(hours=-3))
+        updater.job_queue.run_daily(pregenerate_signs, time=datetime.time(0, 5, tzinfo=brt))
+
+    return updater
+
+
+def run_webhook(updater, env):
+    from modules import WebhookServer
+
+    server = WebhookServer(
+        updater.dispatcher,
+        env.webhook_secret,
+        listen=env.webhook_listen,
+        port=env.webhook_port,
+        workers=env.webhook_workers,
+        queue_size=env.webhook_queue_size,
+    )
+    server.start()
+    updater.job_queue.start()
+    updater.bot.set_webhook(url=f"{env.webhook_url.rstrip('/')}/{env.webhook_secret}")
+    logging.info("Bot started and listening for webhook updates.")
+
+    # block until asked to stop, then drain the queued updates
+    stopped = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stopped.set())
+    stopped.wait()
+
+    logging.info("Stopping webhook server...")
+    server.stop()
+    updater.job_queue.stop()
+
+
+def main():
+    # load env
+    env = Environment()
+
+    logging.info("Starting bot...")
+    updater = build(env)
+
+    if env.metrics_port:
+        from modules import MetricsServer
+
+        MetricsServer(env.metrics_listen, env.metrics_port).start()
+
+    # start bot
+    if env.webhook_url:
+        run_webhook(updater, env)
+    else:
+        updater.start_polling()
+        logging.info("Bot started and listening for commands.")
+
 
-# start bot
-updater.start_polling()
-logging.info("Bot started and listening for commands.")
+if __name__ == "__main__":
+    main()
@@ -1 +1,11 @@
-from .openai_client import *
+from utils import lazy_exports
+
+# exported name -> submodule, imported on first access
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        "Backend": "model_router",
+        "ModelRouter": "model_router",
+        "OpenAIClient": "openai_client",
+    },
+)
@@ -0,0 +1,187 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from environment import Singleton
+
+load_dotenv()
+
+
+def percentile(values, pct):
+    """nearest-rank percentile of an unsorted list, None when empty"""
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Backend:
+    """A model served by an OpenAI-compatible endpoint, with rolling latency per task class."""
+
+    def __init__(self, model, base_url, api_key_env="OPENAI_API_KEY", window_seconds=300, window_size=50):
+        self.model = model
+        self.base_url = base_url
+        self.api_key_env = api_key_env
+        self._window_seconds = window_seconds
+        self._window_size = window_size
+        self._samples = {}  # task -> deque of (timestamp, seconds)
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return f"{self.model}@{self.base_url}"
+
+    @property
+    def api_key(self):
+        return os.getenv(self.api_key_env)
+
+    def record(self, task, seconds):
+        with self._lock:
+            if task not in self._samples:
+                self._samples[task] = deque(maxlen=self._window_size)
+            self._samples[task].append((time.monotonic(), seconds))
+
+    def _recent(self, task):
+        # old samples fall out of the window so a backend that was slow gets retried later
+        cutoff = time.monotonic() - self._window_seconds
+        with self._lock:
+            samples = self._samples.get(task, ())
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+            return [seconds for _, seconds in samples]
+
+    def latency(self, task, pct):
+        return percentile(self._recent(task), pct)
+
+    def sample_count(self, task):
+        return len(self._recent(task))
+
+    def tasks(self):
+        with self._lock:
+            return list(self._samples)
+
+    def __repr__(self):
+        return f"Backend({self.name})"
+
+
+class ModelRouter(metaclass=Singleton):
+    """Maps task classes to an ordered chain of backends.
+
+    Routes come from `OPENAI_ROUTE_<TASK>` as a comma-separated list of
+    `model[@base_url][#API_KEY_ENV]` entries, tried in order. A backend whose
+    rolling p95 exceeds the task latency budget is moved behind the healthy
+    ones until its slow samples age out of the window.
+    """
+
+    TASK_CLASSIFICATION = "classification"
+    TASK_SHORT = "short"
+    TASK_SUMMARY = "summary"
+    TASK_CREATIVE = "creative"
+    TASK_BATCH = "batch"
+
+    # p95 latency budget in seconds for each task class
+    LATENCY_BUDGETS = {
+        TASK_CLASSIFICATION: 1.0,
+        TASK_SHORT: 3.0,
+        TASK_SUMMARY: 20.0,
+        TASK_CREATIVE: 60.0,
+        TASK_BATCH: 300.0,
+    }
+    MIN_SAMPLES = 5
+    # a single request may take a few times the budget before we give up on it
+    TIMEOUT_FACTOR = 5
+
+    MODEL_DEFAULT = os.getenv("OPENAI_MODEL_DEFAULT", "deepseek-reasoner")
+    MODEL_FAST = os.getenv("OPENAI_MODEL_FAST", "deepseek-chat")
+    BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.deepseek.com")
+
+    def __init__(self):
+        # shared by every OpenAIClient so latency stats are process-wide
+        self._backends = {}
+        self._routes = {
+            ModelRouter.TASK_CLASSIFICATION: self._parse_route(
+                "OPENAI_ROUTE_CLASSIFICATION", [ModelRouter.MODEL_FAST, ModelRouter.MODEL_DEFAULT]
+            ),
+            ModelRouter.TASK_SHORT: self._parse_route(
+                "OPENAI_ROUTE_SHORT", [ModelRouter.MODEL_FAST, ModelRouter.MODEL_DEFAULT]
+            ),
+            ModelRouter.TASK_SUMMARY: self._parse_route(
+                "OPENAI_ROUTE_SUMMARY", [ModelRouter.MODEL_FAST, ModelRouter.MODEL_DEFAULT]
+            ),
+            ModelRouter.TASK_CREATIVE: self._parse_route("OPENAI_ROUTE_CREATIVE", [ModelRouter.MODEL_DEFAULT]),
+            # long multi-sign generations, kept apart so they don't skew the creative latency window
+            ModelRouter.TASK_BATCH: self._parse_route("OPENAI_ROUTE_BATCH", [ModelRouter.MODEL_DEFAULT]),
+        }
+
+        for task, backends in self._routes.items():
+            logging.info(f"Model route for {task}: {[backend.name for backend in backends]}")
+
+    def _get_backend(self, model, base_url=None, api_key_env="OPENAI_API_KEY"):
+        base_url = base_url or ModelRouter.BASE_URL
+        key = (model, base_url, api_key_env)
+        if key not in self._backends:
+            self._backends[key] = Backend(model, base_url, api_key_env)
+        return self._backends[key]
+
+    def _parse_route(self, env_key, default_models):
+        value = os.getenv(env_key)
+        if not value:
+            specs = default_models
+        else:
+            specs = [spec.strip() for spec in value.split(",") if spec.strip()]
+
+        backends = []
+        for spec in specs:
+            spec, _, api_key_env = spec.partition("#")
+            model, _, base_url = spec.partition("@")
+            backend = self._get_backend(model, base_url or None, api_key_env or "OPENAI_API_KEY")
+            if backend not in backends:
+                backends.append(backend)
+
+        return backends
+
+    def budget(self, task):
+        return ModelRouter.LATENCY_BUDGETS.get(task, ModelRouter.LATENCY_BUDGETS[ModelRouter.TASK_CREATIVE])
+
+    def timeout(self, task):
+        return self.budget(task) * ModelRouter.TIMEOUT_FACTOR
+
+    def is_slow(self, backend, task):
+        if backend.sample_count(task) < ModelRouter.MIN_SAMPLES:
+            return False
+        return backend.latency(task, 95) > self.budget(task)
+
+    def route(self, task=None):
+        """Returns the backends for a task class, healthy ones first."""
+        task = task or ModelRouter.TASK_CREATIVE
+        backends = self._routes.get(task, self._routes[ModelRouter.TASK_CREATIVE])
+
+        healthy = [backend for backend in backends if not self.is_slow(backend, task)]
+        slow = [backend for backend in backends if backend not in healthy]
+        slow.sort(key=lambda backend: backend.latency(task, 50))
+
+        return healthy + slow
+
+    def backend_for_model(self, model):
+        """Backend for an explicitly requested model on the default endpoint."""
+        return self._get_backend(model)
+
+    def stats(self):
+        stats = {}
+        for backend in self._backends.values():
+            stats[backend.name] = {
+                task: {
+                    "samples": backend.sample_count(task),
+                    "p50": backend.latency(task, 50),
+                    "p95": backend.latency(task, 95),
+                }
+                for task in backend.tasks()
+            }
+        return stats
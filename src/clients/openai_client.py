@@ -1,9 +1,14 @@
+import logging
 import os
 import time
 
 from click import UsageError
 from dotenv import load_dotenv
-from openai import OpenAI, OpenAIError, RateLimitError
+from openai import APIConnectionError, APIStatusError, OpenAI, OpenAIError, RateLimitError
+
+from clients.model_router import ModelRouter
+from modules.metrics import count, span
+from modules.token_usage import TokenUsage
 
 load_dotenv()
 
@@ -15,17 +20,80 @@ class OpenAIClient:
     REQUEST_MAX_RETRIES = 12
     MAX_TOKENS = 200
 
+    # one SDK client per endpoint, shared by every OpenAIClient
+    _clients = {}
+
     def __init__(self) -> None:
-        try:
-            self._client = OpenAI(api_key=OpenAIClient.OPENAI_API_KEY, base_url=OpenAIClient.BASE_URL)
-        except OpenAIError:
-            raise UsageError(
-                "Could not initialize OpenAI client. Make sure you have the `OPENAI_API_KEY` environment variable set."
-            )
+        self._router = ModelRouter()
+
+        # fail early if the default endpoint has no key configured
+        self._get_client(self._router.backend_for_model(OpenAIClient.MODEL_DEFAULT))
+
+    def _get_client(self, backend):
+        key = (backend.base_url, backend.api_key_env)
+        if key not in OpenAIClient._clients:
+            try:
+                OpenAIClient._clients[key] = OpenAI(api_key=backend.api_key, base_url=backend.base_url)
+            except OpenAIError:
+                raise UsageError(
+                    "Could not initialize OpenAI client. Make sure you have the "
+                    f"`{backend.api_key_env}` environment variable set."
+                )
+        return OpenAIClient._clients[key]
+
+    def _count_tokens(self, backend, task, response):
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        TokenUsage().record(backend.model, task, usage.prompt_tokens or 0, usage.completion_tokens or 0)
+
+    def _request(self, backend, task, messages, max_tokens, retry):
+        """Sends the request to a single backend. Rate limits are retried with
+        exponential backoff only when there is no other backend to fail over to.
+        Returns None to fail over after timeouts and server errors; other 4xx
+        errors are raised.
+        """
+        client = self._get_client(backend)
+        timeout = self._router.timeout(task)
 
-    def make_request(self, messages, model=None, max_tokens=None):
-        """Makes a translation request to OpenAI's API. You should use this
-        with a fine-tuned model.
+        retries = 0
+        sleep_time = 1
+        while retries < OpenAIClient.REQUEST_MAX_RETRIES:
+            start = time.monotonic()
+            try:
+                response = client.chat.completions.create(
+                    model=backend.model, messages=messages, stream=False, max_tokens=max_tokens, timeout=timeout
+                )
+                backend.record(task, time.monotonic() - start)
+                self._count_tokens(backend, task, response)
+                return response
+            except RateLimitError:
+                if not retry:
+                    logging.warning(f"Rate limit exceeded on {backend.name}, failing over.")
+                    return None
+
+                logging.warning(
+                    f"Rate limit exceeded. Waiting {sleep_time} seconds "
+                    f"({retries}/{OpenAIClient.REQUEST_MAX_RETRIES} retries)."
+                )
+                time.sleep(sleep_time)
+                sleep_time *= 2
+                retries += 1
+            except (APIConnectionError, APIStatusError) as e:
+                if isinstance(e, APIStatusError) and e.status_code < 500:
+                    # a bad request or key is our mistake, not a slow backend, and another won't fix it
+                    logging.error(f"Request to {backend.name} was rejected: {e}")
+                    raise
+
+                # timeouts and server errors count as slow so the router moves away from this backend
+                backend.record(task, max(time.monotonic() - start, timeout))
+                logging.warning(f"Request to {backend.name} failed: {e}")
+                return None
+
+        return None
+
+    def make_request(self, messages, model=None, max_tokens=None, task=None):
+        """Makes a chat completion request, routed by task class.
 
         Args:
             messages (list): List of messages with conversation context. Format:
@@ -39,35 +107,39 @@ class OpenAIClient:
                         "content": {"key": "{key}", "source": "{source_string}", "language": "{language}"}
                     }
                 ]
+            model (str): Forces a model on the default endpoint, bypassing routing.
+            max_tokens (int): Completion token limit.
+            task (str): Task class used to pick the backend chain (see `ModelRouter`).
+                Defaults to `ModelRouter.TASK_CREATIVE`.
 
         Returns:
-            str: The translated text.
+            str: The completion text.
         """
-        if model is None:
-            model = OpenAIClient.MODEL_DEFAULT
-
         if max_tokens is None:
             max_tokens = OpenAIClient.MAX_TOKENS
 
+        task = task or ModelRouter.TASK_CREATIVE
+        if model is not None:
+            backends = [self._router.backend_for_model(model)]
+        elif TokenUsage().over_budget():
+            # the chat spent its tokens for today, answer cheaply instead of refusing
+            backends = [self._router.backend_for_model(ModelRouter.MODEL_FAST)]
+            max_tokens = min(max_tokens, TokenUsage.DEGRADED_MAX_TOKENS)
+            count("llm_degraded", task=task)
+        else:
+            backends = self._router.route(task)
+
         response = None
-        retries = 0
-        sleep_time = 1
-        while response is None and retries < OpenAIClient.REQUEST_MAX_RETRIES:
-            try:
-                response = self._client.chat.completions.create(
-                    model=model, messages=messages, stream=False, max_tokens=max_tokens
-                )
-            except RateLimitError:
-                print(
-                    "Rate limit exceeded. Waiting {sleep_time} seconds "
-                    f"({retries}/{OpenAIClient.REQUEST_MAX_RETRIES} retries)."
-                )
-                time.sleep(sleep_time)
-                sleep_time *= 2
-                retries += 1
+        with span("llm", task=task):
+            for backend in backends:
+                # only the last backend in the chain waits out rate limits
+                response = self._request(backend, task, messages, max_tokens, retry=backend is backends[-1])
+                if response is not None:
+                    break
 
         if response is None:
-            print("Request failed. Returning empty string.")
+            count("llm_failures", task=task)
+            logging.error("Request failed. Returning empty string.")
             return ""
 
         return response.choices[0].message.content
@@ -1,9 +1,20 @@
-from .command import *
-from .sign import *
-from .tarot import *
-from .news import *
-from .sign_gpt import *
-from .tarot_gpt import *
-from .group_summary import *
-from .typo_detector import *
-from .salmo import *
+from utils import lazy_exports
+
+# exported name -> submodule, imported on first access
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        "Command": "command",
+        "Sign": "sign",
+        "Tarot": "tarot",
+        "News": "news",
+        "SignGPT": "sign_gpt",
+        "TarotGPT": "tarot_gpt",
+        "GroupSummary": "group_summary",
+        "TypoDetector": "typo_detector",
+        "Salmo": "salmo",
+        "TrafficRecorder": "traffic_recorder",
+        "CommandRegistry": "registry",
+        "LazyHandler": "registry",
+    },
+)
@@ -1,9 +1,9 @@
 import logging
 
 from telegram import ParseMode, ChatAction
-from telegram.ext import CommandHandler
 
-from modules import Singleton
+from modules import CommandThrottle, SendQueue, Singleton
+from modules.send_queue import QueuedBot
 from environment import Environment
 
 
@@ -13,6 +13,7 @@ class Command(metaclass=Singleton):
         self._command = None
         self._fetcher = None
         self._env = Environment()
+        self._throttle = CommandThrottle()
 
     def _send_typing_action(self, context, chat_id):
         """send typing indicator to show bot is processing"""
@@ -21,6 +22,14 @@ class Command(metaclass=Singleton):
         except Exception:
             pass  # ignore typing action failures
 
+    def _send(self, context, method, priority=None, block=True, **kwargs):
+        """call a bot method through the send queue with the given priority. with
+        `block=False` a queued call returns right away. plain bots ignore both"""
+        bot = context.bot
+        if isinstance(bot, QueuedBot):
+            return getattr(bot, method)(priority=priority, block=block, **kwargs)
+        return getattr(bot, method)(**kwargs)
+
     def _is_user_authorized(self, user_id, chat_type=None, chat_id=None):
         # private messages use ALLOWED_USER_IDS
         if chat_type in ["group", "supergroup"]:
@@ -40,8 +49,20 @@ class Command(metaclass=Singleton):
         # default deny for unknown chat types
         return False
 
+    def _request_key(self, update, context):
+        """identical requests within the coalescing window get a single reply.
+        override when the reply doesn't depend on who asked"""
+        args = " ".join(context.args or []).strip().lower()
+        return (update.message.chat.id, update.message.from_user.id, self._command, args)
+
+    def _cached_reply(self, update, context):
+        """override to return the final reply when it can be built without
+        generating anything, so it is sent in one call with no placeholder"""
+        return None
+
     def _process(self, update, context):
-        # override in subclass, call super()
+        # override in subclass, call super(). returns None when the command
+        # was throttled or already answered, in which case the subclass must not reply
         userid = update.message.from_user.id
         display_name = update.message.from_user.username
         text = update.message.text
@@ -65,6 +86,27 @@ class Command(metaclass=Singleton):
                 parse_mode=ParseMode.HTML,
             )
 
+        # drop repeated commands and users or chats going over their rate limit
+        rejection = self._throttle.check(userid, chat_id, self._request_key(update, context))
+        if rejection:
+            logging.info(
+                f"Throttled ({rejection}) - "
+                f"command: {self._command} - "
+                f"user: ({userid}) {display_name} - "
+                f"chat: {chat_id}"
+            )
+            if rejection == CommandThrottle.RATE_LIMITED and self._throttle.should_notify(userid, chat_id):
+                self._send(
+                    context,
+                    "send_message",
+                    priority=SendQueue.PRIORITY_NOTICE,
+                    block=False,
+                    chat_id=chat_id,
+                    text=f"🕐 Calma aí, {display_name}! Muitos comandos seguidos, tenta de novo daqui a pouco.",
+                    parse_mode=ParseMode.HTML,
+                )
+            return None
+
         logging.info(
             f"command: {self._command} - "
             f"user: ({userid}) {display_name} - "
@@ -72,12 +114,19 @@ class Command(metaclass=Singleton):
             f"chat_type: {chat_type} - "
             f"text: {text}"
         )
+
+        # the placeholder and edit are only worth it when a generation will happen
+        reply = self._cached_reply(update, context)
+        if reply is not None:
+            context.bot.send_message(
+                chat_id=update.message.chat.id,
+                text=reply,
+                parse_mode=ParseMode.HTML,
+            )
+            return None
+
         return context.bot.send_message(
             chat_id=update.message.chat.id,
             text="Processando comando...",
             parse_mode=ParseMode.HTML,
         )
-
-    def setup(self, dispatcher):
-        inline_handler = CommandHandler(self._command, self._process)
-        dispatcher.add_handler(inline_handler)
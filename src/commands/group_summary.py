@@ -1,13 +1,11 @@
 import logging
 import time
-from collections import deque
 from telegram import ParseMode, ChatAction
-from telegram.ext import MessageHandler, Filters
 
-from clients import OpenAIClient
+from clients import ModelRouter, OpenAIClient
 from environment import Environment
 from utils import create_message_data
-from modules import PrivacyManager
+from modules import MessageBuffer, PrivacyManager, SendQueue, get_state_backend
 from commands.command import Command
 
 
@@ -26,8 +24,9 @@ class GroupSummary(Command):
             "6️⃣",
         ]
         self._openai_client = OpenAIClient()
-        self._message_buffers = {}  # per-group message buffers
-        self._last_summary_times = {}  # per-group cooldown tracking
+        self._state = get_state_backend()  # per-group cooldowns, shared between instances
+        self._buffer_size = 100
+        self._buffers = MessageBuffer("group_summary:messages", self._buffer_size)
         self._cooldown_seconds = 60  # 1 minute cooldown
 
     def _should_trigger(self, message_text):
@@ -47,24 +46,20 @@ class GroupSummary(Command):
                     "timestamp": message_data["timestamp"],
                 }
 
-                # get or create buffer for this group
-                chat_id = message.chat_id
-                if chat_id not in self._message_buffers:
-                    self._message_buffers[chat_id] = deque(maxlen=100)
-
-                self._message_buffers[chat_id].append(simplified_data)
+                # append to the buffer for this group
+                self._buffers.append(message.chat_id, simplified_data)
             except Exception as e:
                 logging.error(f"Failed to store message: {e}")
                 raise
 
     def _get_recent_messages(self, chat_id, limit=100):
         try:
-            message_buffer = self._message_buffers.get(chat_id, deque())
+            message_buffer = self._buffers.get(chat_id)
             if not message_buffer:
                 return ["[Nenhuma mensagem recente disponível]"]
 
             messages = []
-            for msg_data in list(message_buffer)[-limit:]:
+            for msg_data in message_buffer[-limit:]:
                 message_text = msg_data["text"].lower()
                 contains_trigger = any(pattern.lower() in message_text for pattern in self._trigger_patterns)
 
@@ -117,7 +112,9 @@ class GroupSummary(Command):
                 {"role": "user", "content": user_prompt},
             ]
 
-            summary = self._openai_client.make_request(messages=openai_messages, max_tokens=400)
+            summary = self._openai_client.make_request(
+                messages=openai_messages, max_tokens=400, task=ModelRouter.TASK_SUMMARY
+            )
 
             # de-anonymize the summary by replacing user hashes with real names
             if summary:
@@ -162,10 +159,14 @@ class GroupSummary(Command):
 
         # check per-group cooldown
         current_time = time.time()
-        last_summary_time = self._last_summary_times.get(chat_id, 0)
+        last_summary_time = self._state.get("group_summary:cooldown", chat_id, 0)
         if current_time - last_summary_time < self._cooldown_seconds:
             remaining = int(self._cooldown_seconds - (current_time - last_summary_time))
-            context.bot.send_message(
+            self._send(
+                context,
+                "send_message",
+                priority=SendQueue.PRIORITY_NOTICE,
+                block=False,
                 chat_id=chat_id,
                 text=f"🕐 Calma aí! Espera mais {remaining} segundos para outro resumo.",
                 parse_mode=ParseMode.HTML,
@@ -179,7 +180,10 @@ class GroupSummary(Command):
             recent_messages = self._get_recent_messages(chat_id)
 
             if len(recent_messages) < 5:
-                context.bot.send_message(
+                self._send(
+                    context,
+                    "send_message",
+                    block=False,
                     chat_id=chat_id,
                     text="6️⃣ falam eim! Mas ainda não tenho mensagens suficientes para resumir.",
                     parse_mode=ParseMode.HTML,
@@ -190,19 +194,20 @@ class GroupSummary(Command):
 
             response_text = f"6️⃣ falam eim!\n\n{summary}\n\nResumo gerado por Bidu-GPT."
 
-            context.bot.send_message(chat_id=chat_id, text=response_text, parse_mode=ParseMode.HTML)
+            self._send(
+                context, "send_message", block=False, chat_id=chat_id, text=response_text, parse_mode=ParseMode.HTML
+            )
 
             # update per-group cooldown timestamp after successful summary
-            self._last_summary_times[chat_id] = time.time()
+            self._state.set("group_summary:cooldown", chat_id, time.time(), ttl=self._cooldown_seconds)
 
         except Exception as e:
             logging.error(f"Error in GroupSummary._process: {e}")
-            context.bot.send_message(
+            self._send(
+                context,
+                "send_message",
+                block=False,
                 chat_id=chat_id,
                 text="Ops! Não consegui processar o resumo agora.",
                 parse_mode=ParseMode.HTML,
             )
-
-    def setup(self, dispatcher):
-        message_handler = MessageHandler(Filters.text & Filters.group, self._process)
-        dispatcher.add_handler(message_handler, group=0)
@@ -1,6 +1,5 @@
 from fetchers import NewsFetcher
 from telegram import ParseMode
-from telegram.ext import CommandHandler
 from utils import get_date
 
 from commands import Command
@@ -30,14 +29,11 @@ class News(Command):
         return message
 
     def _process(self, update, context):
-        super()._process(update, context)
+        if super()._process(update, context) is None:
+            return
 
         data = self._fetcher.fetch()
         data["date"] = get_date()
         message = self._make_prediction_message(data)
 
         context.bot.send_message(chat_id=update.message.chat_id, text=message, parse_mode=ParseMode.HTML)
-
-    def setup(self, dispatcher):
-        inline_handler = CommandHandler(self._command, self._process)
-        dispatcher.add_handler(inline_handler)
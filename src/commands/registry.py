@@ -0,0 +1,88 @@
+import importlib
+import logging
+import threading
+
+from telegram.ext import CommandHandler, MessageHandler
+
+from modules.metrics import span
+from modules.token_usage import usage_context
+
+
+class LazyHandler:
+    """Telegram callback that imports and builds its command class on the first update.
+
+    With `run_async`, updates are handled on the dispatcher's thread pool while
+    it is running (polling mode), so a command waiting on the send queue or the
+    model doesn't hold up updates from other chats.
+    """
+
+    def __init__(self, path, run_async=False):
+        # "package.module:ClassName"
+        self.path = path
+        self.run_async = run_async
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def instance(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    module_name, class_name = self.path.split(":")
+                    logging.info(f"Loading handler {self.path}")
+                    self._instance = getattr(importlib.import_module(module_name), class_name)()
+        return self._instance
+
+    def _handle(self, update, context):
+        handler = self.path.split(":")[1]
+        chat_id = update.effective_chat.id if update and update.effective_chat else None
+        with span("command", handler=handler), usage_context(handler, chat_id):
+            return self.instance._process(update, context)
+
+    def _process(self, update, context):
+        try:
+            return self._handle(update, context)
+        except Exception as e:
+            # errors in pooled threads would otherwise never reach the error handler
+            context.dispatcher.dispatch_error(update, e)
+
+    def __call__(self, update, context):
+        if self.run_async and context.dispatcher.running:
+            return context.dispatcher.run_async(self._process, update, context)
+        return self._handle(update, context)
+
+
+class CommandRegistry:
+    """Registers handlers by name without importing them. Each command module,
+    with its fetchers, clients and astro data, is only loaded when the first
+    matching update arrives.
+    """
+
+    def __init__(self):
+        self._commands = {}  # command name -> handler
+        self._message_handlers = []  # (handler, filters, group)
+        self._handlers = {}  # path -> handler, shared so singletons are built once
+
+    def _get_handler(self, path, run_async=False):
+        if path not in self._handlers:
+            self._handlers[path] = LazyHandler(path, run_async)
+        return self._handlers[path]
+
+    def add_command(self, name, path):
+        # commands reply with a placeholder and an edit, run them off the dispatcher thread
+        self._commands[name] = self._get_handler(path, run_async=True)
+
+    def add_message_handler(self, path, filters, group=0):
+        self._message_handlers.append((self._get_handler(path), filters, group))
+
+    def preload(self):
+        """Builds every registered handler now instead of on first use."""
+        for handler in self._handlers.values():
+            handler.instance
+
+    def setup(self, dispatcher):
+        for name, handler in self._commands.items():
+            dispatcher.add_handler(CommandHandler(name, handler))
+
+        for handler, filters, group in self._message_handlers:
+            dispatcher.add_handler(MessageHandler(filters, handler), group=group)
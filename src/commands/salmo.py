@@ -1,6 +1,7 @@
 from telegram import ParseMode, ChatAction
 
 from commands import Command
+from commands.templates import SALMO_TEMPLATE
 from modules import PredictionModule
 
 
@@ -10,26 +11,24 @@ class Salmo(Command):
         self._command = "salmo"
         self._prediction_module = PredictionModule()
 
-    def _make_psalm_message(self, data):
-        title = data["title"]
-        key_verse = data["key_verse"]
-        url = data["url"]
-
-        # prepare heading with date following the pattern of other commands
-        heading = f"{data['date']} - {title}\n\n"
-
-        # format body following the pattern of sign/tarot commands
-        body = f"{key_verse}\n\n"
-        body += f'🔗 <a href="{url}">Ver salmo completo</a>'
+    def _request_key(self, update, context):
+        # the psalm of the day is the same for everyone
+        return (update.message.chat.id, self._command)
 
-        # combine heading and body
-        message = str(heading + body)
+    def _make_psalm_message(self, data):
+        return SALMO_TEMPLATE.render(
+            date=data["date"], title=data["title"], key_verse=data["key_verse"], url=data["url"]
+        )
 
-        return message
+    def _cached_reply(self, update, context):
+        data = self._prediction_module.get_cached_salmo_prediction()
+        return self._make_psalm_message(data) if data else None
 
     def _process(self, update, context):
         """process the /salmo command"""
         telegram_message = super()._process(update, context)
+        if telegram_message is None:
+            return
 
         # send typing indicator while generating prediction
         context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
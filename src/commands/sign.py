@@ -1,9 +1,8 @@
-import difflib
-
 from telegram import ParseMode
 
 from commands import Command
 from fetchers import SignFetcher
+from modules import FuzzyIndex
 from utils import get_date
 
 
@@ -23,8 +22,42 @@ class Sign(Command):
         "peixes": "Peixes",
     }
 
+    # english names, abbreviations and emoji, accents are folded by the index
+    aliases = {
+        "taurus": "touro",
+        "tau": "touro",
+        "gemini": "gemeos",
+        "gem": "gemeos",
+        "leo": "leao",
+        "virgo": "virgem",
+        "scorpio": "escorpiao",
+        "scorp": "escorpiao",
+        "escorp": "escorpiao",
+        "sagittarius": "sagitario",
+        "sag": "sagitario",
+        "capricorn": "capricornio",
+        "cap": "capricornio",
+        "capri": "capricornio",
+        "aquarius": "aquario",
+        "aqua": "aquario",
+        "pisces": "peixes",
+        "♈": "aries",
+        "♉": "touro",
+        "♊": "gemeos",
+        "♋": "cancer",
+        "♌": "leao",
+        "♍": "virgem",
+        "♎": "libra",
+        "♏": "escorpiao",
+        "♐": "sagitario",
+        "♑": "capricornio",
+        "♒": "aquario",
+        "♓": "peixes",
+    }
+
     CUTOFF = 0.2
     DEFAULT_SIGN = "aries"
+    sign_index = FuzzyIndex(sign_map, aliases, cutoff=CUTOFF)
 
     def __init__(self):
         super().__init__()
@@ -32,16 +65,11 @@ class Sign(Command):
         self._fetcher = SignFetcher()
 
     def _parse_sign(self, sign):
-        match = difflib.get_close_matches(
-            sign,
-            Sign.sign_map.keys(),
-            n=1,
-            cutoff=Sign.CUTOFF,
-        )
-        if len(match) == 0:
-            return Sign.DEFAULT_SIGN
+        return Sign.sign_index.match(sign) or Sign.DEFAULT_SIGN
 
-        return match[0]
+    def _request_key(self, update, context):
+        # everyone gets the same horoscope, so repeats from anyone in the chat are coalesced
+        return (update.message.chat.id, self._command, self._parse_sign(" ".join(context.args or [])))
 
     def _make_prediction_message(self, data):
         sign = data["sign"]
@@ -70,7 +98,8 @@ class Sign(Command):
         return message
 
     def _process(self, update, context):
-        super()._process(update, context)
+        if super()._process(update, context) is None:
+            return
 
         args = context.args
         query = " ".join(args)
@@ -1,55 +1,107 @@
+import threading
+
 from telegram import ParseMode, ChatAction
 
 from commands import Sign
-from modules import PredictionModule
+from commands.templates import SIGN_GPT_TEMPLATE, SIGN_GPT_PERSONAL_TEMPLATE
+from modules import PredictionModule, UsersModule
+from modules.fuzzy_index import fold
 
 
 class SignGPT(Sign):
+    # `/bidu eu leao` remembers the sign and opts into personalized readings, `/bidu eu` uses it
+    PERSONAL_ARG = "eu"
+    PERSONAL_HINT = "Use /bidu eu seguido do seu signo, por exemplo /bidu eu leão, para receber o seu horóscopo."
+
     def __init__(self):
         super().__init__()
         self._command = "bidu"
         self._prediction_module = PredictionModule()
+        self._users_module = UsersModule()
+        # the personal sign of the update being handled by this thread, resolved once in `_process`
+        self._request = threading.local()
 
-    def _make_prediction_message(self, data):
-        sign = data["sign"]
-        image = data["image"]
-        prediction = data["prediction"]
-        guess_of_the_day = data["guess_of_the_day"]
-        color_of_the_day = data["color_of_the_day"]
+    def _make_prediction_message(self, data, display_name=None):
+        template = SIGN_GPT_PERSONAL_TEMPLATE if display_name else SIGN_GPT_TEMPLATE
+        return template.render(
+            date=data["date"],
+            sign=Sign.sign_map[data["sign"]],
+            display_name=display_name,
+            image=data["image"],
+            prediction=data["prediction"],
+            guess_of_the_day=data["guess_of_the_day"],
+            color_of_the_day=data["color_of_the_day"],
+        )
 
-        # prepare heading
-        heading = f"{data['date']} - Horóscopo de {Sign.sign_map[sign]}\n\n"  # noqa
+    def _fetch(self, sign):
+        return self._prediction_module.get_sign_prediction(sign)
 
-        # fetch and present body info
-        body = f'<a href="{image}">• </a>'
-        body += f"{prediction}\n\n"
-        body += f'<a href="{image}">• </a>'
-        body += f"<b>Palpite do dia:</b> {guess_of_the_day}\n"
-        body += f'<a href="{image}">• </a>'
-        body += f"<b>Cor do dia:</b> {color_of_the_day}\n\n"
+    def _is_personal(self, context):
+        return bool(context.args) and fold(context.args[0]) == SignGPT.PERSONAL_ARG
 
-        body += "Predição gerada por Bidu-GPT.\n\n"
+    def _display_name(self, update):
+        return update.message.from_user.username or update.message.from_user.full_name
 
-        # parse command characters
-        message = str(heading + body)
+    def _personal_sign(self, update, context):
+        """The sign to personalize for, the given one or the saved one, or None if the user never set one."""
+        query = " ".join(context.args[1:])
+        if query:
+            return self._parse_sign(query)
 
-        return message
+        user = self._users_module.get_user(update.message.from_user.id)
+        return user.get("sign") if user else None
 
-    def _fetch(self, sign):
-        return self._prediction_module.get_sign_prediction(sign)
+    def _save_sign(self, update, sign):
+        userid = update.message.from_user.id
+        user = self._users_module.get_user(userid)
+        if not user:
+            self._users_module.add_user(userid, self._display_name(update))
+        if not user or user.get("sign") != sign:
+            self._users_module.update_user(userid, sign=sign)
+
+    def _request_key(self, update, context):
+        if self._is_personal(context):
+            return (update.message.chat.id, update.message.from_user.id, self._command, SignGPT.PERSONAL_ARG)
+        return super()._request_key(update, context)
+
+    def _cached_reply(self, update, context):
+        if self._is_personal(context):
+            sign = self._request.sign
+            if sign is None:
+                return SignGPT.PERSONAL_HINT
+            data = self._prediction_module.get_cached_personal_sign_prediction(update.message.from_user.id, sign)
+            return self._make_prediction_message(data, self._display_name(update)) if data else None
+
+        data = self._prediction_module.get_cached_sign_prediction(self._parse_sign(" ".join(context.args)))
+        return self._make_prediction_message(data) if data else None
 
     def _process(self, update, context):
+        personal = self._is_personal(context)
+        if personal:
+            sign = self._request.sign = self._personal_sign(update, context)
+            # `/bidu eu leao` remembers the sign, for users allowed to use the command
+            chat = update.message.chat
+            if context.args[1:] and self._is_user_authorized(update.message.from_user.id, chat.type, chat.id):
+                self._save_sign(update, sign)
+
         telegram_message = super(Sign, self)._process(update, context)
+        if telegram_message is None:
+            return
 
         # send typing indicator while generating prediction
         context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
 
-        args = context.args
-        query = " ".join(args)
-        sign = self._parse_sign(query)
+        if personal:
+            # `_cached_reply` already answered users without a sign
+            data = self._prediction_module.get_personal_sign_prediction(update.message.from_user.id, sign)
+            message = self._make_prediction_message(data, self._display_name(update))
+        else:
+            args = context.args
+            query = " ".join(args)
+            sign = self._parse_sign(query)
 
-        data = self._fetch(sign)
-        message = self._make_prediction_message(data)
+            data = self._fetch(sign)
+            message = self._make_prediction_message(data)
 
         context.bot.edit_message_text(
             chat_id=update.effective_chat.id,
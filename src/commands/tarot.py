@@ -1,71 +1,41 @@
-import difflib
-import random
-from datetime import datetime
+import hashlib
+from datetime import datetime, timedelta
 
 from telegram import ParseMode, ChatAction
 
 from commands import Command
+from commands.templates import TAROT_NOT_FOUND, TAROT_TEMPLATES, PersonaBlocks
 from fetchers import TarotFetcher
+from modules import TarotCatalog, TarotUsersModule
 from utils import get_date
 
 
 class Tarot(Command):
-    CUTOFF = 0.2
+    DECK_SIZE = 22
 
     def __init__(self):
         super().__init__()
         self._command = "tarot_old"
-        self._users = {}
+        self._users_module = TarotUsersModule()
         self._fetcher = TarotFetcher()
+        self._catalog = TarotCatalog()
+        self._persona = PersonaBlocks()
 
     def _parse_arcana(self, arcana):
-        match = difflib.get_close_matches(
-            arcana,
-            TarotFetcher.category_map.values(),
-            n=1,
-            cutoff=Tarot.CUTOFF,
-        )
-        if len(match) == 0:
-            return None
-
-        return match[0]
+        card = self._catalog.match(arcana)
+        return card.name if card else None
 
     def _build_message(self, data):
-        image = data["card"]["image"]
-        title = data["card"]["title"]
-        prediction_body = data["card"]["body"]
-        url = data["card"]["url"]
-        tarot_type = data["card"]["type"]
-
-        # prepare heading
-        if tarot_type == "daily":
-            heading = f"{data['date']} - Tarot do Dia de {data['display_name']}\n\n"  # noqa
-        elif tarot_type == "info":
-            heading = f"{data['date']} - Info de Tarot para {data['display_name']}\n\n"  # noqa
-
-        # fetch and present body info
-        body = f'<a href="{image}">•  </a>'
-        body += f"<b>{title.upper()}</b>\n\n"
-        body += f"{prediction_body}\n\n"
-
-        # fetch and present arcanas info
-        arcanas = data["card"]["arcanas"]
-        body += f'<a href="{image}">•  </a>'
-        body += "<b>PERSONA</b>\n\n"
-        for arcana in arcanas:
-            entry = f"<a href='{arcana['url']}'>  • {arcana['name']}</a>"
-            body += f"\t{entry}\n"
-            for character in arcana["characters"]:
-                entry = f"<a href='{character['url']}'>   • {character['name']} ({character['game']})</a>"  # noqa
-                body += f"\t\t{entry}\n"
-        body += "\n"
-
-        body += f"Mais informações em: {url}\n"
-
-        # parse command characters
-        message = str(heading + body)
-
-        return message
+        card = data["card"]
+        return TAROT_TEMPLATES[card["type"]].render(
+            date=data["date"],
+            display_name=data["display_name"],
+            image=card["image"],
+            title=card["title"].upper(),
+            body=card["body"],
+            persona=self._persona.get(card["arcanas"]),
+            url=card["url"],
+        )
 
     def _make_card(self, arcana):
         """Unlike `_draw_card`, this function will fabricate a card
@@ -84,78 +54,127 @@ class Tarot(Command):
 
         return card
 
-    def _fetch_data(self):
-        index = random.randint(1, 22)
-        return self._fetcher.fetch(index)
-
-    def _draw_card(self, user):
-        request_date = user.get("request_date", None)
-        card = user["card"]
-
-        # if request date is not today, reset
-        today = str(datetime.now().date())
-        if not request_date or request_date != today:
-            user["request_date"] = today
-            oldcard = card
-
-            while oldcard == card:
-                data = self._fetch_data()
-                card = {
-                    "title": data.get("title"),
-                    "body": data.get("body"),
-                    "image": data.get("image"),
-                    "url": data.get("url"),
-                    "arcanas": data.get("arcanas"),
-                    "type": "daily",
-                }
-                user["card"] = card
+    def _fetch_data(self, index):
+        # the site numbers its cards from 1
+        return self._fetcher.fetch(index + 1)
+
+    @staticmethod
+    def _today():
+        # BRT, like the predictions, so every instance agrees on the day
+        return (datetime.utcnow() - timedelta(hours=3)).date()
+
+    @staticmethod
+    def _permutation(userid, block):
+        """Order of the deck for one block of `DECK_SIZE` days, seeded by the user and block."""
+        order = list(range(Tarot.DECK_SIZE))
+        for index in range(len(order) - 1, 0, -1):
+            digest = hashlib.sha256(f"{userid}:{block}:{index}".encode()).digest()
+            swap = int.from_bytes(digest[:8], "big") % (index + 1)
+            order[index], order[swap] = order[swap], order[index]
+        return order
+
+    @staticmethod
+    def _daily_index(userid, day):
+        """Deck index of the user's card on `day`, never the same as the day before.
+
+        Days are split in blocks of `DECK_SIZE` that walk a permutation, so cards
+        only repeat across blocks; the first two of a block swap if the first one
+        was the last card of the previous block.
+        """
+        block, offset = divmod(day.toordinal(), Tarot.DECK_SIZE)
+        order = Tarot._permutation(userid, block)
+        if offset < 2 and order[0] == Tarot._permutation(userid, block - 1)[-1]:
+            order[0], order[1] = order[1], order[0]
+        return order[offset]
+
+    def _make_daily_card(self, data):
+        return {
+            "title": data.get("title"),
+            "body": data.get("body"),
+            "image": data.get("image"),
+            "url": data.get("url"),
+            "arcanas": data.get("arcanas"),
+            "type": "daily",
+        }
+
+    def _cached_card_data(self, index):
+        # override when the card data can be known without fetching
+        return None
+
+    def _draw_card(self, userid, user):
+        # if request date is not today, draw today's card
+        today = self._today()
+        if user.get("request_date") != str(today):
+            user["request_date"] = str(today)
+            user["card"] = self._make_daily_card(self._fetch_data(self._daily_index(userid, today)))
 
         return user["card"]
 
     def _get_user(self, userid, display_name):
-        if userid not in self._users:
-            self._users[userid] = {
-                "display_name": display_name,
-                "request_date": None,
-                "card": None,
-            }
+        user = self._users_module.get_user(userid)
+        if not user:
+            self._users_module.add_user(userid, display_name)
+            user = self._users_module.get_user(userid)
+        return user
 
-        return self._users[userid]
+    def _save_user(self, userid, user):
+        self._users_module.save_user(userid, user)
 
-    def _process(self, update, context):
-        telegram_message = super()._process(update, context)
-        
-        # send typing indicator for longer processing commands
-        context.bot.send_chat_action(chat_id=update.message.chat_id, action=ChatAction.TYPING)
-
-        # fetch user data
-        userid = update.message.from_user.id
+    def _display_name(self, update):
         display_name = update.message.from_user.username
         if not display_name:
             display_name = update.message.from_user.full_name
+        return display_name
 
-        # determine command type (daily or info)
-        args = context.args
-        if len(args) > 0:
-            # if more than one argument, assume info
-            query = " ".join(args)
-            arcana = self._parse_arcana(query)
-            card = self._make_card(arcana)
-        else:
-            user = self._get_user(userid, display_name)
-            arcana = None
-            card = self._draw_card(user)
-
-        # fetch card data
+    def _make_message(self, update, card, arcana):
         data = {
-            "display_name": display_name,
+            "display_name": self._display_name(update),
             "card": card,
             "arcana": arcana,
             "date": get_date(),
         }
+        return self._build_message(data)
+
+    def _cached_reply(self, update, context):
+        # info cards and a card already drawn today need no fetching
+        if len(context.args) > 0:
+            # if more than one argument, assume info
+            query = " ".join(context.args)
+            arcana = self._parse_arcana(query)
+            if arcana is None:
+                return TAROT_NOT_FOUND.render(query=query)
+            return self._make_message(update, self._make_card(arcana), arcana)
+
+        userid = update.message.from_user.id
+        user = self._get_user(userid, self._display_name(update))
+        if user.get("card") and user.get("request_date") == str(self._today()):
+            return self._make_message(update, user["card"], None)
+
+        # the draw is deterministic, someone else may have made the same card ready
+        data = self._cached_card_data(self._daily_index(userid, self._today()))
+        if data:
+            return self._make_message(update, self._make_daily_card(data), None)
+
+        return None
+
+    def _generate_reply(self, update, context):
+        # info cards were answered by `_cached_reply`, this is a new daily card
+        userid = update.message.from_user.id
+        user = self._get_user(userid, self._display_name(update))
+        card = self._draw_card(userid, user)
+        self._save_user(userid, user)
+
+        return self._make_message(update, card, None)
+
+    def _process(self, update, context):
+        telegram_message = super()._process(update, context)
+        if telegram_message is None:
+            return
+        
+        # send typing indicator for longer processing commands
+        context.bot.send_chat_action(chat_id=update.message.chat_id, action=ChatAction.TYPING)
 
-        # build message
-        message = self._build_message(data)
+        message = self._generate_reply(update, context)
 
         # send message
         context.bot.edit_message_text(
@@ -1,12 +1,44 @@
-import random
-
 from telegram import ChatAction
 from commands import Tarot
-from fetchers import TarotFetcher
+from commands.templates import TAROT_GPT_TEMPLATES, TAROT_SPREAD_HEADING, TAROT_SPREAD_CARD, TAROT_SPREAD_FOOTER
 from modules import PredictionModule, UsersModule
+from modules.fuzzy_index import fold
+from utils import get_date
 
 
 class TarotGPT(Tarot):
+    # spread -> (display name, card positions)
+    SPREADS = {
+        "tres": ("Passado, Presente e Futuro", ("Passado", "Presente", "Futuro")),
+        "cruz": (
+            "Cruz Celta",
+            (
+                "Situação atual",
+                "Desafio",
+                "Base",
+                "Passado recente",
+                "Objetivo",
+                "Futuro próximo",
+                "Você",
+                "Ambiente",
+                "Esperanças e medos",
+                "Resultado",
+            ),
+        ),
+    }
+    # folded argument -> spread
+    SPREAD_ALIASES = {
+        "tres": "tres",
+        "3": "tres",
+        "3 cartas": "tres",
+        "tres cartas": "tres",
+        "passado presente futuro": "tres",
+        "cruz": "cruz",
+        "celta": "cruz",
+        "cruz celta": "cruz",
+        "celtic cross": "cruz",
+    }
+
     def __init__(self):
         super().__init__()
         self._command = "tarot"
@@ -14,46 +46,56 @@ class TarotGPT(Tarot):
         self._users_module = UsersModule()
 
     def _build_message(self, data):
-        image = data["card"]["image"]
-        title = data["card"]["title"]
-        prediction_body = data["card"]["body"]
-        tarot_type = data["card"]["type"]
-
-        # prepare heading
-        if tarot_type == "daily":
-            heading = f"{data['date']} - Tarot do Dia de {data['display_name']}\n\n"  # noqa
-        elif tarot_type == "info":
-            heading = f"{data['date']} - Info de Tarot para {data['display_name']}\n\n"  # noqa
-
-        # fetch and present body info
-        body = f'<a href="{image}">•  </a>'
-        body += f"<b>{title.upper()}</b>\n\n"
-        body += f"{prediction_body}\n\n"
-
-        # fetch and present arcanas info
-        arcanas = data["card"]["arcanas"]
-        body += f'<a href="{image}">•  </a>'
-        body += "<b>PERSONA</b>\n\n"
-        for arcana in arcanas:
-            entry = f"<a href='{arcana['url']}'>  • {arcana['name']}</a>"
-            body += f"\t{entry}\n"
-            for character in arcana["characters"]:
-                entry = f"<a href='{character['url']}'>   • {character['name']} ({character['game']})</a>"  # noqa
-                body += f"\t\t{entry}\n"
-        body += "\n"
-
-        body += "Predição gerada por Bidu-GPT.\n\n"
-
-        return heading + body
-
-    def _fetch_data(self):
-        index = random.randint(1, 22)
-        arcana = list(TarotFetcher.tarot_map.keys())[index]
-        return self._prediction_module.get_tarot_prediction(arcana)
-
-    def _get_user(self, userid, display_name):
-        user = self._users_module.get_user(userid)
-        if not user:
-            self._users_module.add_user(userid, display_name)
-            user = self._users_module.get_user(userid)
-        return user
+        card = data["card"]
+        return TAROT_GPT_TEMPLATES[card["type"]].render(
+            date=data["date"],
+            display_name=data["display_name"],
+            image=card["image"],
+            title=card["title"].upper(),
+            body=card["body"],
+            persona=self._persona.get(card["arcanas"]),
+        )
+
+    def _parse_spread(self, args):
+        return TarotGPT.SPREAD_ALIASES.get(fold(" ".join(args)))
+
+    def _draw_spread(self, userid, spread):
+        """Portuguese card names of the user's spread today, never the same card twice."""
+        count = len(TarotGPT.SPREADS[spread][1])
+        order = self._permutation(f"{userid}:{spread}", self._today().toordinal())
+        return [self._catalog.cards[index].portuguese for index in order[:count]]
+
+    def _make_spread_message(self, update, spread, data):
+        name, _ = TarotGPT.SPREADS[spread]
+        parts = [TAROT_SPREAD_HEADING.render(date=get_date(), spread=name, display_name=self._display_name(update))]
+        for card in data["cards"]:
+            parts.append(TAROT_SPREAD_CARD.render(**card))
+        parts.append(TAROT_SPREAD_FOOTER)
+        return "".join(parts)
+
+    def _cached_reply(self, update, context):
+        spread = self._parse_spread(context.args)
+        if spread is None:
+            return super()._cached_reply(update, context)
+
+        userid = update.message.from_user.id
+        data = self._prediction_module.get_cached_tarot_spread_prediction(userid, spread)
+        return self._make_spread_message(update, spread, data) if data else None
+
+    def _generate_reply(self, update, context):
+        spread = self._parse_spread(context.args)
+        if spread is None:
+            return super()._generate_reply(update, context)
+
+        userid = update.message.from_user.id
+        _, positions = TarotGPT.SPREADS[spread]
+        data = self._prediction_module.get_tarot_spread_prediction(
+            userid, spread, self._draw_spread(userid, spread), list(positions)
+        )
+        return self._make_spread_message(update, spread, data)
+
+    def _fetch_data(self, index):
+        return self._prediction_module.get_tarot_prediction(self._catalog.cards[index].portuguese)
+
+    def _cached_card_data(self, index):
+        return self._prediction_module.get_cached_tarot_prediction(self._catalog.cards[index].portuguese)
@@ -0,0 +1,104 @@
+import html
+import threading
+from string import Formatter
+
+from modules import Singleton, TarotCatalog
+
+
+class Template:
+    """A reply format string split into literal parts and fields once, so rendering
+    is a single join. Field values are HTML escaped unless listed in `raw`, which
+    is meant for blocks that are already HTML.
+    """
+
+    def __init__(self, source, raw=()):
+        self._parts = []
+        for literal, field, _, _ in Formatter().parse(source):
+            if literal:
+                self._parts.append((literal, None))
+            if field is not None:
+                self._parts.append((None, field))
+        self._raw = frozenset(raw)
+
+    def render(self, **values):
+        return "".join(
+            literal if field is None else self._field(field, values[field]) for literal, field in self._parts
+        )
+
+    def _field(self, field, value):
+        if field in self._raw:
+            return value
+        return html.escape(str(value))
+
+
+SIGN_GPT_BODY = (
+    '<a href="{image}">• </a>{prediction}\n\n'
+    '<a href="{image}">• </a><b>Palpite do dia:</b> {guess_of_the_day}\n'
+    '<a href="{image}">• </a><b>Cor do dia:</b> {color_of_the_day}\n\n'
+    "Predição gerada por Bidu-GPT.\n\n"
+)
+SIGN_GPT_TEMPLATE = Template("{date} - Horóscopo de {sign}\n\n" + SIGN_GPT_BODY)
+SIGN_GPT_PERSONAL_TEMPLATE = Template("{date} - Horóscopo de {sign} para {display_name}\n\n" + SIGN_GPT_BODY)
+
+TAROT_HEADINGS = {
+    "daily": "{date} - Tarot do Dia de {display_name}\n\n",
+    "info": "{date} - Info de Tarot para {display_name}\n\n",
+}
+TAROT_CARD = (
+    '<a href="{image}">•  </a><b>{title}</b>\n\n'
+    "{body}\n\n"
+    '<a href="{image}">•  </a><b>PERSONA</b>\n\n'
+    "{persona}\n"
+)
+
+# card type -> template
+TAROT_TEMPLATES = {
+    card_type: Template(heading + TAROT_CARD + "Mais informações em: {url}\n", raw=("persona",))
+    for card_type, heading in TAROT_HEADINGS.items()
+}
+
+TAROT_NOT_FOUND = Template('Não encontrei nenhum arcano parecido com "{query}".\n')
+
+TAROT_GPT_TEMPLATES = {
+    card_type: Template(heading + TAROT_CARD + "Predição gerada por Bidu-GPT.\n\n", raw=("persona",))
+    for card_type, heading in TAROT_HEADINGS.items()
+}
+
+TAROT_SPREAD_HEADING = Template("{date} - Tiragem {spread} de {display_name}\n\n")
+TAROT_SPREAD_CARD = Template('<a href="{image}">•  </a><b>{position}: {title}</b>\n\n{body}\n\n')
+TAROT_SPREAD_FOOTER = "Predição gerada por Bidu-GPT.\n\n"
+
+SALMO_TEMPLATE = Template('{date} - {title}\n\n{key_verse}\n\n🔗 <a href="{url}">Ver salmo completo</a>')
+
+ARCANA_TEMPLATE = Template("\t<a href='{url}'>  • {name}</a>\n")
+CHARACTER_TEMPLATE = Template("\t\t<a href='{url}'>   • {name} ({game})</a>\n")
+
+
+class PersonaBlocks(metaclass=Singleton):
+    """The persona list of each tarot card as HTML, built once from the card catalog."""
+
+    def __init__(self):
+        # arcana names in card order -> HTML block
+        self._blocks = {}
+        self._lock = threading.Lock()
+        for card in TarotCatalog().cards:
+            self.get(card.personas)
+
+    def _build(self, arcanas):
+        parts = []
+        for arcana in arcanas:
+            parts.append(ARCANA_TEMPLATE.render(url=arcana["url"], name=arcana["name"]))
+            for character in arcana["characters"]:
+                parts.append(CHARACTER_TEMPLATE.render(**character))
+        return "".join(parts)
+
+    def get(self, arcanas):
+        """HTML block for a card's arcanas, built on the spot for ones not in the data file."""
+        arcanas = list(arcanas)
+        key = tuple(arcana["name"] for arcana in arcanas)
+        block = self._blocks.get(key)
+        if block is None:
+            block = self._build(arcanas)
+            with self._lock:
+                self._blocks[key] = block
+        return block
@@ -0,0 +1,27 @@
+import logging
+
+from modules.traffic_capture import TrafficCapture
+from commands.command import Command
+
+
+class TrafficRecorder(Command):
+    """Captures the traffic of monitored groups to `TRAFFIC_CAPTURE_PATH`, anonymized,
+    so it can be replayed offline (see `tools/traffic_replay.py`).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._capture = TrafficCapture(self._env.traffic_capture_path)
+
+    def _process(self, update, context):
+        message = update.message
+        if not message or not message.from_user:
+            return
+
+        if not self._is_user_authorized(message.from_user.id, message.chat.type, message.chat_id):
+            return
+
+        try:
+            self._capture.record(message)
+        except Exception as e:
+            logging.error(f"Failed to capture message: {e}")
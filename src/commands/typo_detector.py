@@ -1,14 +1,13 @@
 import logging
 import re
-from collections import deque
 from telegram import ParseMode, ChatAction
-from telegram.ext import MessageHandler, Filters
 
 from environment import Environment
 from utils import create_message_data
-from modules import PrivacyManager
+from modules import MessageBuffer, PrivacyManager, SendQueue, get_state_backend
 from modules.typo_tracker import TypoTracker
 from clients.openai_client import OpenAIClient
+from clients.model_router import ModelRouter
 from commands.command import Command
 
 
@@ -16,9 +15,10 @@ class TypoDetector(Command):
     def __init__(self):
         super().__init__()
         self._env = Environment()
-        self._message_buffers = {}  # per-group message buffers
+        self._state = get_state_backend()  # per-group cooldowns, shared between instances
+        self._buffer_size = 50
+        self._buffers = MessageBuffer("typo_detector:messages", self._buffer_size)
         self._min_users = int(self._env._validate_optional("MIN_USERS", "3"))
-        self._last_triggered_words = {}  # per-group cooldowns
         self._openai_client = OpenAIClient()
         self._typo_tracker = TypoTracker()
 
@@ -71,7 +71,7 @@ Is "{word}" likely a typo? Answer only YES or NO.""",
                 },
             ]
 
-            response = self._openai_client.make_request(messages, max_tokens=10)
+            response = self._openai_client.make_request(messages, max_tokens=10, task=ModelRouter.TASK_CLASSIFICATION)
             is_typo = response.strip().upper() == "YES"
 
             return is_typo
@@ -90,12 +90,8 @@ Is "{word}" likely a typo? Answer only YES or NO.""",
                     if message.caption and not message.text:
                         message_data["text"] = message.caption
 
-                    # get or create buffer for this group
-                    chat_id = message.chat_id
-                    if chat_id not in self._message_buffers:
-                        self._message_buffers[chat_id] = deque(maxlen=50)
-                    
-                    self._message_buffers[chat_id].append(message_data)
+                    # append to the buffer for this group
+                    self._buffers.append(message.chat_id, message_data)
             except Exception as e:
                 logging.error(f"Failed to store message: {e}")
                 raise
@@ -115,13 +111,17 @@ Is "{word}" likely a typo? Answer only YES or NO.""",
 
         # get per-group last triggered word
         chat_id = current_message.chat_id
-        last_triggered_word = self._last_triggered_words.get(chat_id)
+        last_triggered_word = self._state.get("typo_detector:last_word", chat_id)
 
         # reset cooldown if user says something different
         if current_words and last_triggered_word and last_triggered_word not in current_words:
-            self._last_triggered_words[chat_id] = None
+            self._state.delete("typo_detector:last_word", chat_id)
             last_triggered_word = None
 
+        # per-group buffer, read and split into words once for every word of the message
+        message_buffer = self._buffers.get(chat_id)
+        buffer_words = [self._extract_words(msg_data["text"]) for msg_data in message_buffer]
+
         for word in current_words:
             # skip if we already triggered on this word recently
             if word == last_triggered_word:
@@ -132,11 +132,7 @@ Is "{word}" likely a typo? Answer only YES or NO.""",
             different_users = set()
             all_messages_with_word = []
 
-            # use per-group buffer
-            message_buffer = self._message_buffers.get(chat_id, deque())
-            for msg_data in list(message_buffer):
-                msg_words = self._extract_words(msg_data["text"])
-
+            for msg_data, msg_words in zip(message_buffer, buffer_words):
                 if word in msg_words:
                     different_users.add(msg_data["user_id"])
                     all_messages_with_word.append(msg_data)
@@ -161,7 +157,7 @@ Is "{word}" likely a typo? Answer only YES or NO.""",
                 is_typo = self._is_typo_via_gpt(word, all_messages_with_word)
 
                 if is_typo:
-                    self._last_triggered_words[chat_id] = word
+                    self._state.set("typo_detector:last_word", chat_id, word)
                     return original_msg
 
         return None
@@ -193,7 +189,7 @@ Is "{word}" likely a typo? Answer only YES or NO.""",
                 # get the criminal (user who made the original typo)
                 criminal_user_id = original_msg["user_id"]
                 criminal_username = original_msg.get("user", "Anônimo")
-                last_triggered_word = self._last_triggered_words.get(chat_id)
+                last_triggered_word = self._state.get("typo_detector:last_word", chat_id)
                 
                 # add typo to tracker for the criminal
                 self._typo_tracker.add_typo(criminal_user_id, criminal_username, last_triggered_word)
@@ -216,7 +212,11 @@ Is "{word}" likely a typo? Answer only YES or NO.""",
 
                 response_text += "\n🤡 PARABÉNS GUYZ, COMEDY ACHIEVED! 🤡"
 
-                context.bot.send_message(
+                self._send(
+                    context,
+                    "send_message",
+                    priority=SendQueue.PRIORITY_NOTICE,
+                    block=False,
                     chat_id=chat_id,
                     text=response_text,
                     reply_to_message_id=original_msg["message_id"],
@@ -230,11 +230,3 @@ Is "{word}" likely a typo? Answer only YES or NO.""",
 
         except Exception as e:
             logging.error(f"Error in TypoDetector._process: {e}")
-
-    def setup(self, dispatcher):
-        text_handler = MessageHandler(Filters.text & Filters.group, self._process)
-        photo_handler = MessageHandler(Filters.photo & Filters.group & Filters.caption, self._process)
-
-        dispatcher.add_handler(text_handler, group=1)
-        dispatcher.add_handler(photo_handler, group=1)
-
@@ -1,5 +1,7 @@
+import hashlib
 import os
 import sys
+import threading
 import logging
 
 from dotenv import load_dotenv
@@ -10,10 +12,13 @@ load_dotenv()
 
 class Singleton(type):
     _instances = {}
+    _lock = threading.RLock()
 
     def __call__(cls, *args, **kwargs):
         if cls not in cls._instances:
-            cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
+            with Singleton._lock:
+                if cls not in cls._instances:
+                    cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
         return cls._instances[cls]
 
 
@@ -33,6 +38,11 @@ class Environment(metaclass=Singleton):
             return default
         return env_var
 
+    def _parse_bool(self, env_var_value):
+        if not env_var_value:
+            return False
+        return env_var_value.strip().lower() in ["1", "true", "yes", "on"]
+
     def _parse_id_list(self, env_var_value):
         if not env_var_value:
             return []
@@ -59,6 +69,47 @@ class Environment(metaclass=Singleton):
         monitored_groups_str = self._validate_optional("MONITORED_GROUP_IDS")
         self.monitored_group_ids = self._parse_id_list(monitored_groups_str)
 
+        # pre-generate every horoscope once a day in a single batch request (optional)
+        self.pregenerate_signs = self._parse_bool(self._validate_optional("PREGENERATE_SIGNS"))
+
+        # load every command at startup instead of on first use (optional)
+        self.preload_commands = self._parse_bool(self._validate_optional("PRELOAD_COMMANDS"))
+
+        # receive updates through a webhook instead of long polling (optional)
+        self.webhook_url = self._validate_optional("WEBHOOK_URL")
+        self.webhook_secret = self._validate_optional(
+            "WEBHOOK_SECRET", hashlib.sha256(self.telegram_token.encode()).hexdigest()[:32]
+        )
+        self.webhook_listen = self._validate_optional("WEBHOOK_LISTEN", "0.0.0.0")
+        self.webhook_port = int(self._validate_optional("WEBHOOK_PORT", 8443))
+        self.webhook_workers = int(self._validate_optional("WEBHOOK_WORKERS", 4))
+        self.webhook_queue_size = int(self._validate_optional("WEBHOOK_QUEUE_SIZE", 100))
+
+        # command throttling: requests per minute and burst size per user and per chat,
+        # and the window in which identical commands get a single reply (optional)
+        self.command_user_rate = float(self._validate_optional("COMMAND_USER_RATE", 6))
+        self.command_user_burst = int(self._validate_optional("COMMAND_USER_BURST", 3))
+        self.command_chat_rate = float(self._validate_optional("COMMAND_CHAT_RATE", 20))
+        self.command_chat_burst = int(self._validate_optional("COMMAND_CHAT_BURST", 10))
+        self.command_coalesce_seconds = float(self._validate_optional("COMMAND_COALESCE_SECONDS", 10))
+
+        # outgoing telegram calls: per second overall, per second in a private chat
+        # and per minute in a group (optional)
+        self.send_global_rate = float(self._validate_optional("SEND_GLOBAL_RATE", 30))
+        self.send_chat_rate = float(self._validate_optional("SEND_CHAT_RATE", 1))
+        self.send_group_rate = float(self._validate_optional("SEND_GROUP_RATE", 20))
+
+        # model tokens a chat may spend per day before its requests are degraded, 0 for no limit (optional)
+        self.chat_daily_tokens = int(self._validate_optional("CHAT_DAILY_TOKENS", 0))
+
+        # prometheus metrics endpoint, disabled without a port (optional)
+        metrics_port = self._validate_optional("METRICS_PORT")
+        self.metrics_port = int(metrics_port) if metrics_port else None
+        self.metrics_listen = self._validate_optional("METRICS_LISTEN", "127.0.0.1")
+
+        # anonymized capture of monitored group traffic, for tools/traffic_replay.py (optional)
+        self.traffic_capture_path = self._validate_optional("TRAFFIC_CAPTURE_PATH")
+
         # log configuration
         if self.allowed_user_ids:
             logging.info(f"Bot access restricted to user IDs: {self.allowed_user_ids}")
@@ -1,8 +1,17 @@
-from .fetcher import *
-from .sign_fetcher import *
-from .tarot_fetcher import *
-from .news_fetcher import *
-from .sign_fetcher_gpt import *
-from .tarot_fetcher_gpt import *
-from .salmo_fetcher import *
-from .salmo_fetcher_gpt import *
+from utils import lazy_exports
+
+# exported name -> submodule, imported on first access
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        "Fetcher": "fetcher",
+        "SignFetcher": "sign_fetcher",
+        "TarotFetcher": "tarot_fetcher",
+        "NewsFetcher": "news_fetcher",
+        "SignFetcherGPT": "sign_fetcher_gpt",
+        "TarotFetcherGPT": "tarot_fetcher_gpt",
+        "TarotSpreadFetcherGPT": "tarot_spread_fetcher_gpt",
+        "SalmoFetcher": "salmo_fetcher",
+        "SalmoFetcherGPT": "salmo_fetcher_gpt",
+    },
+)
@@ -1,6 +1,8 @@
 import requests
 from bs4 import BeautifulSoup
 
+from modules.metrics import span
+
 
 class Fetcher:
     def __init__(self):
@@ -8,8 +10,9 @@ class Fetcher:
         self._base_url = "https://joaobidu.com.br"
 
     def _make_soup(self, url):
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, "html.parser")
+        with span("fetch", fetcher=type(self).__name__):
+            response = requests.get(url)
+            soup = BeautifulSoup(response.text, "html.parser")
 
         return soup
 
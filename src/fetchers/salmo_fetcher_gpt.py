@@ -1,4 +1,4 @@
-from clients import OpenAIClient
+from clients import ModelRouter, OpenAIClient
 from fetchers import Fetcher, SalmoFetcher
 
 
@@ -25,7 +25,7 @@ class SalmoFetcherGPT(Fetcher):
             }
         ]
         
-        return self._client.make_request(messages)
+        return self._client.make_request(messages, task=ModelRouter.TASK_SHORT)
 
     def fetch(self):
         # get psalm data from base fetcher
@@ -1,7 +1,9 @@
+import json
+import logging
 import random
 from datetime import datetime, timedelta
 
-from clients import OpenAIClient
+from clients import ModelRouter, OpenAIClient
 from fetchers import Fetcher
 from modules import AstroModule
 
@@ -14,9 +16,9 @@ class SignFetcherGPT(Fetcher):
         "Use termos coloquais como 'segundou', 'terçou', 'sextou' de forma totalmente irônica, para trazer mais "
         "proximidade com o leitor. Seja criativo e não use esses exatos termos, mas sim variações. Lembre-se que "
         "várias previsões serão feitas, uma para cada signo, então termos variados são importantes para não "
-        "repetir o mesmo 'segundou' várias vezes. As posições dos planetas e estrelas são: {planets}, use-as "
-        "com parcimônia, **sem** sobrecarregar o texto com informações astronômicas. Seja criativo e use-as de forma "
-        "sutil e natural. Não use uma estrutura fixa (exemplo: primeiro planetas, depois amor, depois trabalho, etc). "
+        "repetir o mesmo 'segundou' várias vezes. As posições dos planetas e estrelas são: {planets}{events}. "
+        "Use-os com parcimônia, **sem** sobrecarregar o texto com "
+        "informações astronômicas. Seja criativo e use-os de forma sutil e natural. Não use uma estrutura fixa (exemplo: primeiro planetas, depois amor, depois trabalho, etc). "
         "Inclua outros temas, mude a ordem, crie previsões diferenciadas e com personalidade. Crie narrativas "
         "envolventes e interessantes. Faça previsões ousadas, chute mesmo. Seja impessoal, sem nomes ou lugares. "
     )
@@ -55,68 +57,90 @@ class SignFetcherGPT(Fetcher):
         "direto e sem papas na língua",
     ]
 
+    COLOR_STYLES = [
+        "cores místicas e envolventes",
+        "tonalidades urbanas e modernas",
+        "cores da natureza e elementos",
+        "matizes emocionais e intensos",
+        "cores de pedras preciosas",
+        "tonalidades de alimentos e sabores",
+    ]
+
     PREDICTION_SIZE_CHARS = 420
 
+    # batch responses are validated per sign, anything outside these bounds is regenerated alone
+    BATCH_MIN_CHARS = PREDICTION_SIZE_CHARS // 2
+    BATCH_MAX_CHARS = PREDICTION_SIZE_CHARS * 2
+    BATCH_MAX_COLOR_CHARS = 40
+    BATCH_MAX_TOKENS = 4000
+
+    # personalized readings rewrite a shared base reading, so they get a short prompt and answer
+    VARIATION_SYSTEM_PROMPT = (
+        "Você é um astrólogo que adapta horóscopos já escritos para cada leitor, mantendo o tom e a "
+        "previsão de futuro, sem nomes ou lugares."
+    )
+    VARIATION_MAX_TOKENS = 300
+
     def __init__(self):
         super().__init__()
         self._image_url = "https://joaobidu.com.br/static/img/ico-{sign}.png"  # noqa
         self._client = OpenAIClient()
         self._astro = AstroModule()
 
-    def _fetch(self, sign):
+    def _make_system_prompt(self):
         now = datetime.utcnow() - timedelta(hours=3)
         today = now.strftime("%Y-%m-%d %H:%M:%S - %A")
 
         # planets
         now = now.isoformat()
         results = self._astro.get_astro_for_signs(now)
+        events = self._astro.format_astro_events(now)
+        events = f", e os eventos astrológicos do dia são: {events}" if events else ""
+
+        return SignFetcherGPT.MODEL_SYSTEM_PROMPT.format(today=today, planets=results, events=events)
+
+    def _make_horoscope_prompt(self, sign, mood, theme):
+        return (
+            f"Escreva um horóscopo para o signo de {sign} com tom {mood}, focando em {theme}. "
+            "Responda em um único parágrafo. Use seus conhecimentos astrológicos e características únicas do signo. "
+            "Seja engraçado e preciso, use metáforas, figuras de linguagem, sem clichês. "
+            "Seja claro, evite ambiguidades. Arrisque, seja sinistro. Não comece com 'signo', 'hoje', 'o signo', "
+            "ou outros inícios genéricos. Garanta que o texto seja atemporal, e que as previsões sejam sempre bem "
+            "diferentes umas das outras, explorando a personalidade única de cada signo. "
+            "Faça previsões arriscadas, seja o menos genérico possível. Seja muito ousado, dê conselhos e futuro "
+            "com exatidão (ex: 'você vai ganhar na loteria'), de forma unica e vidente, e sempre criativo, pra "
+            "garantir que a previsão seja incrível. O signo deve ter um papel central na previsão. A previsão deve "
+            "obrigatoriamente ter uma previsão de futuro específica baseada nos termos acima. Extrapole nos chutes."
+            f"Responda em aproximadamente {SignFetcherGPT.PREDICTION_SIZE_CHARS} caracteres (20% mais ou menos)"
+        )
+
+    def _make_variation_prompt(self, prediction, mood, theme):
+        return (
+            f"Reescreva o horóscopo abaixo para um leitor específico, com tom {mood} e dando mais peso a {theme}. "
+            "Mantenha a previsão de futuro, mude as metáforas e os detalhes. Responda em um único parágrafo, em "
+            f"aproximadamente {SignFetcherGPT.PREDICTION_SIZE_CHARS} caracteres.\n\n{prediction}"
+        )
+
+    def _make_guess_of_the_day(self, rng=random):
+        guesses = rng.sample(range(1, 100), 3)
+        guess_of_the_day = ", ".join([f"{guess}" for guess in sorted(guesses)])
+        return f"{guess_of_the_day}."
+
+    def _fetch(self, sign):
+        system_prompt = self._make_system_prompt()
 
         # horoscope prediction with randomized elements
         theme = random.choice(self.HOROSCOPE_THEMES)
         mood = random.choice(self.HOROSCOPE_MOODS)
 
-        system_prompt = SignFetcherGPT.MODEL_SYSTEM_PROMPT.format(
-            today=today, planets=results
-        )
         messages = [
             {"role": "system", "content": system_prompt},
-            {
-                "role": "user",
-                "content": f"Escreva um horóscopo para o signo de {sign} com tom {mood}, focando em {theme}. "
-                "Responda em um único parágrafo. Use seus conhecimentos astrológicos e características únicas do signo. "
-                "Seja engraçado e preciso, use metáforas, figuras de linguagem, sem clichês. "
-                "Seja claro, evite ambiguidades. Arrisque, seja sinistro. Não comece com 'signo', 'hoje', 'o signo', "
-                "ou outros inícios genéricos. Garanta que o texto seja atemporal, e que as previsões sejam sempre bem "
-                "diferentes umas das outras, explorando a personalidade única de cada signo. "
-                "Faça previsões arriscadas, seja o menos genérico possível. Seja muito ousado, dê conselhos e futuro "
-                "com exatidão (ex: 'você vai ganhar na loteria'), de forma unica e vidente, e sempre criativo, pra "
-                "garantir que a previsão seja incrível. O signo deve ter um papel central na previsão. A previsão deve "
-                "obrigatoriamente ter uma previsão de futuro específica baseada nos termos acima. Extrapole nos chutes."
-                f"Responda em aproximadamente {SignFetcherGPT.PREDICTION_SIZE_CHARS} caracteres (20% mais ou menos)",
-            },
+            {"role": "user", "content": self._make_horoscope_prompt(sign, mood, theme)},
         ]
         horoscope = self._client.make_request(messages)
 
-        # guess of the day
-        guesses = []
-        while len(guesses) < 3:
-            guess = random.randint(1, 99)
-            if guess not in guesses:
-                guesses.append(guess)
-        guesses = sorted(guesses)
-        guess_of_the_day = ", ".join([f"{guess}" for guess in guesses])
-        guess_of_the_day = f"{guess_of_the_day}."
-
         # color of the day with more variety
-        color_styles = [
-            "cores místicas e envolventes",
-            "tonalidades urbanas e modernas",
-            "cores da natureza e elementos",
-            "matizes emocionais e intensos",
-            "cores de pedras preciosas",
-            "tonalidades de alimentos e sabores",
-        ]
-        color_style = random.choice(color_styles)
+        color_style = random.choice(self.COLOR_STYLES)
 
         messages = [
             {"role": "system", "content": system_prompt},
@@ -127,17 +151,137 @@ class SignFetcherGPT(Fetcher):
                 "Seja criativo com nomes de cores como 'âmbar-elétrico', 'violeta-cósmico', 'verde-jade-místico'.",
             },
         ]
-        color_of_the_day = f"{self._client.make_request(messages)}"
+        color_of_the_day = f"{self._client.make_request(messages, task=ModelRouter.TASK_SHORT)}"
 
         return {
             "prediction": horoscope,
-            "guess_of_the_day": guess_of_the_day,
+            "guess_of_the_day": self._make_guess_of_the_day(),
             "color_of_the_day": color_of_the_day,
         }
 
+    def _make_batch_prompt(self, signs):
+        lines = []
+        for sign in signs:
+            theme = random.choice(self.HOROSCOPE_THEMES)
+            mood = random.choice(self.HOROSCOPE_MOODS)
+            color_style = random.choice(self.COLOR_STYLES)
+            lines.append(f'- "{sign}": tom {mood}, focando em {theme}, cor usando {color_style}')
+
+        signs_block = "\n".join(lines)
+        return (
+            "Escreva um horóscopo para cada um dos signos abaixo, cada um com seu próprio tom e tema:\n"
+            f"{signs_block}\n\n"
+            "Para cada signo, responda em um único parágrafo. Use seus conhecimentos astrológicos e características "
+            "únicas do signo. Seja engraçado e preciso, use metáforas, figuras de linguagem, sem clichês. "
+            "Seja claro, evite ambiguidades. Arrisque, seja sinistro. Não comece com 'signo', 'hoje', 'o signo', "
+            "ou outros inícios genéricos. Garanta que o texto seja atemporal, e que as previsões sejam bem "
+            "diferentes umas das outras, explorando a personalidade única de cada signo. Seja muito ousado, dê "
+            "conselhos e futuro com exatidão (ex: 'você vai ganhar na loteria'), de forma única e vidente. Cada "
+            "previsão deve obrigatoriamente ter uma previsão de futuro específica. Extrapole nos chutes. "
+            f"Cada previsão deve ter aproximadamente {SignFetcherGPT.PREDICTION_SIZE_CHARS} caracteres "
+            "(20% mais ou menos). Para cada signo, escolha também uma cor do dia com uma única palavra, evitando "
+            "cores simples como apenas 'Vermelho' ou 'Azul', como 'âmbar-elétrico', 'violeta-cósmico', "
+            "'verde-jade-místico'.\n\n"
+            "Responda somente com um objeto JSON, sem formatação markdown, no formato: "
+            '{"<signo>": {"previsao": "<texto>", "cor": "<cor>"}}, usando exatamente as chaves de signo acima.'
+        )
+
+    def _parse_batch(self, response):
+        """Extracts the JSON object from a batch response, tolerating code fences or stray text."""
+        start = response.find("{")
+        end = response.rfind("}")
+        if start == -1 or end <= start:
+            return {}
+
+        try:
+            parsed = json.loads(response[start : end + 1])
+        except json.JSONDecodeError as e:
+            logging.warning(f"Could not parse batch horoscope response: {e}")
+            return {}
+
+        return parsed if isinstance(parsed, dict) else {}
+
+    def _validate_batch_entry(self, entry):
+        if not isinstance(entry, dict):
+            return None
+
+        prediction = entry.get("previsao")
+        color = entry.get("cor")
+        if not isinstance(prediction, str) or not isinstance(color, str):
+            return None
+
+        prediction = prediction.strip()
+        color = color.strip().strip(".")
+        if not SignFetcherGPT.BATCH_MIN_CHARS <= len(prediction) <= SignFetcherGPT.BATCH_MAX_CHARS:
+            return None
+        if not color or " " in color or len(color) > SignFetcherGPT.BATCH_MAX_COLOR_CHARS:
+            return None
+
+        return {
+            "prediction": prediction,
+            "guess_of_the_day": self._make_guess_of_the_day(),
+            "color_of_the_day": color,
+        }
+
     def fetch(self, sign):
         data = self._fetch(sign)
         data["sign"] = sign
         data["image"] = self._image_url.format(sign=sign)
 
         return data
+
+    def fetch_variation(self, base, seed):
+        """A personalized version of a sign prediction with a single short request.
+
+        Args:
+            base (dict): Prediction from `fetch` or `fetch_all`, shared by everyone with the sign.
+            seed: Anything identifying the reader, such as the user id. The same reader gets
+                the same tone, theme and guesses for the same base.
+
+        Returns:
+            dict: Same format as `fetch`.
+        """
+        rng = random.Random(f"{seed}:{base['sign']}:{base.get('date')}")
+        mood = rng.choice(self.HOROSCOPE_MOODS)
+        theme = rng.choice(self.HOROSCOPE_THEMES)
+
+        messages = [
+            {"role": "system", "content": SignFetcherGPT.VARIATION_SYSTEM_PROMPT},
+            {"role": "user", "content": self._make_variation_prompt(base["prediction"], mood, theme)},
+        ]
+        prediction = self._client.make_request(
+            messages, max_tokens=SignFetcherGPT.VARIATION_MAX_TOKENS, task=ModelRouter.TASK_SHORT
+        )
+
+        return {**base, "prediction": prediction, "guess_of_the_day": self._make_guess_of_the_day(rng)}
+
+    def fetch_all(self, signs):
+        """Generates predictions for several signs in a single request, sharing the system
+        prompt. Signs missing from the response or failing validation fall back to `fetch`.
+
+        Returns:
+            dict: sign -> prediction data, same format as `fetch`.
+        """
+        signs = list(signs)
+        messages = [
+            {"role": "system", "content": self._make_system_prompt()},
+            {"role": "user", "content": self._make_batch_prompt(signs)},
+        ]
+        response = self._client.make_request(
+            messages, max_tokens=SignFetcherGPT.BATCH_MAX_TOKENS, task=ModelRouter.TASK_BATCH
+        )
+        batch = self._parse_batch(response)
+
+        predictions = {}
+        for sign in signs:
+            data = self._validate_batch_entry(batch.get(sign))
+            if data is None:
+                logging.info(f"Batch horoscope for {sign} failed validation, generating it alone.")
+                predictions[sign] = self.fetch(sign)
+                continue
+
+            data["sign"] = sign
+            data["image"] = self._image_url.format(sign=sign)
+            predictions[sign] = data
+
+        return predictions
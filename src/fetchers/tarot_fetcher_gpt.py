@@ -13,8 +13,8 @@ class TarotFetcherGPT(TarotFetcher):
         "Use linguagem poética, misteriosa e envolvente, com metáforas ligadas ao simbolismo das cartas. "
         "Seja dramático quando necessário, use elementos como 'véus do mistério', 'sussurros do destino', "
         "'energias ancestrais', 'portais do tempo'. Varie entre tons solenes, brincalhões, enigmáticos ou "
-        "irreverentes dependendo da carta. As energias cósmicas são: {planets} - use-as como inspiração "
-        "sutil, não como foco principal. Cada previsão deve ter uma personalidade única e imprevisível. "
+        "irreverentes dependendo da carta. As energias cósmicas são: {planets}{events} - use-as como "
+        "inspiração sutil, não como foco principal. Cada previsão deve ter uma personalidade única e imprevisível. "
         "Crie narrativas que soem como profecias ou revelações místicas, não conselhos astrológicos. "
         "Seja mais teatral e menos científico que um astrólogo. Use linguagem coloquial misturada com "
         "misticismo - como um oráculo moderno que fala gírias."
@@ -45,25 +45,28 @@ class TarotFetcherGPT(TarotFetcher):
         self._client = OpenAIClient()
         self._astro = AstroModule()
 
-    def _fetch(self, card):
+    def _fetch(self, card, position=None):
         now = datetime.utcnow() - timedelta(hours=3)
         today = now.strftime("%Y-%m-%d %H:%M:%S - %A")
 
         # persona info
-        category = TarotFetcher.tarot_map[card]
-        arcana_name = TarotFetcher.category_map[category]
-        arcanas = self._arcanas[category].values()
-        title = f"{card} ({arcana_name})"
+        tarot_card = self._catalog.get(card)
+        arcanas = tarot_card.persona_list()
+        title = f"{card} ({tarot_card.name})"
 
         # tarot prediction with randomized style
         now = now.isoformat()
         results = self._astro.get_astro_for_signs(now)
+        events = self._astro.format_astro_events(now)
+        events = f", com {events}" if events else ""
 
         # Add randomization for more variety
         tarot_reader = random.choice(self.TAROT_PERSONAS)
         narrative_style = random.choice(self.TAROT_STYLES)
 
-        system_prompt = self.TAROT_SYSTEM_PROMPT.format(today=today, planets=results)
+        system_prompt = self.TAROT_SYSTEM_PROMPT.format(today=today, planets=results, events=events)
+        # in a spread the card is read for its position
+        spread = f"A carta ocupa a posição '{position}' numa tiragem, interprete-a nessa posição. " if position else ""
         messages = [
             {"role": "system", "content": system_prompt},
             {
@@ -77,13 +80,13 @@ class TarotFetcherGPT(TarotFetcher):
                 f"diferente. Sem mencionar diretamente Persona, use sutilmente os dados: '{arcanas}'. "
                 "Faça revelações ousadas e específicas sobre o futuro, como se fosse uma visão mística real. "
                 "A carta deve ser o centro da revelação. Seja profético, não apenas conselheiro. Ouse nas profecias. "
-                f"Responda em aproximadamente {TarotFetcherGPT.PREDICTION_SIZE_CHARS} caracteres (20% mais ou menos)",
+                f"{spread}Responda em aproximadamente {TarotFetcherGPT.PREDICTION_SIZE_CHARS} caracteres (20% mais ou menos)",
             },
         ]
         body = self._client.make_request(messages)
 
         # fetch image
-        image = TarotFetcher.arcana_map[arcana_name]["url"]
+        image = tarot_card.image
 
         return {
             "title": title,
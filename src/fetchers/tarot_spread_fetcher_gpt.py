@@ -0,0 +1,46 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from fetchers import TarotFetcherGPT
+
+
+class TarotSpreadFetcherGPT(TarotFetcherGPT):
+    """Reads several cards at once, one generation per card.
+
+    Each spread gets its own pool with a worker per card, up to `MAX_WORKERS`,
+    so a spread takes about as long as its slowest card (a Celtic cross too)
+    and concurrent spreads don't queue behind each other.
+    """
+
+    MAX_WORKERS = 10
+
+    def fetch(self, cards, positions):
+        """
+        Args:
+            cards (list): Portuguese card names, see `TarotCatalog`.
+            positions (list): Position of each card in the spread, e.g. "Passado".
+
+        Returns:
+            dict: "cards" with one prediction per card, in spread order.
+        """
+        workers = max(1, min(len(cards), TarotSpreadFetcherGPT.MAX_WORKERS))
+        predictions = [None] * len(cards)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tarot_spread") as pool:
+            # each card runs in a copy of the caller's context, so its tokens count for the caller's chat
+            futures = {
+                pool.submit(contextvars.copy_context().run, self._fetch, card, position): index
+                for index, (card, position) in enumerate(zip(cards, positions))
+            }
+
+            # fill the slots as the generations finish, whatever their order
+            for future in as_completed(futures):
+                index = futures[future]
+                prediction = future.result()
+                predictions[index] = {
+                    "position": positions[index],
+                    "title": prediction["title"],
+                    "body": prediction["body"],
+                    "image": prediction["image"],
+                }
+
+        return {"cards": predictions}
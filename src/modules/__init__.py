@@ -1,6 +1,27 @@
-from .singleton import *
-from .astro_module import *
-from .prediction_module import *
-from .users_module import *
-from .privacy import *
-from .typo_tracker import *
+from utils import lazy_exports
+
+# exported name -> submodule, imported on first access
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        "Singleton": "singleton",
+        "DayTable": "day_table",
+        "AstroModule": "astro_module",
+        "PredictionModule": "prediction_module",
+        "UsersModule": "users_module",
+        "TarotUsersModule": "users_module",
+        "PrivacyManager": "privacy",
+        "TypoTracker": "typo_tracker",
+        "WebhookServer": "webhook_server",
+        "StateBackend": "state_backend",
+        "get_state_backend": "state_backend",
+        "MessageBuffer": "message_buffer",
+        "CommandThrottle": "rate_limiter",
+        "SendQueue": "send_queue",
+        "FuzzyIndex": "fuzzy_index",
+        "TarotCatalog": "tarot_catalog",
+        "Metrics": "metrics",
+        "MetricsServer": "metrics",
+        "TrafficCapture": "traffic_capture",
+    },
+)
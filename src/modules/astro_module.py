@@ -1,22 +1,57 @@
-import json
-from datetime import datetime
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 
-from astropy.coordinates import GeocentricTrueEcliptic, get_body, solar_system_ephemeris
-from astropy.time import Time
+import numpy as np
 from skyfield.api import load
+from skyfield.framelib import ecliptic_frame
 
+from modules import Singleton
+from modules.day_table import DayTable
+from modules.metrics import count, span
+
+
+class AstroModule(metaclass=Singleton):
+    # positions only change per day, a few days cover the BRT/UTC midnight overlap
+    REQUEST_CACHE_SIZE = 8
+    UNKNOWN = DayTable.MISSING
+    POSITIONS_PATH = "data/planet_data.bin"
+    EVENTS_PATH = "data/astro_events.bin"
+    # days built in the background when the events table is missing, see `events_table`
+    EVENTS_GENERATE_DAYS = 400
+
+    # (name, angle, orb) in degrees
+    ASPECTS = (
+        ("conjunção", 0, 8),
+        ("sextil", 60, 4),
+        ("quadratura", 90, 6),
+        ("trígono", 120, 6),
+        ("oposição", 180, 8),
+    )
+    MOON_PHASES = (
+        "Lua Nova",
+        "Lua Crescente",
+        "Quarto Crescente",
+        "Crescente Gibosa",
+        "Lua Cheia",
+        "Minguante Gibosa",
+        "Quarto Minguante",
+        "Lua Minguante",
+    )
 
-class AstroModule:
     def __init__(self):
+        # de440s only has barycenters for the planets, which is plenty for sign boundaries
         self.planets = {
-            "Mercúrio": "mercury",
-            "Vênus": "venus",
-            "Marte": "mars",
-            "Júpiter": "jupiter",
-            "Saturno": "saturn",
-            "Urano": "uranus",
-            "Netuno": "neptune",
-            "Plutão": "pluto",
+            "Mercúrio": "mercury barycenter",
+            "Vênus": "venus barycenter",
+            "Marte": "mars barycenter",
+            "Júpiter": "jupiter barycenter",
+            "Saturno": "saturn barycenter",
+            "Urano": "uranus barycenter",
+            "Netuno": "neptune barycenter",
+            "Plutão": "pluto barycenter",
             "Sol": "sun",
             "Lua": "moon",
         }
@@ -34,49 +69,285 @@ class AstroModule:
             "Aquário": (300, 330),
             "Peixes": (330, 360),
         }
-        self.ts = load.timescale()
-        self.planets_ephem = load("de440s.bsp")
-        self.request = {}
-        with open("data/planet_data.json", "r") as f:
-            self.calculated_positions = json.load(f)
-
-    def _get_planet_position(self, planet_key, datetime_obj):
-        time_obj = Time(datetime_obj)
-        with solar_system_ephemeris.set("de430"):
-            if planet_key == "sun":
-                coord = get_body("sun", time_obj).transform_to(GeocentricTrueEcliptic())
-            elif planet_key == "moon":
-                coord = get_body("moon", time_obj).transform_to(GeocentricTrueEcliptic())
-            else:
-                coord = get_body(planet_key, time_obj).transform_to(GeocentricTrueEcliptic())
-        ra = coord.lon.deg % 360
-        return ra, coord.lat.deg
-
-    def _determine_zodiac_sign(self, ra):
-        for sign, (ra_min, ra_max) in self.zodiac_signs.items():
-            if ra_min <= ra < ra_max:
-                return sign
-        return "Unknown"
+        # date -> bytes with one sign index per planet, in `self.planets` order
+        self.request = OrderedDict()
+        # date -> events record, see `compute_events`
+        self.events_request = OrderedDict()
+        self._request_lock = threading.Lock()
+        self._sign_names = tuple(self.zodiac_signs)
+        self._sign_index = {sign: index for index, sign in enumerate(self._sign_names)}
+
+        planet_names = tuple(self.planets)
+        self._pairs = [
+            (first, second) for first in range(len(planet_names)) for second in range(first + 1, len(planet_names))
+        ]
+        self._retrograde_planets = [index for index, name in enumerate(planet_names) if name not in ("Sol", "Lua")]
+        # one retrograde flag per planet, the moon phase and one aspect code per planet pair
+        self.events_record_size = len(planet_names) + 1 + len(self._pairs)
+
+        # the ephemeris and the day tables are only loaded on first use
+        self._ts = None
+        self._planets_ephem = None
+        self._position_table = None
+        self._events_table = None
+        self._events_generator = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def ts(self):
+        if self._ts is None:
+            with self._load_lock:
+                if self._ts is None:
+                    self._ts = load.timescale()
+        return self._ts
+
+    @property
+    def planets_ephem(self):
+        if self._planets_ephem is None:
+            with self._load_lock:
+                if self._planets_ephem is None:
+                    self._planets_ephem = load("de440s.bsp")
+        return self._planets_ephem
+
+    def _load_table(self, path, record_size):
+        try:
+            table = DayTable(path)
+            if table.record_size != record_size:
+                raise ValueError(f"expected {record_size}-byte records, got {table.record_size}")
+            return table
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load day table {path}: {e}")
+            return False
+
+    @property
+    def position_table(self):
+        """Precomputed sign indices per day (see `tools/planet_data_gen.py`), or None if missing."""
+        if self._position_table is None:
+            with self._load_lock:
+                if self._position_table is None:
+                    self._position_table = self._load_table(AstroModule.POSITIONS_PATH, len(self.planets))
+        return self._position_table or None
+
+    @property
+    def events_table(self):
+        """Precomputed retrogrades, moon phase and aspects per day, or None if missing.
+
+        A missing table is generated once in the background (see `generate_events_table`),
+        requests keep getting None until it is written.
+        """
+        if self._events_table is None:
+            with self._load_lock:
+                if self._events_table is None:
+                    path = AstroModule.EVENTS_PATH
+                    if not os.path.exists(path) and self._events_generator is None:
+                        logging.warning(f"Astro events table {path} is missing, generating it in the background")
+                        self._events_generator = threading.Thread(
+                            target=self.generate_events_table, args=(path,), name="astro_events", daemon=True
+                        )
+                        self._events_generator.start()
+                        self._events_table = False
+                    else:
+                        self._events_table = self._load_table(path, self.events_record_size)
+        return self._events_table or None
+
+    def generate_events_table(self, path):
+        """Writes the events of `EVENTS_GENERATE_DAYS` days from yesterday to `path`.
+        `tools/planet_data_gen.py` builds longer ranges.
+        """
+        try:
+            start = datetime.utcnow().date() - timedelta(days=1)
+            days = [start + timedelta(days=offset) for offset in range(AstroModule.EVENTS_GENERATE_DAYS)]
+            events = self.get_events_many(datetime(day.year, day.month, day.day) for day in days)
+
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            DayTable.ensure_range(path, days[0], days[-1], self.events_record_size)
+            DayTable.write_records(path, days[0], events)
+            logging.info(f"Generated astro events from {days[0]} to {days[-1]} in {path}")
+        except Exception:
+            logging.exception(f"Could not generate astro events table {path}")
+        finally:
+            # the next access loads what was written
+            with self._load_lock:
+                self._events_table = None
+
+    def make_times(self, datetime_objs):
+        # naive datetimes are taken as UTC, like astropy's `Time` did
+        datetime_objs = [
+            value if value.tzinfo is None else value.astimezone(timezone.utc).replace(tzinfo=None)
+            for value in datetime_objs
+        ]
+        return self.ts.utc(
+            np.array([value.year for value in datetime_objs]),
+            np.array([value.month for value in datetime_objs]),
+            np.array([value.day for value in datetime_objs]),
+            np.array([value.hour for value in datetime_objs]),
+            np.array([value.minute for value in datetime_objs]),
+            np.array([value.second + value.microsecond / 1e6 for value in datetime_objs]),
+        )
+
+    def get_longitudes(self, times):
+        """Apparent geocentric ecliptic longitudes (of date) in degrees.
+
+        Args:
+            times: skyfield `Time` array.
+
+        Returns:
+            np.ndarray: shape (len(times), len(self.planets)), in `self.planets` order.
+        """
+        observer = self.planets_ephem["earth"].at(times)
+        longitudes = np.empty((len(times), len(self.planets)))
+        for column, key in enumerate(self.planets.values()):
+            apparent = observer.observe(self.planets_ephem[key]).apparent()
+            _, lon, _ = apparent.frame_latlon(ecliptic_frame)
+            longitudes[:, column] = lon.degrees % 360
+
+        return longitudes
+
+    def longitudes_to_signs(self, longitudes):
+        """Bins longitudes into sign indices (0 = Áries), as uint8."""
+        return (np.floor(np.asarray(longitudes) / 30).astype(np.int64) % 12).astype(np.uint8)
+
+    def get_positions_many(self, datetime_objs):
+        """Sign indices for many datetimes in one vectorized ephemeris pass.
+
+        Returns:
+            np.ndarray: uint8 array with shape (len(datetime_objs), len(self.planets)).
+        """
+        datetime_objs = list(datetime_objs)
+        if not datetime_objs:
+            return np.empty((0, len(self.planets)), dtype=np.uint8)
+
+        times = self.make_times(datetime_objs)
+        return self.longitudes_to_signs(self.get_longitudes(times))
+
+    def compute_events(self, longitudes, next_longitudes):
+        """Encodes the astro events of each row of longitudes.
+
+        Args:
+            longitudes (np.ndarray): shape (days, planets), see `get_longitudes`.
+            next_longitudes (np.ndarray): the same bodies one day later, for retrogrades.
+
+        Returns:
+            np.ndarray: uint8 array with shape (days, `events_record_size`). Per row: one
+            retrograde flag per planet, the moon phase octant (index in `MOON_PHASES`) and
+            one code per planet pair in `_pairs` order (0 for none, else 1 + index in `ASPECTS`).
+        """
+        days = longitudes.shape[0]
+        planet_count = len(self.planets)
+        events = np.zeros((days, self.events_record_size), dtype=np.uint8)
+
+        # apparent motion against the zodiac, wrapped to (-180, 180]
+        motion = (next_longitudes - longitudes + 180) % 360 - 180
+        retrograde = motion < 0
+        events[:, self._retrograde_planets] = retrograde[:, self._retrograde_planets]
+
+        sun, moon = list(self.planets).index("Sol"), list(self.planets).index("Lua")
+        elongation = (longitudes[:, moon] - longitudes[:, sun]) % 360
+        events[:, planet_count] = np.floor((elongation + 22.5) / 45).astype(np.int64) % 8
+
+        first = np.array([pair[0] for pair in self._pairs])
+        second = np.array([pair[1] for pair in self._pairs])
+        separation = np.abs((longitudes[:, first] - longitudes[:, second] + 180) % 360 - 180)
+        codes = np.zeros(separation.shape, dtype=np.uint8)
+        best = np.full(separation.shape, np.inf)
+        for code, (_, angle, orb) in enumerate(AstroModule.ASPECTS, start=1):
+            distance = np.abs(separation - angle)
+            matches = (distance <= orb) & (distance < best)
+            codes[matches] = code
+            best[matches] = distance[matches]
+        events[:, planet_count + 1 :] = codes
+
+        return events
+
+    def get_events_many(self, datetime_objs):
+        """Astro events for many datetimes in one vectorized ephemeris pass, see `compute_events`."""
+        datetime_objs = list(datetime_objs)
+        if not datetime_objs:
+            return np.empty((0, self.events_record_size), dtype=np.uint8)
+
+        times = self.make_times(datetime_objs)
+        next_times = self.ts.tt_jd(times.tt + 1)
+        return self.compute_events(self.get_longitudes(times), self.get_longitudes(next_times))
+
+    def decode_events(self, code):
+        planet_names = list(self.planets)
+        planet_count = len(planet_names)
+
+        retrogrades = [planet_names[index] for index in range(planet_count) if code[index]]
+        aspects = []
+        for (first, second), aspect in zip(self._pairs, code[planet_count + 1 :]):
+            if aspect:
+                name = AstroModule.ASPECTS[aspect - 1][0]
+                aspects.append(f"{planet_names[first]} em {name} com {planet_names[second]}")
+
+        return {
+            "retrógrados": retrogrades,
+            "fase da lua": AstroModule.MOON_PHASES[code[planet_count]],
+            "aspectos": aspects,
+        }
 
     def get_positions(self, datetime_obj):
-        positions = {planet: self._get_planet_position(key, datetime_obj) for planet, key in self.planets.items()}
-        results = {}
-        for planet, (ra, dec) in positions.items():
-            if ra is not None and dec is not None:
-                zodiac_sign = self._determine_zodiac_sign(ra)
-                results[planet] = zodiac_sign
-            else:
-                results[planet] = "Unknown"
-        return results
+        return self.decode_positions(bytes(self.get_positions_many([datetime_obj])[0]))
+
+    def encode_positions(self, positions):
+        return bytes(self._sign_index.get(positions.get(planet), AstroModule.UNKNOWN) for planet in self.planets)
+
+    def decode_positions(self, code):
+        # every entry points at the same interned sign names
+        return {
+            planet: self._sign_names[index] if index != AstroModule.UNKNOWN else "Unknown"
+            for planet, index in zip(self.planets, code)
+        }
+
+    def _get_record(self, cache, table, datetime_str, compute=None):
+        """Day record from the LRU cache, the precomputed table or, as a last resort, `compute`.
+
+        The fetchers already pass BRT local time, so the date part is the BRT day
+        and the cache is keyed by it. Without `compute`, a day missing from the
+        table gives None.
+        """
+        datetime_obj = datetime.fromisoformat(datetime_str)
+        date_str = datetime_obj.strftime("%Y-%m-%d")
+
+        with self._request_lock:
+            code = cache.get(date_str)
+            if code is not None:
+                cache.move_to_end(date_str)
+        count("cache", cache="astro", result="miss" if code is None else "hit")
+
+        if code is None:
+            code = table.get(datetime_obj.date()) if table else None
+            if code is None:
+                if compute is None:
+                    return None
+                code = bytes(compute([datetime_obj])[0])
+
+            with self._request_lock:
+                cache[date_str] = code
+                while len(cache) > AstroModule.REQUEST_CACHE_SIZE:
+                    cache.popitem(last=False)
+
+        return code
 
     def get_astro_for_signs(self, datetime_str):
-        if datetime_str not in self.request:
-            datetime_obj = datetime.fromisoformat(datetime_str)
-            date_str = datetime_obj.strftime("%Y-%m-%d")
-            if date_str in self.calculated_positions:
-                results = self.calculated_positions[date_str]
-            else:
-                results = self.get_positions(datetime_obj)
-            self.request[datetime_str] = results
-
-        return self.request[datetime_str]
+        """Planet -> sign mapping for the day of `datetime_str`."""
+        with span("astro", op="signs"):
+            code = self._get_record(self.request, self.position_table, datetime_str, self.get_positions_many)
+            return self.decode_positions(code)
+
+    def get_astro_events(self, datetime_str):
+        """Retrogrades, moon phase and major aspects for the day of `datetime_str`,
+        or None if the day is not in the events table.
+        """
+        # computing events needs the ephemeris and two passes, too slow for a request
+        code = self._get_record(self.events_request, self.events_table, datetime_str)
+        return self.decode_events(code) if code is not None else None
+
+    def format_astro_events(self, datetime_str):
+        """Astro events of the day as a short Portuguese text for prompts, or None if unknown."""
+        events = self.get_astro_events(datetime_str)
+        if events is None:
+            return None
+        retrogrades = ", ".join(events["retrógrados"]) or "nenhum"
+        aspects = "; ".join(events["aspectos"]) or "nenhum"
+        return f"planetas retrógrados: {retrogrades}. Fase da lua: {events['fase da lua']}. Aspectos: {aspects}"
@@ -0,0 +1,147 @@
+import mmap
+import os
+import struct
+from datetime import date, timedelta
+
+
+class DayTable:
+    """Fixed-width records indexed by day, memory-mapped for O(1) lookups.
+
+    Layout: a 16-byte header (magic, version, record size, ordinal of the first
+    day, number of days) followed by one `record_size` record per day. Bytes set
+    to `MISSING` mark days that were never computed.
+    """
+
+    MAGIC = b"DAYT"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHiI")
+    MISSING = 0xFF
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.record_size, self._start, self.days = DayTable.HEADER.unpack_from(self._map, 0)
+        if magic != DayTable.MAGIC or version != DayTable.VERSION:
+            raise ValueError(f"{path} is not a day table (version {DayTable.VERSION})")
+
+        expected_size = DayTable.HEADER.size + self.days * self.record_size
+        if len(self._map) < expected_size:
+            raise ValueError(f"{path} is truncated: {len(self._map)} bytes, expected {expected_size}")
+
+    @property
+    def start(self):
+        return date.fromordinal(self._start)
+
+    @property
+    def end(self):
+        """Last day covered by the table."""
+        return date.fromordinal(self._start + self.days - 1)
+
+    def get(self, day):
+        """Record for `day` (a date), or None if out of range or never computed."""
+        index = day.toordinal() - self._start
+        if index < 0 or index >= self.days:
+            return None
+
+        offset = DayTable.HEADER.size + index * self.record_size
+        record = self._map[offset : offset + self.record_size]
+        if DayTable.MISSING in record:
+            return None
+
+        return record
+
+    def __contains__(self, day):
+        return self.get(day) is not None
+
+    def missing_days(self, start, end):
+        """Days between `start` and `end` (inclusive) without a record."""
+        missing = []
+        current = start
+        while current <= end:
+            if self.get(current) is None:
+                missing.append(current)
+            current += timedelta(days=1)
+        return missing
+
+    def close(self):
+        self._map.close()
+
+    @staticmethod
+    def write(path, start, records, record_size):
+        """Writes a complete table atomically.
+
+        Args:
+            path (str): Destination file.
+            start (date): Day of the first record.
+            records (iterable): One bytes-like record per day, `None` for missing days.
+            record_size (int): Width of each record in bytes.
+        """
+        missing = bytes([DayTable.MISSING]) * record_size
+        body = bytearray()
+        days = 0
+        for record in records:
+            record = missing if record is None else bytes(record)
+            if len(record) != record_size:
+                raise ValueError(f"Record for day {days} has {len(record)} bytes, expected {record_size}")
+            body += record
+            days += 1
+
+        header = DayTable.HEADER.pack(DayTable.MAGIC, DayTable.VERSION, record_size, start.toordinal(), days)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def ensure_range(path, start, end, record_size):
+        """Makes sure the table at `path` covers `start` to `end`, creating it or
+        growing it with missing records. Existing records are kept.
+        """
+        if not os.path.exists(path):
+            DayTable.write(path, start, [None] * ((end - start).days + 1), record_size)
+            return
+
+        table = DayTable(path)
+        try:
+            if table.record_size != record_size:
+                raise ValueError(f"{path} has {table.record_size}-byte records, expected {record_size}")
+            if table.start <= start and table.end >= end:
+                return
+
+            new_start = min(start, table.start)
+            new_end = max(end, table.end)
+            records = []
+            current = new_start
+            while current <= new_end:
+                records.append(table.get(current))
+                current += timedelta(days=1)
+        finally:
+            table.close()
+
+        DayTable.write(path, new_start, records, record_size)
+
+    @staticmethod
+    def write_records(path, start, records):
+        """Overwrites the records of consecutive days from `start` in place.
+        The table must already cover those days (see `ensure_range`).
+        """
+        with open(path, "r+b") as f:
+            header = f.read(DayTable.HEADER.size)
+            _, _, record_size, first_day, days = DayTable.HEADER.unpack(header)
+
+            index = start.toordinal() - first_day
+            body = b"".join(bytes(record) for record in records)
+            if index < 0 or index * record_size + len(body) > days * record_size:
+                raise ValueError(f"Records from {start} fall outside of {path}")
+            if len(body) != len(records) * record_size:
+                raise ValueError(f"Records must have {record_size} bytes each")
+
+            f.seek(DayTable.HEADER.size + index * record_size)
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
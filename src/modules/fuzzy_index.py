@@ -0,0 +1,80 @@
+import unicodedata
+from collections import Counter
+from difflib import get_close_matches
+
+
+def fold(text):
+    """Lowercase without accents, punctuation or emoji variation selectors, so
+    "Escorpião!" and "escorpiao" compare equal.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    kept = "".join(
+        char if not unicodedata.category(char).startswith("P") else " "
+        for char in decomposed
+        if unicodedata.category(char) != "Mn"
+    )
+    return " ".join(kept.split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[index : index + 3] for index in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """Maps free text to one of a fixed set of names, built once.
+
+    Lookups try, in order: the folded text, each of its words, the closest
+    name or alias by trigram overlap and, when no key reaches `cutoff` that
+    way, `difflib` over the folded keys with the same `cutoff`.
+    """
+
+    def __init__(self, names, aliases=None, cutoff=0.2):
+        """
+        Args:
+            names (iterable): Canonical names, returned by `match`.
+            aliases (dict): Extra spelling -> canonical name.
+            cutoff (float): Minimum similarity, from 0 to 1, for a fuzzy match.
+        """
+        self.cutoff = cutoff
+        self._exact = {}
+        for name in names:
+            self._exact[fold(name)] = name
+        for alias, name in (aliases or {}).items():
+            self._exact[fold(alias)] = name
+
+        self._keys = list(self._exact)
+        self._key_trigrams = [trigrams(key) for key in self._keys]
+        self._postings = {}  # trigram -> indices in `_keys`
+        for index, grams in enumerate(self._key_trigrams):
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(index)
+
+    def match(self, text):
+        """The canonical name closest to `text`, or None if nothing is close enough."""
+        query = fold(text)
+        if not query:
+            return None
+
+        name = self._exact.get(query)
+        if name is not None:
+            return name
+        for word in query.split():
+            name = self._exact.get(word)
+            if name is not None:
+                return name
+
+        query_trigrams = trigrams(query)
+        shared = Counter(index for gram in query_trigrams for index in self._postings.get(gram, ()))
+        if shared:
+            # dice coefficient, ties go to the key added first
+            def score(index):
+                return 2 * shared[index] / (len(query_trigrams) + len(self._key_trigrams[index]))
+
+            best = max(shared, key=lambda index: (score(index), -index))
+            if score(best) >= self.cutoff:
+                return self._exact[self._keys[best]]
+
+        # few or no shared trigrams, difflib still finds close spellings
+        matches = get_close_matches(query, self._keys, n=1, cutoff=self.cutoff)
+        return self._exact[matches[0]] if matches else None
@@ -0,0 +1,101 @@
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+from modules.state_backend import get_state_backend
+
+
+class MessageBuffer:
+    """The last `maxlen` messages of each chat, kept in memory and written behind to the state backend.
+
+    `append` only touches memory; a background thread stores the new messages of
+    every chat with one `extend` each `FLUSH_SECONDS` (sooner once `FLUSH_BATCH`
+    are pending, and on exit). A chat's buffer is read from the backend on first
+    use and, when the backend is shared with other instances, again after
+    `REFRESH_SECONDS`, so messages handled elsewhere show up a few seconds late.
+    """
+
+    FLUSH_SECONDS = 1
+    FLUSH_BATCH = 200
+    REFRESH_SECONDS = 2
+
+    def __init__(self, namespace, maxlen, state=None):
+        self.namespace = namespace
+        self.maxlen = maxlen
+        self._state = state or get_state_backend()
+        self._buffers = {}  # chat id -> deque of messages
+        self._loaded = {}  # chat id -> when it was read from the backend
+        self._pending = {}  # chat id -> messages not stored yet
+        self._count = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+        atexit.register(self.flush)
+
+    def _start_flusher(self):
+        # called with the lock held
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._run, name=f"{self.namespace}_flusher", daemon=True)
+            self._flusher.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.FLUSH_SECONDS)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logging.exception(f"Could not store {self.namespace}")
+
+    def _buffer(self, chat_id):
+        """The chat's buffer, (re)read from the backend when missing or stale."""
+        with self._lock:
+            buffer = self._buffers.get(chat_id)
+            loaded = self._loaded.get(chat_id, 0)
+        if buffer is not None and (not self._state.shared or time.monotonic() - loaded < self.REFRESH_SECONDS):
+            return buffer
+
+        stored = self._state.get_list(self.namespace, chat_id)
+        with self._lock:
+            # messages appended here but not flushed yet aren't in the backend
+            buffer = deque(stored, maxlen=self.maxlen)
+            buffer.extend(self._pending.get(chat_id, ()))
+            self._buffers[chat_id] = buffer
+            self._loaded[chat_id] = time.monotonic()
+        return buffer
+
+    def get(self, chat_id):
+        """A copy of the chat's messages, oldest first."""
+        buffer = self._buffer(chat_id)
+        with self._lock:
+            return list(buffer)
+
+    def append(self, chat_id, message):
+        buffer = self._buffer(chat_id)
+        with self._lock:
+            buffer.append(message)
+            self._pending.setdefault(chat_id, []).append(message)
+            self._count += 1
+            self._start_flusher()
+            if self._count >= self.FLUSH_BATCH:
+                self._wake.set()
+
+    def flush(self):
+        """Stores the messages appended since the last flush, one write per chat."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._count = 0
+
+        chats = list(pending)
+        for index, chat_id in enumerate(chats):
+            try:
+                self._state.extend(self.namespace, chat_id, pending[chat_id], maxlen=self.maxlen)
+            except Exception:
+                # keep the ones not stored, ahead of newer messages, for the next flush
+                with self._lock:
+                    for unstored in chats[index:]:
+                        self._pending[unstored] = pending[unstored] + self._pending.get(unstored, [])
+                        self._count += len(pending[unstored])
+                raise
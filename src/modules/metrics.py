@@ -0,0 +1,160 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from modules import Singleton
+
+
+def quantiles(values, pcts):
+    """nearest-rank quantiles of an unsorted list, sorted once"""
+    ordered = sorted(values)
+    return [ordered[max(1, math.ceil(pct * len(ordered))) - 1] for pct in pcts]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _series(name, labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return name
+    return name + "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class Summary:
+    """Count and sum of every observation, quantiles over the last `window` ones."""
+
+    def __init__(self, window):
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=window)
+
+
+class Metrics(metaclass=Singleton):
+    """Process-wide timings and counters, rendered in the Prometheus text format.
+
+    Timings are summaries with p50, p95 and p99 over a rolling window, counters
+    only go up. Both are keyed by name and labels.
+    """
+
+    PREFIX = "bidu_"
+    WINDOW = 1024
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self):
+        self._summaries = {}  # name -> labels -> Summary
+        self._counters = {}  # name -> labels -> value
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            summary = series.get(key)
+            if summary is None:
+                summary = series[key] = Summary(Metrics.WINDOW)
+            summary.count += 1
+            summary.sum += value
+            summary.samples.append(value)
+
+    def inc(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Times the block into the `<name>_seconds` summary, failed or not."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - start, **labels)
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def render(self):
+        with self._lock:
+            summaries = {
+                name: {key: (summary.count, summary.sum, list(summary.samples)) for key, summary in series.items()}
+                for name, series in self._summaries.items()
+            }
+            counters = {name: dict(series) for name, series in self._counters.items()}
+
+        # sorting happens outside the lock, so scrapes don't hold up requests
+        lines = []
+        for name, series in sorted(summaries.items()):
+            metric = Metrics.PREFIX + name
+            lines.append(f"# TYPE {metric} summary")
+            for labels, (count, total, samples) in sorted(series.items()):
+                for pct, value in zip(Metrics.QUANTILES, quantiles(samples, Metrics.QUANTILES)):
+                    lines.append(f"{_series(metric, labels, [('quantile', pct)])} {value}")
+                lines.append(f"{_series(metric + '_sum', labels)} {total}")
+                lines.append(f"{_series(metric + '_count', labels)} {count}")
+
+        for name, series in sorted(counters.items()):
+            metric = f"{Metrics.PREFIX}{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{_series(metric, labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def span(name, **labels):
+    return Metrics().span(name, **labels)
+
+
+def count(name, value=1, **labels):
+    Metrics().inc(name, value, **labels)
+
+
+class MetricsServer:
+    """Serves `Metrics` on `GET /metrics` for a local Prometheus scraper."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, listen="127.0.0.1", port=9464):
+        self._httpd = ThreadingHTTPServer((listen, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    def _make_handler(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                body = Metrics().render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", MetricsServer.CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # scrapes every few seconds would drown the bot logs
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, name="metrics_server", daemon=True).start()
+        logging.info(f"Serving metrics on port {self.port}")
+
+    def stop(self):
+        self._httpd.shutdown()
@@ -1,22 +1,38 @@
-from datetime import datetime, timedelta
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
 
-from fetchers import SignFetcherGPT, TarotFetcherGPT, SalmoFetcherGPT
-from modules import Singleton
+from fetchers import SignFetcherGPT, TarotFetcherGPT, TarotSpreadFetcherGPT, SalmoFetcherGPT
+from modules import Singleton, get_state_backend
+from modules.metrics import count
+from modules.token_usage import TokenUsage, current_request, usage_context
 
 
 class PredictionModule(metaclass=Singleton):
+    # personalized readings kept in memory, least recently used are dropped first
+    VARIATION_CACHE_SIZE = 4096
+
     def __init__(self):
         self._users = {}
+        self._variations = OrderedDict()  # (userid, sign) -> prediction
+        self._variations_lock = threading.Lock()
         self._fetchers = {
             "sign": SignFetcherGPT(),
             "tarot": TarotFetcherGPT(),
+            "tarot_spread": TarotSpreadFetcherGPT(),
             "salmo": SalmoFetcherGPT(),
         }
-        self._predictions = {
-            "sign": {},
-            "tarot": {},
-            "salmo": {},
-        }
+        # predictions are shared between bot instances so everyone gets the same one
+        self._state = get_state_backend()
+
+    def _namespace(self, prediction_type):
+        return f"predictions:{prediction_type}"
+
+    def _ttl(self):
+        # keep predictions until the end of the day (BRT)
+        now_brt = datetime.utcnow() + timedelta(hours=-3)
+        midnight = datetime.combine(now_brt.date() + timedelta(days=1), datetime.min.time())
+        return (midnight - now_brt).total_seconds()
 
     def _make_prediction(self, module, **kwargs):
         if module not in self._fetchers:
@@ -27,7 +43,7 @@ class PredictionModule(metaclass=Singleton):
         date = date.date()
         fetcher = self._fetchers[module]
         data = fetcher.fetch(**kwargs)
-        data["date"] = date
+        data["date"] = date.isoformat()
 
         return data
 
@@ -37,21 +53,114 @@ class PredictionModule(metaclass=Singleton):
         now_brt = now_utc + brt_offset
         now_brt = now_brt.date()
 
-        return now_brt > request_date
+        return now_brt > date.fromisoformat(request_date)
+
+    def _get_cached(self, prediction_type, cache_key):
+        """Today's prediction if it was already generated, otherwise None."""
+        namespace = self._namespace(prediction_type)
+        prediction = self._state.get(namespace, cache_key)
+        if prediction and not self._is_expired(prediction["date"]):
+            count("cache", cache=prediction_type, result="hit")
+            return prediction
+        if prediction:
+            self._state.delete(namespace, cache_key)
+        count("cache", cache=prediction_type, result="miss")
+        return None
+
+    def _get_prediction(self, prediction_type, cache_key, shared=True, **kwargs):
+        prediction = self._get_cached(prediction_type, cache_key)
+        if prediction:
+            return prediction
 
-    def _get_prediction(self, prediction_type, cache_key, **kwargs):
-        prediction = self._predictions[prediction_type].get(cache_key, None)
-        if not prediction or self._is_expired(prediction["date"]):
+        namespace = self._namespace(prediction_type)
+        if shared:
+            # everyone gets this one, so it is neither charged to nor degraded for the chat that asked first
+            with usage_context(current_request()[0], None):
+                prediction = self._make_prediction(prediction_type, **kwargs)
+        else:
             prediction = self._make_prediction(prediction_type, **kwargs)
 
-        self._predictions[prediction_type][cache_key] = prediction
-        return prediction
+        # another instance may have generated it meanwhile, keep theirs
+        return self._state.setdefault(namespace, cache_key, prediction, ttl=self._ttl())
 
     def get_sign_prediction(self, sign):
         return self._get_prediction("sign", sign, sign=sign)
 
+    def get_cached_sign_prediction(self, sign):
+        return self._get_cached("sign", sign)
+
+    def get_cached_personal_sign_prediction(self, userid, sign):
+        key = (userid, sign)
+        with self._variations_lock:
+            prediction = self._variations.get(key)
+            if prediction is not None and self._is_expired(prediction["date"]):
+                del self._variations[key]
+                prediction = None
+            if prediction is not None:
+                self._variations.move_to_end(key)
+        count("cache", cache="personal_sign", result="miss" if prediction is None else "hit")
+        return prediction
+
+    def get_personal_sign_prediction(self, userid, sign):
+        """The user's own take on today's sign prediction. Everyone with the sign shares
+        the full generation, each user only costs a short rewrite of it.
+        """
+        prediction = self.get_cached_personal_sign_prediction(userid, sign)
+        if prediction:
+            return prediction
+
+        base = self.get_sign_prediction(sign)
+        if TokenUsage().over_budget():
+            # the chat spent its tokens for today, the shared reading costs nothing more
+            return base
+
+        prediction = self._fetchers["sign"].fetch_variation(base, userid)
+        if not prediction["prediction"]:
+            # the rewrite failed, don't keep an empty reading for the rest of the day
+            return base
+
+        with self._variations_lock:
+            self._variations[(userid, sign)] = prediction
+            while len(self._variations) > PredictionModule.VARIATION_CACHE_SIZE:
+                self._variations.popitem(last=False)
+
+        return prediction
+
+    def pregenerate_sign_predictions(self, signs):
+        """Fills the sign cache for every missing or expired sign with a single batch request."""
+        namespace = self._namespace("sign")
+        missing = []
+        for sign in signs:
+            prediction = self._state.get(namespace, sign)
+            if not prediction or self._is_expired(prediction["date"]):
+                missing.append(sign)
+        if not missing:
+            return
+
+        brt_offset = timedelta(hours=-3)
+        today = (datetime.utcnow() + brt_offset).date()
+        predictions = self._fetchers["sign"].fetch_all(missing)
+        for sign, data in predictions.items():
+            data["date"] = today.isoformat()
+            self._state.set(namespace, sign, data, ttl=self._ttl())
+
     def get_tarot_prediction(self, card):
         return self._get_prediction("tarot", card, card=card)
 
+    def get_cached_tarot_prediction(self, card):
+        return self._get_cached("tarot", card)
+
+    def get_tarot_spread_prediction(self, userid, spread, cards, positions):
+        # spreads are drawn per user, so they are cached per user
+        return self._get_prediction(
+            "tarot_spread", f"{userid}:{spread}", shared=False, cards=cards, positions=positions
+        )
+
+    def get_cached_tarot_spread_prediction(self, userid, spread):
+        return self._get_cached("tarot_spread", f"{userid}:{spread}")
+
     def get_salmo_prediction(self):
         return self._get_prediction("salmo", "daily")
+
+    def get_cached_salmo_prediction(self):
+        return self._get_cached("salmo", "daily")
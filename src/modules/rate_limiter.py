@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+
+from environment import Environment
+from modules import Singleton
+
+
+class TokenBucketLimiter:
+    """One token bucket per key, refilled at `rate` tokens per second up to `burst`.
+
+    Only the `max_keys` most recently used buckets are kept; a bucket that is
+    dropped comes back full, which only errs on the side of letting requests through.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, last refill)
+        self._lock = threading.Lock()
+
+    def _refill(self, key, now):
+        tokens, last = self._buckets.pop(key, (self.burst, now))
+        return min(self.burst, tokens + (now - last) * self.rate)
+
+    def _store(self, key, tokens, now):
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+    def allow(self, key, now=None):
+        """Takes a token for `key` if one is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens = self._refill(key, now)
+            allowed = tokens >= 1
+            self._store(key, tokens - 1 if allowed else tokens, now)
+            return allowed
+
+    def wait_time(self, key, now=None):
+        """Seconds until `allow` would succeed for `key`, without taking a token."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            return 0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def refund(self, key, now=None):
+        """Gives back a token taken by `allow` for a request that was rejected elsewhere."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._store(key, min(self.burst, self._refill(key, now) + 1), now)
+
+
+class RequestCoalescer:
+    """Remembers requests for `window` seconds so identical repeats can be dropped."""
+
+    def __init__(self, window, max_keys=10000):
+        self.window = window
+        self.max_keys = max_keys
+        self._seen = OrderedDict()  # key -> expires at, oldest first
+        self._lock = threading.Lock()
+
+    def claim(self, key, now=None):
+        """True for the first request with `key` in the window, False for repeats."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # entries are inserted in expiry order, so expired ones are at the front
+            while self._seen and (next(iter(self._seen.values())) <= now or len(self._seen) >= self.max_keys):
+                self._seen.popitem(last=False)
+
+            if key in self._seen:
+                return False
+
+            self._seen[key] = now + self.window
+            return True
+
+
+class CommandThrottle(metaclass=Singleton):
+    """Rate limits and coalescing shared by every command.
+
+    Limits are per process; behind several instances each one enforces its own.
+    """
+
+    DUPLICATE = "duplicate"
+    RATE_LIMITED = "rate_limited"
+
+    def __init__(self):
+        env = Environment()
+        self._users = TokenBucketLimiter(env.command_user_rate / 60, env.command_user_burst)
+        self._chats = TokenBucketLimiter(env.command_chat_rate / 60, env.command_chat_burst)
+        self._coalescer = RequestCoalescer(env.command_coalesce_seconds)
+        self._notified = set()  # (chat, user) already told to slow down
+        self._lock = threading.Lock()
+
+    def check(self, user_id, chat_id, request_key):
+        """Returns None when the command may run, otherwise why it was dropped
+        (`DUPLICATE` or `RATE_LIMITED`).
+
+        Only requests within the rate limits claim `request_key`, so a rejected
+        one doesn't swallow the retry. A duplicate gets no reply of its own, the
+        reply to the first request is the only one, even in private chats.
+        """
+        if not self._users.allow(user_id):
+            return CommandThrottle.RATE_LIMITED
+        if not self._chats.allow(chat_id):
+            self._users.refund(user_id)
+            return CommandThrottle.RATE_LIMITED
+
+        if not self._coalescer.claim(request_key):
+            # repeats are free, they don't count against the limits
+            self._users.refund(user_id)
+            self._chats.refund(chat_id)
+            return CommandThrottle.DUPLICATE
+
+        with self._lock:
+            self._notified.discard((chat_id, user_id))
+        return None
+
+    def should_notify(self, user_id, chat_id):
+        """True only for the first rejection in a row, so the warning itself can't flood the chat."""
+        with self._lock:
+            if (chat_id, user_id) in self._notified:
+                return False
+            if len(self._notified) >= 10000:
+                self._notified.clear()
+            self._notified.add((chat_id, user_id))
+            return True
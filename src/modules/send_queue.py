@@ -0,0 +1,244 @@
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from telegram.error import RetryAfter
+
+from modules.metrics import span
+from modules.rate_limiter import TokenBucketLimiter
+
+
+class SendJob:
+    def __init__(self, method, name, chat_id, priority, seq, args, kwargs, action_key=None):
+        self.method = method
+        self.name = name
+        self.chat_id = chat_id
+        self.priority = priority
+        self.seq = seq
+        self.args = args
+        self.kwargs = kwargs
+        self.action_key = action_key
+        self.retries = 0
+        self.future = Future()
+
+    @property
+    def order(self):
+        return (self.priority, self.seq)
+
+
+class QueuedBot:
+    """Stands in for `telegram.Bot`, routing outgoing calls through a `SendQueue`.
+
+    Queued methods accept extra `priority` and `block` keywords. By default they
+    block until the call is made and return its result; with `block=False` they
+    return a `Future` right away. Chat actions never block. Everything else is
+    forwarded to the wrapped bot untouched.
+    """
+
+    QUEUED_METHODS = {
+        "send_message",
+        "edit_message_text",
+        "send_chat_action",
+        "send_photo",
+        "delete_message",
+    }
+
+    def __init__(self, bot, send_queue):
+        self._bot = bot
+        self._send_queue = send_queue
+
+    def __getattr__(self, name):
+        attr = getattr(self._bot, name)
+        if name not in QueuedBot.QUEUED_METHODS:
+            return attr
+
+        def call(*args, priority=None, block=True, **kwargs):
+            chat_id = kwargs.get("chat_id", args[0] if args else None)
+            future = self._send_queue.submit(attr, name, chat_id, args, kwargs, priority)
+            if name == "send_chat_action":
+                return True
+            if not block:
+                return future
+            # time spent queued counts, it is part of what the user waits for
+            with span("telegram", method=name):
+                return future.result()
+
+        return call
+
+
+class SendQueue:
+    """Schedules every outgoing Telegram call.
+
+    Calls are made in priority order while respecting a global rate and a
+    per-chat rate (stricter for groups). A `RetryAfter` pauses that chat and
+    puts the call back in the queue. Typing actions are merged: one already
+    waiting or shown in the last few seconds makes another redundant.
+    """
+
+    PRIORITY_REPLY = 0  # answers to commands
+    PRIORITY_ACTION = 1  # chat actions
+    PRIORITY_NOTICE = 2  # messages nobody asked for (typo alerts, throttling notices)
+
+    CHAT_BURST = 3
+    GROUP_BURST = 5
+    MAX_RETRIES = 3
+    ACTION_SECONDS = 4  # telegram shows a chat action for about 5 seconds
+
+    def __init__(self, global_rate=30, chat_rate=1, group_rate=20, workers=4):
+        """
+        Args:
+            global_rate (float): Calls per second across all chats.
+            chat_rate (float): Calls per second in a private chat.
+            group_rate (float): Calls per minute in a group.
+            workers (int): Calls made concurrently (always to different chats).
+        """
+        self._workers = workers
+        self._global = TokenBucketLimiter(global_rate, max(1, global_rate))
+        self._chats = TokenBucketLimiter(chat_rate, SendQueue.CHAT_BURST)
+        self._groups = TokenBucketLimiter(group_rate / 60, SendQueue.GROUP_BURST)
+
+        self._jobs = []
+        self._seq = itertools.count()
+        self._in_flight = set()  # chats with a call being made, keeps each chat in order
+        self._paused_until = {}  # chat -> monotonic time, set by RetryAfter
+        self._pending_actions = {}  # (chat, action) -> queued job
+        self._last_actions = {}  # (chat, action) -> monotonic time it was sent
+        self._cond = threading.Condition()
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="send_queue")
+        self._thread = threading.Thread(target=self._run, name="send_queue_scheduler", daemon=True)
+        self._thread.start()
+
+    def wrap(self, bot):
+        return QueuedBot(bot, self)
+
+    def _limiter(self, chat_id):
+        # groups and channels have negative ids
+        if isinstance(chat_id, int) and chat_id < 0:
+            return self._groups
+        return self._chats
+
+    def submit(self, method, name, chat_id, args, kwargs, priority=None):
+        if priority is None:
+            priority = SendQueue.PRIORITY_ACTION if name == "send_chat_action" else SendQueue.PRIORITY_REPLY
+
+        action_key = None
+        if name == "send_chat_action":
+            action_key = (chat_id, kwargs.get("action", args[1] if len(args) > 1 else None))
+
+        with self._cond:
+            if action_key is not None:
+                if action_key in self._pending_actions:
+                    return self._pending_actions[action_key].future
+
+                last_sent = self._last_actions.get(action_key)
+                if last_sent is not None and time.monotonic() - last_sent < SendQueue.ACTION_SECONDS:
+                    future = Future()
+                    future.set_result(True)
+                    return future
+
+            job = SendJob(method, name, chat_id, priority, next(self._seq), args, kwargs, action_key)
+            if action_key is not None:
+                self._pending_actions[action_key] = job
+            self._jobs.append(job)
+            self._cond.notify_all()
+
+        return job.future
+
+    def _next_job(self, now):
+        """Pops the first job allowed to run now. Otherwise returns how long to wait."""
+        global_wait = self._global.wait_time(None, now)
+        if global_wait > 0:
+            return None, global_wait
+
+        delay = None
+        for job in sorted(self._jobs, key=lambda job: job.order):
+            if job.chat_id in self._in_flight:
+                continue
+
+            wait = max(
+                self._limiter(job.chat_id).wait_time(job.chat_id, now),
+                self._paused_until.get(job.chat_id, now) - now,
+            )
+            if wait <= 0:
+                self._paused_until.pop(job.chat_id, None)
+                self._global.allow(None, now)
+                self._limiter(job.chat_id).allow(job.chat_id, now)
+                self._jobs.remove(job)
+                return job, None
+
+            delay = wait if delay is None else min(delay, wait)
+
+        return None, delay
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # only hand out a job when a worker can take it, so waiting jobs stay in priority order
+                job, delay = None, None
+                if len(self._in_flight) < self._workers:
+                    job, delay = self._next_job(time.monotonic())
+                if job is None:
+                    # woken up early by new jobs and finished calls
+                    self._cond.wait(delay)
+                    continue
+
+                self._in_flight.add(job.chat_id)
+                if job.action_key is not None:
+                    self._pending_actions.pop(job.action_key, None)
+
+            self._executor.submit(self._execute, job)
+
+    def _execute(self, job):
+        try:
+            result = job.method(*job.args, **job.kwargs)
+        except RetryAfter as e:
+            logging.warning(f"Flood control on chat {job.chat_id} ({job.name}), retrying in {e.retry_after}s")
+            with self._cond:
+                self._in_flight.discard(job.chat_id)
+                self._paused_until[job.chat_id] = time.monotonic() + e.retry_after
+                job.retries += 1
+                if job.retries <= SendQueue.MAX_RETRIES:
+                    self._jobs.append(job)
+                else:
+                    job.future.set_exception(e)
+                self._cond.notify_all()
+            return
+        except Exception as e:
+            with self._cond:
+                self._in_flight.discard(job.chat_id)
+                self._cond.notify_all()
+            job.future.set_exception(e)
+            return
+
+        with self._cond:
+            self._in_flight.discard(job.chat_id)
+            self._record_sent(job)
+            self._cond.notify_all()
+        job.future.set_result(result)
+
+    def _record_sent(self, job):
+        now = time.monotonic()
+        if job.action_key is not None:
+            self._last_actions[job.action_key] = now
+        else:
+            # a message ends the chat action, the next one has to be sent again
+            self._last_actions = {key: sent for key, sent in self._last_actions.items() if key[0] != job.chat_id}
+
+        if len(self._last_actions) > 1000:
+            self._last_actions = {
+                key: sent for key, sent in self._last_actions.items() if now - sent < SendQueue.ACTION_SECONDS
+            }
+
+    def join(self, timeout=None):
+        """Waits until every queued call has been made."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._jobs or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
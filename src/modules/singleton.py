@@ -1,8 +1,15 @@
+import threading
+
+
 class Singleton(type):
     _instances = {}
+    # reentrant, since singletons build other singletons in their constructors
+    _lock = threading.RLock()
 
     def __call__(cls, *args, **kwargs):
         if cls not in cls._instances:
-            instance = super().__call__(*args, **kwargs)
-            cls._instances[cls] = instance
+            with Singleton._lock:
+                if cls not in cls._instances:
+                    instance = super().__call__(*args, **kwargs)
+                    cls._instances[cls] = instance
         return cls._instances[cls]
@@ -0,0 +1,298 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class StateBackend:
+    """Key-value store for state that must be shared between bot instances.
+
+    Keys live in a namespace and values must be JSON serializable; they are
+    stored encoded, so every read returns a fresh copy that has to be written
+    back with `set` after changing it. Lists built with `append` or `extend`
+    are read with `get_list`.
+    """
+
+    # whether other processes may change the state, so copies kept in memory go stale
+    shared = True
+
+    def get(self, namespace, key, default=None):
+        raise NotImplementedError
+
+    def set(self, namespace, key, value, ttl=None):
+        """Stores `value`, dropping it after `ttl` seconds when given."""
+        raise NotImplementedError
+
+    def set_many(self, namespace, items, ttl=None):
+        """Stores every key -> value of `items`, in a single round trip where the backend allows."""
+        for key, value in items.items():
+            self.set(namespace, key, value, ttl=ttl)
+
+    def delete(self, namespace, key):
+        raise NotImplementedError
+
+    def append(self, namespace, key, value, maxlen=None):
+        """Atomically appends to a list, keeping only the last `maxlen` items."""
+        self.extend(namespace, key, [value], maxlen=maxlen)
+
+    def extend(self, namespace, key, values, maxlen=None):
+        """Atomically appends every one of `values` to a list, keeping only the last `maxlen` items."""
+        raise NotImplementedError
+
+    def setdefault(self, namespace, key, value, ttl=None):
+        """Stores `value` unless the key is already set. Returns the stored value."""
+        raise NotImplementedError
+
+    def get_list(self, namespace, key):
+        return self.get(namespace, key, [])
+
+    @staticmethod
+    def from_url(url):
+        """Builds a backend from `memory`, `sqlite:///path/to/state.db` or `redis://host:port/db`."""
+        if not url or url == "memory":
+            return MemoryStateBackend()
+        if url.startswith("sqlite:///"):
+            # sqlite:///data/state.db is relative, sqlite:////var/lib/bidu/state.db absolute
+            return SQLiteStateBackend(url[len("sqlite:///") :])
+        if url.startswith(("redis://", "rediss://", "unix://")):
+            return RedisStateBackend(url)
+
+        raise ValueError(f"Unknown state backend: {url}")
+
+
+class MemoryStateBackend(StateBackend):
+    """Per-process state. The default; only suitable for a single instance."""
+
+    shared = False
+
+    def __init__(self):
+        self._data = {}  # (namespace, key) -> (encoded value, expires at)
+        self._lock = threading.Lock()
+
+    def _read(self, namespace, key):
+        entry = self._data.get((namespace, str(key)))
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[(namespace, str(key))]
+            return None
+
+        return value
+
+    def get(self, namespace, key, default=None):
+        with self._lock:
+            value = self._read(namespace, key)
+        return default if value is None else json.loads(value)
+
+    def set(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[(namespace, str(key))] = (json.dumps(value), expires_at)
+
+    def set_many(self, namespace, items, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        encoded = {str(key): json.dumps(value) for key, value in items.items()}
+        with self._lock:
+            for key, value in encoded.items():
+                self._data[(namespace, key)] = (value, expires_at)
+
+    def setdefault(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            current = self._read(namespace, key)
+            if current is not None:
+                return json.loads(current)
+            self._data[(namespace, str(key))] = (json.dumps(value), expires_at)
+        return value
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._data.pop((namespace, str(key)), None)
+
+    def extend(self, namespace, key, values, maxlen=None):
+        with self._lock:
+            current = self._read(namespace, key)
+            items = json.loads(current) if current is not None else []
+            items.extend(values)
+            if maxlen is not None:
+                items = items[-maxlen:]
+            self._data[(namespace, str(key))] = (json.dumps(items), None)
+
+
+class SQLiteStateBackend(StateBackend):
+    """State in a SQLite file, shared by every process on the same host."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # one connection per thread, sqlite connections can't be shared
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+
+    @property
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        # take the write lock up front so read-modify-write can't interleave between processes
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _read(self, conn, namespace, key):
+        row = conn.execute(
+            "SELECT value, expires_at FROM state WHERE namespace = ? AND key = ?", (namespace, str(key))
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None
+
+        return value
+
+    def _write(self, conn, namespace, key, value, expires_at):
+        conn.execute(
+            "INSERT OR REPLACE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, str(key), json.dumps(value), expires_at),
+        )
+
+    def get(self, namespace, key, default=None):
+        value = self._read(self._conn, namespace, key)
+        return default if value is None else json.loads(value)
+
+    def set(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._transaction() as conn:
+            # expired rows are only cleaned up on writes, reads just skip them
+            conn.execute("DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+            self._write(conn, namespace, key, value, expires_at)
+
+    def set_many(self, namespace, items, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+            conn.executemany(
+                "INSERT OR REPLACE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                [(namespace, str(key), json.dumps(value), expires_at) for key, value in items.items()],
+            )
+
+    def setdefault(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._transaction() as conn:
+            current = self._read(conn, namespace, key)
+            if current is not None:
+                return json.loads(current)
+            self._write(conn, namespace, key, value, expires_at)
+        return value
+
+    def delete(self, namespace, key):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, str(key)))
+
+    def extend(self, namespace, key, values, maxlen=None):
+        with self._transaction() as conn:
+            current = self._read(conn, namespace, key)
+            items = json.loads(current) if current is not None else []
+            items.extend(values)
+            if maxlen is not None:
+                items = items[-maxlen:]
+            self._write(conn, namespace, key, items, None)
+
+
+class RedisStateBackend(StateBackend):
+    """State in Redis (or anything speaking its protocol), shared across hosts."""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The redis state backend needs the `redis` package (pip install redis).")
+
+        self._redis = redis.Redis.from_url(url)
+
+    def _key(self, namespace, key):
+        return f"bidu:{namespace}:{key}"
+
+    def get(self, namespace, key, default=None):
+        value = self._redis.get(self._key(namespace, key))
+        return default if value is None else json.loads(value)
+
+    def set(self, namespace, key, value, ttl=None):
+        self._redis.set(self._key(namespace, key), json.dumps(value), px=int(ttl * 1000) if ttl is not None else None)
+
+    def set_many(self, namespace, items, ttl=None):
+        px = int(ttl * 1000) if ttl is not None else None
+        pipeline = self._redis.pipeline()
+        for key, value in items.items():
+            pipeline.set(self._key(namespace, key), json.dumps(value), px=px)
+        pipeline.execute()
+
+    def setdefault(self, namespace, key, value, ttl=None):
+        px = int(ttl * 1000) if ttl is not None else None
+        if self._redis.set(self._key(namespace, key), json.dumps(value), px=px, nx=True):
+            return value
+
+        current = self._redis.get(self._key(namespace, key))
+        # the other value may have expired in between
+        return value if current is None else json.loads(current)
+
+    def delete(self, namespace, key):
+        self._redis.delete(self._key(namespace, key))
+
+    def extend(self, namespace, key, values, maxlen=None):
+        # native lists, so appends from several instances don't race
+        pipeline = self._redis.pipeline()
+        pipeline.rpush(self._key(namespace, key), *(json.dumps(value) for value in values))
+        if maxlen is not None:
+            pipeline.ltrim(self._key(namespace, key), -maxlen, -1)
+        pipeline.execute()
+
+    def get_list(self, namespace, key):
+        return [json.loads(value) for value in self._redis.lrange(self._key(namespace, key), 0, -1)]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_state_backend():
+    """Process-wide backend configured by the `STATE_BACKEND` env var (default: memory)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                url = os.getenv("STATE_BACKEND", "memory")
+                _backend = StateBackend.from_url(url)
+                logging.info(f"Using {type(_backend).__name__} for shared state")
+    return _backend
@@ -0,0 +1,85 @@
+import json
+from types import MappingProxyType
+from typing import NamedTuple
+
+from modules import Singleton
+from modules.fuzzy_index import FuzzyIndex, fold
+
+
+class TarotCard(NamedTuple):
+    number: int  # position in the deck, 0 to 21
+    numeral: str
+    name: str  # as in the Persona wiki, e.g. "Fool"
+    portuguese: str  # the name predictions are made for, e.g. "o louco"
+    aliases: tuple
+    image: str
+    description: str
+    personas: tuple  # read-only mappings, see `persona_list`
+
+    def persona_list(self):
+        """The personas as plain lists and dicts, for messages and the state backend."""
+        return [
+            {**persona, "characters": [dict(character) for character in persona["characters"]]}
+            for persona in self.personas
+        ]
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class TarotCatalog(metaclass=Singleton):
+    """Every tarot card, loaded once from the compiled `data/tarot_catalog.json`
+    (see `tools/tarot_catalog_gen.py`) and never modified.
+    """
+
+    PATH = "data/tarot_catalog.json"
+    CUTOFF = 0.2
+
+    def __init__(self, path=None):
+        with open(path or TarotCatalog.PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.cards = tuple(
+            TarotCard(
+                number=card["number"],
+                numeral=card["numeral"],
+                name=card["name"],
+                portuguese=card["portuguese"],
+                aliases=tuple(card["aliases"]),
+                image=card["image"],
+                description=card["description"],
+                personas=freeze(card["personas"]),
+            )
+            for card in data["cards"]
+        )
+
+        # folded name, numeral or alias -> card
+        index = {}
+        for card in self.cards:
+            for key in (card.numeral, card.name, card.portuguese, *card.aliases):
+                index.setdefault(fold(key), card)
+        self._index = MappingProxyType(index)
+
+        # free text goes through the fuzzy index, by english name and portuguese names
+        aliases = {alias: card.name for card in self.cards for alias in (card.portuguese, *card.aliases)}
+        self._by_name = {card.name: card for card in self.cards}
+        self._fuzzy = FuzzyIndex(self._by_name, aliases, cutoff=TarotCatalog.CUTOFF)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def get(self, key):
+        """Card by portuguese name, english name, numeral or alias, ignoring case and
+        accents, or None.
+        """
+        return self._index.get(fold(key))
+
+    def match(self, text):
+        """Closest card to free text such as a command argument, or None."""
+        name = self._fuzzy.match(text)
+        return self._by_name[name] if name is not None else None
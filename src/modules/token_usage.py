@@ -0,0 +1,90 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from environment import Environment
+from modules import Singleton
+from modules.metrics import count
+
+# (command, chat id) of the update being handled, read by the model client
+_request = contextvars.ContextVar("token_usage_request", default=(None, None))
+
+
+@contextmanager
+def usage_context(command, chat_id):
+    """Tags every model call made inside the block, in this thread or in tasks started
+    with a copy of its context, with the command and chat it was made for.
+    """
+    token = _request.set((command, chat_id))
+    try:
+        yield
+    finally:
+        _request.reset(token)
+
+
+def current_request():
+    return _request.get()
+
+
+class TokenUsage(metaclass=Singleton):
+    """Tokens spent today (BRT) per chat, command and model, and the per-chat budget.
+
+    A chat over `CHAT_DAILY_TOKENS` is not refused anything: its requests go to
+    the fast model with fewer tokens, and answers that have a shared cached
+    version use it. Counts are kept per process.
+    """
+
+    # completion limit for requests from chats over their budget
+    DEGRADED_MAX_TOKENS = 150
+
+    def __init__(self, daily_budget=None):
+        self.daily_budget = Environment().chat_daily_tokens if daily_budget is None else daily_budget
+        self._day = None
+        self._chats = {}  # chat id -> tokens today
+        self._usage = {}  # (chat id, command, model) -> [prompt tokens, completion tokens] today
+        self._lock = threading.Lock()
+
+    def _today(self):
+        return (datetime.utcnow() - timedelta(hours=3)).date()
+
+    def _roll(self):
+        # called with the lock held, the counts start over every day
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._chats.clear()
+            self._usage.clear()
+
+    def record(self, model, task, prompt_tokens, completion_tokens):
+        """Counts a model call against the command and chat of the current context."""
+        command, chat_id = current_request()
+        count("llm_tokens", prompt_tokens, command=command or "none", task=task, model=model, kind="prompt")
+        count("llm_tokens", completion_tokens, command=command or "none", task=task, model=model, kind="completion")
+
+        with self._lock:
+            self._roll()
+            usage = self._usage.setdefault((chat_id, command, model), [0, 0])
+            usage[0] += prompt_tokens
+            usage[1] += completion_tokens
+            if chat_id is not None:
+                self._chats[chat_id] = self._chats.get(chat_id, 0) + prompt_tokens + completion_tokens
+
+    def spent(self, chat_id):
+        with self._lock:
+            self._roll()
+            return self._chats.get(chat_id, 0)
+
+    def usage(self):
+        """(chat id, command, model) -> (prompt tokens, completion tokens) spent today."""
+        with self._lock:
+            self._roll()
+            return {key: tuple(value) for key, value in self._usage.items()}
+
+    def over_budget(self, chat_id=None):
+        """True when the chat, by default the one in the current context, spent its tokens for today."""
+        if chat_id is None:
+            chat_id = current_request()[1]
+        if not self.daily_budget or chat_id is None:
+            return False
+        return self.spent(chat_id) >= self.daily_budget
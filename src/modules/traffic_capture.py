@@ -0,0 +1,93 @@
+import atexit
+import gzip
+import hashlib
+import json
+import re
+import secrets
+import string
+import threading
+import time
+
+_WORD = re.compile(r"\w+")
+
+
+def read_traffic(path):
+    """Records of a capture file, oldest first: {"t": unix time, "c": chat, "u": user, "x": text},
+    with "p": 1 for photo captions.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class TrafficCapture:
+    """Appends anonymized group messages to a gzip JSON lines file, for `tools/traffic_replay.py`.
+
+    Chats and users become numbers, and every word of the text a pseudo-word of
+    the same length, all derived from a key that only lives in this process: the
+    same word or user maps to the same value within a run, so repeated typos and
+    who repeated them survive, but nothing can be mapped back. Words that trigger
+    handlers (the summary's "6 falam") are kept. Lines are written in batches of
+    `FLUSH_LINES`, or when `FLUSH_SECONDS` passed since the last write, and on exit.
+    """
+
+    FLUSH_LINES = 200
+    FLUSH_SECONDS = 10
+    KEEP_WORDS = {"6", "falam", "vcs", "ces", "ceis", "seis", "voces", "vocês"}
+
+    def __init__(self, path):
+        self.path = path
+        self._key = secrets.token_bytes(16)
+        self._lines = []
+        self._flushed = time.monotonic()
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def _digest(self, value, size):
+        return hashlib.blake2b(str(value).encode(), key=self._key, digest_size=size).digest()
+
+    def _pseudo_id(self, value):
+        return int.from_bytes(self._digest(value, 6), "big")
+
+    def _pseudo_word(self, match):
+        word = match.group(0)
+        if word.lower() in TrafficCapture.KEEP_WORDS:
+            return word
+        # case-insensitive, like the typo detector
+        digest = self._digest(word.lower(), 64)
+        return "".join(string.ascii_lowercase[digest[i % 64] % 26] for i in range(len(word)))
+
+    def anonymize(self, text):
+        return _WORD.sub(self._pseudo_word, text)
+
+    def add(self, timestamp, chat_id, user_id, text, caption=False):
+        record = {
+            "t": round(timestamp, 3),
+            "c": self._pseudo_id(chat_id),
+            "u": self._pseudo_id(user_id),
+            "x": self.anonymize(text),
+        }
+        if caption:
+            record["p"] = 1
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+        with self._lock:
+            self._lines.append(line)
+            due = len(self._lines) >= self.FLUSH_LINES or time.monotonic() - self._flushed >= self.FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def record(self, message):
+        text = message.text or message.caption
+        if text:
+            self.add(time.time(), message.chat_id, message.from_user.id, text, caption=not message.text)
+
+    def flush(self):
+        with self._lock:
+            lines, self._lines = self._lines, []
+            self._flushed = time.monotonic()
+            if lines:
+                # each flush appends a gzip member, readers see one stream
+                with gzip.open(self.path, "at", encoding="utf-8") as file:
+                    file.write("".join(lines))
@@ -3,6 +3,8 @@ import logging
 import os
 from typing import Dict, List, Tuple
 
+from modules.metrics import span
+
 
 class TypoTracker:
     def __init__(self, data_dir: str = "data"):
@@ -18,7 +20,7 @@ class TypoTracker:
 
     def _load_data(self) -> Dict[str, Dict]:
         try:
-            with open(self.typo_file, 'r', encoding='utf-8') as f:
+            with span("typo_io", op="load"), open(self.typo_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except (FileNotFoundError, json.JSONDecodeError) as e:
             logging.warning(f"Failed to load typo data: {e}, initializing empty data")
@@ -26,7 +28,7 @@ class TypoTracker:
 
     def _save_data(self, data: Dict[str, Dict]) -> None:
         try:
-            with open(self.typo_file, 'w', encoding='utf-8') as f:
+            with span("typo_io", op="save"), open(self.typo_file, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
         except Exception as e:
             logging.error(f"Failed to save typo data: {e}")
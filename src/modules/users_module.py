@@ -1,24 +1,131 @@
-class UsersModule:
-    def __init__(self):
-        self._users = {}
+import atexit
+import logging
+import threading
+import time
+
+from modules import Singleton, get_state_backend
+
+
+class UserRecord:
+    """One user in memory. Slots instead of a dict per user keep large user bases small."""
+
+    FIELDS = ("userid", "display_name", "sign", "card", "request_date")
+
+    __slots__ = FIELDS + ("last_used", "dirty")
+
+    def __init__(self, userid, display_name=None, sign=None, card=None, request_date=None):
+        self.userid = userid
+        self.display_name = display_name
+        self.sign = sign
+        self.card = card
+        self.request_date = request_date
+        self.last_used = time.monotonic()
+        self.dirty = False
+
+    @classmethod
+    def from_dict(cls, userid, data):
+        # older records may miss fields, userid included
+        return cls(userid, **{field: data.get(field) for field in UserRecord.FIELDS if field != "userid"})
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in UserRecord.FIELDS}
+
+    def update(self, data):
+        for field in UserRecord.FIELDS:
+            if field in data:
+                setattr(self, field, data[field])
+
+
+class UsersModule(metaclass=Singleton):
+    """Users loaded from the state backend on first use and kept in memory while active.
+
+    Changes are written behind: `save_user` only marks the record, and a background
+    thread stores every changed record in one batch each `FLUSH_SECONDS` (sooner once
+    `FLUSH_BATCH` are pending, and on exit). Records unused for `IDLE_SECONDS` are
+    dropped from memory once they are stored. Other instances sharing the backend
+    may read a change up to `FLUSH_SECONDS` late.
+
+    Users are returned as dicts, which are copies: change them and call `save_user`.
+    """
+
+    NAMESPACE = "users"
+    FLUSH_SECONDS = 5
+    FLUSH_BATCH = 100
+    IDLE_SECONDS = 30 * 60
+
+    def __init__(self, state=None):
+        self._state = state or get_state_backend()
+        self._records = {}  # userid -> UserRecord
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+        atexit.register(self.flush)
+
+    def _start_flusher(self):
+        # called with the lock held
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._run, name=f"{self.NAMESPACE}_flusher", daemon=True)
+            self._flusher.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.FLUSH_SECONDS)
+            self._wake.clear()
+            try:
+                self.flush()
+                self.evict_idle()
+            except Exception:
+                logging.exception(f"Could not store {self.NAMESPACE}")
+
+    def _load(self, userid):
+        """The user's record, read from the backend if not in memory, or None."""
+        with self._lock:
+            record = self._records.get(userid)
+        if record is None:
+            data = self._state.get(self.NAMESPACE, userid)
+            if data is None:
+                return None
+            with self._lock:
+                # another thread may have loaded or created it meanwhile
+                record = self._records.setdefault(userid, UserRecord.from_dict(userid, data))
+
+        record.last_used = time.monotonic()
+        return record
+
+    def _mark_dirty(self, record):
+        # called with the lock held
+        if not record.dirty:
+            record.dirty = True
+            self._dirty += 1
+        self._start_flusher()
+        if self._dirty >= self.FLUSH_BATCH:
+            self._wake.set()
 
     def get_user(self, userid):
-        if userid not in self._users:
+        record = self._load(userid)
+        if record is None:
             return None
-
-        return self._users[userid]
+        with self._lock:
+            return record.to_dict()
 
     def add_user(self, userid, display_name):
-        self._users[userid] = {
-            "display_name": display_name,
-            "sign": None,
-            "card": None,
-            "userid": userid,
-        }
+        record = UserRecord(userid, display_name)
+        with self._lock:
+            self._records[userid] = record
+            self._mark_dirty(record)
+
+    def save_user(self, userid, user):
+        record = self._load(userid)
+        with self._lock:
+            # put it back if it was evicted since it was loaded
+            record = self._records.setdefault(userid, record or UserRecord(userid))
+            record.update(user)
+            self._mark_dirty(record)
 
     def update_user(self, userid, **kwargs):
-        user = self.get_user(userid)
-        if not user:
+        record = self._load(userid)
+        if record is None:
             return
 
         # if any of the params is None, we should not update the user.
@@ -26,5 +133,43 @@ class UsersModule:
         if any(value is None for value in kwargs.values()):
             return
 
-        for key, value in kwargs.items():
-            user[key] = value
+        with self._lock:
+            record = self._records.setdefault(userid, record)
+            record.update(kwargs)
+            self._mark_dirty(record)
+
+    def flush(self):
+        """Stores every changed record in a single batch."""
+        with self._lock:
+            items = {userid: record.to_dict() for userid, record in self._records.items() if record.dirty}
+
+        if not items:
+            return
+
+        # records stay dirty until stored, so `evict_idle` can't drop them meanwhile,
+        # and a failed write leaves them for the next flush
+        self._state.set_many(self.NAMESPACE, items)
+
+        with self._lock:
+            for userid, stored in items.items():
+                record = self._records.get(userid)
+                # changed again while being stored, the next flush takes it
+                if record is not None and record.dirty and record.to_dict() == stored:
+                    record.dirty = False
+                    self._dirty -= 1
+
+    def evict_idle(self):
+        """Drops stored records unused for `IDLE_SECONDS` from memory."""
+        cutoff = time.monotonic() - self.IDLE_SECONDS
+        with self._lock:
+            idle = [
+                userid for userid, record in self._records.items() if not record.dirty and record.last_used < cutoff
+            ]
+            for userid in idle:
+                del self._records[userid]
+
+
+class TarotUsersModule(UsersModule):
+    """Users of `/tarot_old`, whose cards come from another source and are kept apart."""
+
+    NAMESPACE = "tarot_users"
@@ -0,0 +1,143 @@
+import json
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telegram import Update
+
+
+class WebhookServer:
+    """Receives Telegram updates over HTTP and processes them on a worker pool.
+
+    Updates are acknowledged as soon as they are queued. Repeated `update_id`s
+    (Telegram redelivers when it doesn't get a timely 200) are dropped, and when
+    the queue is full the server answers 503 with `Retry-After` so Telegram
+    backs off instead of piling up work.
+    """
+
+    RETRY_AFTER = 1
+    MAX_BODY_SIZE = 1024 * 1024
+
+    def __init__(self, dispatcher, url_path, listen="0.0.0.0", port=8443, workers=4, queue_size=100, dedup_size=1000):
+        self.dispatcher = dispatcher
+        self.url_path = "/" + url_path.strip("/")
+        self.workers = workers
+        self.dedup_size = dedup_size
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._seen = OrderedDict()  # update_id -> None, oldest first
+        self._seen_lock = threading.Lock()
+        self._threads = []
+
+        self._httpd = ThreadingHTTPServer((listen, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                status, headers = server.receive(self.path, self._read_body())
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _read_body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > WebhookServer.MAX_BODY_SIZE:
+                    return None
+                return self.rfile.read(length)
+
+            def log_message(self, format, *args):
+                # one line per update is too noisy, errors are logged by `receive`
+                pass
+
+        return Handler
+
+    def _is_duplicate(self, update_id):
+        with self._seen_lock:
+            if update_id in self._seen:
+                return True
+
+            self._seen[update_id] = None
+            if len(self._seen) > self.dedup_size:
+                self._seen.popitem(last=False)
+            return False
+
+    def _forget(self, update_id):
+        with self._seen_lock:
+            self._seen.pop(update_id, None)
+
+    def receive(self, path, body):
+        """Queues a raw update. Returns the HTTP status and extra headers."""
+        if path != self.url_path:
+            return 404, {}
+
+        try:
+            data = json.loads(body)
+            update_id = data["update_id"]
+        except (TypeError, ValueError, KeyError):
+            logging.warning("Webhook received an invalid update.")
+            return 400, {}
+
+        if self._is_duplicate(update_id):
+            logging.info(f"Dropping duplicate update {update_id}")
+            return 200, {}
+
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            # let Telegram deliver it again once the workers catch up
+            self._forget(update_id)
+            logging.warning(f"Update queue full, rejecting update {update_id}")
+            return 503, {"Retry-After": str(WebhookServer.RETRY_AFTER)}
+
+        return 200, {}
+
+    def _work(self):
+        while True:
+            data = self._queue.get()
+            try:
+                if data is None:
+                    return
+
+                update = Update.de_json(data, self.dispatcher.bot)
+                self.dispatcher.process_update(update)
+            except Exception:
+                logging.exception("Failed to process update from webhook")
+            finally:
+                self._queue.task_done()
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"webhook_worker_{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        thread = threading.Thread(target=self._httpd.serve_forever, name="webhook_server", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logging.info(f"Webhook server listening on port {self.port} with {self.workers} workers")
+
+    def join(self):
+        """Waits until every queued update has been processed."""
+        self._queue.join()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+        # workers finish what is already queued before picking up their stop marker
+        for _ in range(self.workers):
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
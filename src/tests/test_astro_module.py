@@ -0,0 +1,148 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.astro_module import AstroModule
+
+
+class TestAstroModuleCache(unittest.TestCase):
+    def setUp(self):
+        # a fresh instance, the ephemeris is never loaded since `compute` is faked
+        self.astro = AstroModule.__new__(AstroModule)
+        AstroModule.__init__(self.astro)
+        self.computed = []
+
+    def compute(self, datetime_objs):
+        self.computed.extend(datetime_objs)
+        return [bytes([datetime_objs[0].day])]
+
+    def test_same_day_shares_one_entry(self):
+        for datetime_str in ("2024-05-10T00:00:01", "2024-05-10T12:30:00", "2024-05-10T23:59:59"):
+            code = self.astro._get_record(self.astro.request, None, datetime_str, self.compute)
+            self.assertEqual(code, bytes([10]))
+
+        self.assertEqual(len(self.computed), 1)
+        self.assertEqual(list(self.astro.request), ["2024-05-10"])
+
+    def test_cache_is_bounded(self):
+        for day in range(1, 2 * AstroModule.REQUEST_CACHE_SIZE + 1):
+            self.astro._get_record(self.astro.request, None, f"2024-05-{day:02d}T12:00:00", self.compute)
+            self.assertLessEqual(len(self.astro.request), AstroModule.REQUEST_CACHE_SIZE)
+
+        # the oldest days were dropped, the latest ones are kept
+        self.assertNotIn("2024-05-01", self.astro.request)
+        self.assertIn(f"2024-05-{2 * AstroModule.REQUEST_CACHE_SIZE:02d}", self.astro.request)
+
+
+class TestAstroModuleEvents(unittest.TestCase):
+    def setUp(self):
+        self.astro = AstroModule.__new__(AstroModule)
+        AstroModule.__init__(self.astro)
+        self.names = list(self.astro.planets)
+        self.count = len(self.names)
+
+    def longitudes(self, **positions):
+        row = np.zeros((1, self.count))
+        for name, longitude in positions.items():
+            row[0, self.names.index(name)] = longitude
+        return row
+
+    def events(self, longitudes, next_longitudes=None):
+        next_longitudes = longitudes + 1 if next_longitudes is None else next_longitudes
+        return self.astro.compute_events(longitudes, next_longitudes)[0]
+
+    def pair_code(self, events, first, second):
+        pair = self.astro._pairs.index((self.names.index(first), self.names.index(second)))
+        return events[self.count + 1 + pair]
+
+    def test_moon_phase_octants(self):
+        cases = [(0, 0), (22, 0), (23, 1), (90, 2), (180, 4), (270, 6), (337.6, 0), (350, 0)]
+        for elongation, octant in cases:
+            # the sun sits just before 0° so the elongation has to wrap
+            longitudes = self.longitudes(Sol=350, Lua=(350 + elongation) % 360)
+            self.assertEqual(self.events(longitudes)[self.count], octant, elongation)
+
+        decoded = self.astro.decode_events(self.events(self.longitudes(Sol=10, Lua=190)))
+        self.assertEqual(decoded["fase da lua"], "Lua Cheia")
+
+    def test_aspects_and_orbs(self):
+        cases = [
+            ((358, 3), "conjunção"),  # 5° apart across 0°
+            ((355, 5), None),  # 10° apart, outside the 8° orb
+            ((10, 73), "sextil"),
+            ((10, 75), None),  # 65° is past the 4° sextil orb and short of the quadratura one
+            ((10, 104), "quadratura"),
+            ((10, 125), "trígono"),
+            ((10, 185), "oposição"),
+            ((350, 175), "oposição"),
+        ]
+        for (mercury, venus), aspect in cases:
+            events = self.events(self.longitudes(Mercúrio=mercury, Vênus=venus, Marte=200, Júpiter=230))
+            code = self.pair_code(events, "Mercúrio", "Vênus")
+            expected = 0 if aspect is None else [a[0] for a in AstroModule.ASPECTS].index(aspect) + 1
+            self.assertEqual(code, expected, (mercury, venus))
+
+        decoded = self.astro.decode_events(self.events(self.longitudes(Mercúrio=10, Vênus=125, Marte=200, Júpiter=230)))
+        self.assertIn("Mercúrio em trígono com Vênus", decoded["aspectos"])
+
+    def test_retrogrades_wrap_around(self):
+        longitudes = self.longitudes(Marte=359.5, Júpiter=0.5, Saturno=100, Sol=0.5, Lua=10)
+        next_longitudes = self.longitudes(Marte=0.5, Júpiter=359.5, Saturno=100.2, Sol=359.5, Lua=9)
+        events = self.events(longitudes, next_longitudes)
+
+        decoded = self.astro.decode_events(events)
+        # crossing 0° forwards is direct motion, backwards is retrograde; the sun and moon are never flagged
+        self.assertEqual(decoded["retrógrados"], ["Júpiter"])
+        self.assertFalse(events[self.names.index("Sol")])
+        self.assertFalse(events[self.names.index("Lua")])
+
+    def test_missing_events_day_is_not_computed(self):
+        self.astro._events_table = False
+        self.assertIsNone(self.astro.format_astro_events("2024-05-10T12:00:00"))
+        self.assertIsNone(self.astro._planets_ephem)
+
+
+class TestAstroModuleEventsGeneration(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "data", "astro_events.bin")
+        self.astro = AstroModule.__new__(AstroModule)
+        AstroModule.__init__(self.astro)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def fake_events(self, datetime_objs):
+        # the day of the month as moon phase, no ephemeris needed
+        datetime_objs = list(datetime_objs)
+        events = np.zeros((len(datetime_objs), self.astro.events_record_size), dtype=np.uint8)
+        events[:, len(self.astro.planets)] = [value.day % 8 for value in datetime_objs]
+        return events
+
+    def test_missing_table_is_generated_in_the_background(self):
+        with mock.patch.object(AstroModule, "EVENTS_PATH", self.path), \
+                mock.patch.object(self.astro, "get_events_many", side_effect=self.fake_events) as get_events_many:
+            with self.assertLogs(level="WARNING"):
+                self.assertIsNone(self.astro.events_table)
+            self.astro._events_generator.join(timeout=10)
+
+            table = self.astro.events_table
+            self.assertIsNotNone(table)
+            # loaded from disk from then on, not generated again
+            self.assertIs(self.astro.events_table, table)
+            self.assertEqual(get_events_many.call_count, 1)
+
+            today = datetime.utcnow()
+            self.assertEqual(table.get(today.date())[len(self.astro.planets)], today.day % 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import threading
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from commands.salmo import Salmo
+from modules.rate_limiter import CommandThrottle, RequestCoalescer, TokenBucketLimiter
+
+
+class FakeBot:
+    def __init__(self):
+        self.calls = []
+
+    def send_message(self, **kwargs):
+        self.calls.append(("send_message", kwargs["text"]))
+        return {"message_id": len(self.calls)}
+
+    def send_chat_action(self, **kwargs):
+        self.calls.append(("send_chat_action", kwargs["action"]))
+
+    def edit_message_text(self, **kwargs):
+        self.calls.append(("edit_message_text", kwargs["text"]))
+
+
+class FakePredictionModule:
+    def __init__(self, cached):
+        self.cached = cached
+        self.generated = 0
+
+    def get_cached_salmo_prediction(self):
+        return self.cached
+
+    def get_salmo_prediction(self):
+        self.generated += 1
+        return {"date": "2024-05-10", "title": "Salmo 23", "key_verse": "novo", "url": "https://example.com"}
+
+
+class TestCachedReply(unittest.TestCase):
+    def make_command(self, cached):
+        # skip __init__, which reads the environment and builds the real fetchers
+        command = Salmo.__new__(Salmo)
+        command._command = "salmo"
+        command._env = SimpleNamespace(allowed_user_ids=[], monitored_group_ids=[])
+        command._throttle = CommandThrottle.__new__(CommandThrottle)
+        command._throttle._users = TokenBucketLimiter(1, 10)
+        command._throttle._chats = TokenBucketLimiter(1, 10)
+        command._throttle._coalescer = RequestCoalescer(0)
+        command._throttle._notified = set()
+        command._throttle._lock = threading.Lock()
+        command._prediction_module = FakePredictionModule(cached)
+        return command
+
+    def run_command(self, command):
+        user = SimpleNamespace(id=1, username="user", full_name="User")
+        message = SimpleNamespace(from_user=user, text="/salmo", chat=SimpleNamespace(id=1, type="private"))
+        update = SimpleNamespace(message=message, effective_chat=message.chat)
+        context = SimpleNamespace(bot=FakeBot(), args=[])
+        command._process(update, context)
+        return context.bot.calls
+
+    def test_cached_answer_is_sent_in_one_call(self):
+        cached = {"date": "2024-05-10", "title": "Salmo 91", "key_verse": "guardado", "url": "https://example.com"}
+        command = self.make_command(cached)
+
+        calls = self.run_command(command)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0][0], "send_message")
+        self.assertIn("Salmo 91", calls[0][1])
+        self.assertEqual(command._prediction_module.generated, 0)
+
+    def test_generation_uses_placeholder_and_edit(self):
+        command = self.make_command(None)
+
+        calls = self.run_command(command)
+
+        self.assertEqual([call[0] for call in calls], ["send_message", "send_chat_action", "edit_message_text"])
+        self.assertEqual(calls[0][1], "Processando comando...")
+        self.assertIn("Salmo 23", calls[2][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
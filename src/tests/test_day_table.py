@@ -0,0 +1,61 @@
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.day_table import DayTable
+from tools.planet_data_gen import write_missing
+
+
+class TestDayTable(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "table.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_write_and_lookup(self):
+        DayTable.write(self.path, date(2024, 12, 31), [b"\x00\x01", None, b"\x0b\x02"], 2)
+        table = DayTable(self.path)
+
+        self.assertEqual(table.start, date(2024, 12, 31))
+        self.assertEqual(table.end, date(2025, 1, 2))
+        self.assertEqual(table.get(date(2024, 12, 31)), b"\x00\x01")
+        self.assertEqual(table.get(date(2025, 1, 2)), b"\x0b\x02")
+        table.close()
+
+    def test_missing_days(self):
+        DayTable.write(self.path, date(2025, 1, 1), [None, b"\x03\x04"], 2)
+        table = DayTable(self.path)
+
+        self.assertIsNone(table.get(date(2025, 1, 1)))
+        self.assertNotIn(date(2024, 12, 31), table)
+        self.assertNotIn(date(2025, 1, 3), table)
+        self.assertIn(date(2025, 1, 2), table)
+        table.close()
+
+    def test_record_size_is_checked(self):
+        with self.assertRaises(ValueError):
+            DayTable.write(self.path, date(2025, 1, 1), [b"\x00"], 2)
+
+    def test_write_missing_keeps_existing_records(self):
+        DayTable.write(self.path, date(2025, 1, 1), [None, b"\x01\x01", None, None], 2)
+        days = [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3), date(2025, 1, 4)]
+        records = [b"\x09\x09"] * 4
+
+        write_missing(self.path, days, records, {date(2025, 1, 1), date(2025, 1, 3), date(2025, 1, 4)})
+        table = DayTable(self.path)
+
+        self.assertEqual(table.get(date(2025, 1, 1)), b"\x09\x09")
+        self.assertEqual(table.get(date(2025, 1, 2)), b"\x01\x01")
+        self.assertEqual(table.get(date(2025, 1, 4)), b"\x09\x09")
+        table.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.fuzzy_index import FuzzyIndex, fold
+from tests.test_tarot_catalog import load_catalog
+from tools.match_bench import index_match, load_corpus
+
+
+class TestFuzzyIndex(unittest.TestCase):
+    def test_fold(self):
+        self.assertEqual(fold("  Escorpião!! "), "escorpiao")
+        self.assertEqual(fold("♏️"), "♏")
+
+    def test_lookup_order(self):
+        index = FuzzyIndex(["escorpiao", "sagitario"], {"♏": "escorpiao"})
+
+        self.assertEqual(index.match("ESCORPIÃO"), "escorpiao")
+        self.assertEqual(index.match("meu signo é ♏️"), "escorpiao")
+        self.assertEqual(index.match("sagitáro"), "sagitario")
+        self.assertIsNone(index.match("xyz"))
+        self.assertIsNone(index.match("?!"))
+
+    def test_corpus(self):
+        load_catalog()
+        for kind, text, expected in load_corpus():
+            self.assertEqual(index_match(kind, text), expected, text)
+
+
+if __name__ == '__main__':
+    unittest.main()
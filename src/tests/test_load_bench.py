@@ -0,0 +1,45 @@
+import unittest
+import argparse
+import random
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tools.load_bench import Recorder, command_burst, group_traffic, make_workdir, spawn
+
+
+class TestLoadBench(unittest.TestCase):
+    def test_recorder_waits_for_the_real_reply(self):
+        recorder = Recorder()
+        recorder.enqueue(1, chat_id=10)
+        recorder.enqueue(2)
+
+        recorder.reply(10, "Processando comando...")
+        self.assertEqual(recorder.done, {})
+        recorder.reply(10, "Horóscopo")
+        recorder.complete(2)
+
+        self.assertEqual(sorted(recorder.done), [1, 2])
+        self.assertTrue(recorder.finished.is_set())
+
+    def test_traffic_is_reproducible(self):
+        self.assertEqual(group_traffic(50, random.Random(3)), group_traffic(50, random.Random(3)))
+        self.assertEqual(len(command_burst("tarot", 20, random.Random(3))), 20)
+
+    def test_scenario_runs_offline(self):
+        args = argparse.Namespace(updates=5, llm_latency=0, llm_jitter=0, rate=0, seed=1)
+        workdir = make_workdir()
+        try:
+            result = spawn("salmo", args, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.assertEqual(result["completed"], 5)
+        self.assertEqual(result["errors"], 0)
+        self.assertGreater(result["llm_calls"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.message_buffer import MessageBuffer
+from modules.state_backend import MemoryStateBackend, SQLiteStateBackend
+
+
+class FailingBackend(MemoryStateBackend):
+    def __init__(self):
+        super().__init__()
+        self.fail = True
+
+    def extend(self, namespace, key, values, maxlen=None):
+        if self.fail:
+            raise IOError("backend down")
+        super().extend(namespace, key, values, maxlen=maxlen)
+
+
+class TestMessageBuffer(unittest.TestCase):
+    def test_appends_are_written_behind_in_one_batch(self):
+        state = MemoryStateBackend()
+        buffer = MessageBuffer("messages", 3, state=state)
+        for i in range(5):
+            buffer.append(-100, {"text": str(i)})
+
+        self.assertEqual([m["text"] for m in buffer.get(-100)], ["2", "3", "4"])
+        self.assertEqual(state.get_list("messages", -100), [])
+
+        buffer.flush()
+        self.assertEqual([m["text"] for m in state.get_list("messages", -100)], ["2", "3", "4"])
+
+    def test_failed_flush_keeps_messages(self):
+        state = FailingBackend()
+        buffer = MessageBuffer("messages", 10, state=state)
+        buffer.append(-100, "oi")
+        buffer.append(-200, "tudo bem?")
+
+        with self.assertRaises(IOError):
+            buffer.flush()
+        buffer.append(-100, "de novo")
+        state.fail = False
+        buffer.flush()
+
+        self.assertEqual(state.get_list("messages", -100), ["oi", "de novo"])
+        self.assertEqual(state.get_list("messages", -200), ["tudo bem?"])
+
+
+class TestSharedMessageBuffer(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "state.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_sees_other_instances_after_refresh(self):
+        first = MessageBuffer("messages", 10, state=SQLiteStateBackend(self.path))
+        second = MessageBuffer("messages", 10, state=SQLiteStateBackend(self.path))
+        second.REFRESH_SECONDS = 0
+
+        second.append(1, "local")
+        first.append(1, "oi")
+        first.flush()
+
+        # the unflushed local message is kept after re-reading the backend
+        self.assertEqual(second.get(1), ["oi", "local"])
+        second.flush()
+        self.assertEqual(second.get(1), ["oi", "local"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import os
+import sys
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from commands.registry import LazyHandler
+from modules.metrics import Metrics, MetricsServer, quantiles
+from modules.singleton import Singleton
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        Singleton._instances.pop(Metrics, None)
+
+    def test_quantiles(self):
+        self.assertEqual(quantiles(list(range(100, 0, -1)), (0.5, 0.95, 0.99)), [50, 95, 99])
+        self.assertEqual(quantiles([7], (0.5, 0.99)), [7, 7])
+
+    def test_render(self):
+        metrics = Metrics()
+        for value in range(1, 101):
+            metrics.observe("llm_seconds", value, task="short")
+        metrics.inc("cache", cache="sign", result="hit")
+        metrics.inc("cache", 2, cache="sign", result="hit")
+        with self.assertRaises(ValueError), metrics.span("command", handler='Sign"GPT'):
+            raise ValueError
+
+        text = metrics.render()
+
+        self.assertIn('bidu_llm_seconds{task="short",quantile="0.95"} 95', text)
+        self.assertIn('bidu_llm_seconds_count{task="short"} 100', text)
+        self.assertIn('bidu_llm_seconds_sum{task="short"} 5050', text)
+        self.assertIn('bidu_cache_total{cache="sign",result="hit"} 3', text)
+        self.assertIn('bidu_command_seconds_count{handler="Sign\\"GPT"} 1', text)
+
+    def test_handler_span(self):
+        class FakeCommand:
+            def _process(self, update, context):
+                return "done"
+
+        class FakeContext:
+            class dispatcher:
+                running = False
+
+        handler = LazyHandler("commands.fake:FakeCommand", run_async=True)
+        handler._instance = FakeCommand()
+
+        self.assertEqual(handler(None, FakeContext()), "done")
+        self.assertIn('bidu_command_seconds_count{handler="FakeCommand"} 1', Metrics().render())
+
+    def test_server(self):
+        Metrics().inc("cache", cache="astro", result="miss")
+        server = MetricsServer(port=0)
+        server.start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+                body = response.read().decode()
+        finally:
+            server.stop()
+
+        self.assertIn('bidu_cache_total{cache="astro",result="miss"} 1', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
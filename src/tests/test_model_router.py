@@ -0,0 +1,80 @@
+import unittest
+from unittest import mock
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+from openai import AuthenticationError, InternalServerError
+
+from clients.model_router import Backend, ModelRouter, percentile
+from clients.openai_client import OpenAIClient
+from environment import Singleton
+
+
+class TestModelRouter(unittest.TestCase):
+    def setUp(self):
+        # a fresh router with the default routes, not the process-wide one
+        env = {key: value for key, value in os.environ.items() if not key.startswith("OPENAI_ROUTE_")}
+        patcher = mock.patch.dict(os.environ, env, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        Singleton._instances.pop(ModelRouter, None)
+        self.addCleanup(Singleton._instances.pop, ModelRouter, None)
+
+        self.router = ModelRouter()
+        self.fast, self.default = self.router.route(ModelRouter.TASK_CLASSIFICATION)
+
+    def test_percentile(self):
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(percentile([3, 1, 2, 4], 50), 2)
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+
+    def test_latency_is_tracked_per_task(self):
+        backend = Backend("model", "http://localhost")
+        backend.record(ModelRouter.TASK_SUMMARY, 10.0)
+        backend.record(ModelRouter.TASK_CLASSIFICATION, 0.2)
+
+        self.assertEqual(backend.latency(ModelRouter.TASK_SUMMARY, 95), 10.0)
+        self.assertEqual(backend.latency(ModelRouter.TASK_CLASSIFICATION, 95), 0.2)
+
+    def test_slow_backend_fails_over(self):
+        task = ModelRouter.TASK_CLASSIFICATION
+        self.assertEqual(self.fast.model, ModelRouter.MODEL_FAST)
+
+        for _ in range(ModelRouter.MIN_SAMPLES):
+            self.fast.record(task, self.router.budget(task) * 2)
+
+        self.assertEqual(self.router.route(task), [self.default, self.fast])
+
+        # slow samples on other task classes do not affect this route
+        self.assertEqual(self.router.route(ModelRouter.TASK_SHORT)[0], self.fast)
+
+    def test_only_server_errors_fail_over(self):
+        task = ModelRouter.TASK_CLASSIFICATION
+        client = OpenAIClient.__new__(OpenAIClient)
+        client._router = self.router
+
+        def failing(error):
+            create = mock.Mock(side_effect=error)
+            completions = mock.Mock(create=create)
+            return mock.Mock(chat=mock.Mock(completions=completions))
+
+        def status_error(cls, status):
+            response = httpx.Response(status, request=httpx.Request("POST", "http://localhost"))
+            return cls("error", response=response, body=None)
+
+        client._get_client = lambda backend: failing(status_error(AuthenticationError, 401))
+        with self.assertRaises(AuthenticationError):
+            client._request(self.fast, task, [], 10, retry=False)
+        self.assertIsNone(self.fast.latency(task, 95))
+
+        client._get_client = lambda backend: failing(status_error(InternalServerError, 503))
+        self.assertIsNone(client._request(self.fast, task, [], 10, retry=False))
+        self.assertEqual(self.fast.latency(task, 95), self.router.timeout(task))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import threading
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.rate_limiter import CommandThrottle, RequestCoalescer, TokenBucketLimiter
+
+
+class TestTokenBucketLimiter(unittest.TestCase):
+    def test_burst_then_refill(self):
+        limiter = TokenBucketLimiter(rate=0.5, burst=2)
+
+        self.assertTrue(limiter.allow("user", now=0))
+        self.assertTrue(limiter.allow("user", now=0))
+        self.assertFalse(limiter.allow("user", now=0))
+
+        # one token every two seconds
+        self.assertFalse(limiter.allow("user", now=1))
+        self.assertTrue(limiter.allow("user", now=3))
+
+    def test_keys_are_independent(self):
+        limiter = TokenBucketLimiter(rate=0.1, burst=1)
+
+        self.assertTrue(limiter.allow(1, now=0))
+        self.assertFalse(limiter.allow(1, now=0))
+        self.assertTrue(limiter.allow(2, now=0))
+
+    def test_refund(self):
+        limiter = TokenBucketLimiter(rate=0.1, burst=1)
+
+        self.assertTrue(limiter.allow(1, now=0))
+        limiter.refund(1, now=0)
+        self.assertTrue(limiter.allow(1, now=0))
+
+    def test_bounded_keys(self):
+        limiter = TokenBucketLimiter(rate=0.1, burst=1, max_keys=2)
+        for key in range(5):
+            limiter.allow(key, now=0)
+
+        self.assertEqual(len(limiter._buckets), 2)
+
+
+class TestRequestCoalescer(unittest.TestCase):
+    def test_repeats_within_window(self):
+        coalescer = RequestCoalescer(window=10)
+
+        self.assertTrue(coalescer.claim(("chat", "/bidu", "aries"), now=0))
+        self.assertFalse(coalescer.claim(("chat", "/bidu", "aries"), now=5))
+        self.assertTrue(coalescer.claim(("chat", "/bidu", "touro"), now=5))
+
+        self.assertTrue(coalescer.claim(("chat", "/bidu", "aries"), now=11))
+
+
+class TestCommandThrottle(unittest.TestCase):
+    def make_throttle(self, user_burst):
+        # skip __init__, which reads the limits from the environment
+        throttle = CommandThrottle.__new__(CommandThrottle)
+        throttle._users = TokenBucketLimiter(0.001, user_burst)
+        throttle._chats = TokenBucketLimiter(0.001, 10)
+        throttle._coalescer = RequestCoalescer(60)
+        throttle._notified = set()
+        throttle._lock = threading.Lock()
+        return throttle
+
+    def test_rate_limited_request_does_not_claim_the_key(self):
+        throttle = self.make_throttle(user_burst=1)
+        key = ("chat", "/bidu", "aries")
+
+        self.assertIsNone(throttle.check(1, "chat", ("chat", "/salmo", "")))
+        self.assertEqual(throttle.check(1, "chat", key), CommandThrottle.RATE_LIMITED)
+        # the key is still free for someone within their limits
+        self.assertIsNone(throttle.check(2, "chat", key))
+
+    def test_duplicate_in_private_chat_gets_no_reply_and_is_free(self):
+        throttle = self.make_throttle(user_burst=2)
+        # in private chats the key includes the user, the first reply is the only one
+        key = (1, 1, "/bidu", "aries")
+
+        self.assertIsNone(throttle.check(1, 1, key))
+        for _ in range(3):
+            self.assertEqual(throttle.check(1, 1, key), CommandThrottle.DUPLICATE)
+        self.assertIsNone(throttle.check(1, 1, (1, 1, "/bidu", "touro")))
+
+
+if __name__ == '__main__':
+    unittest.main()
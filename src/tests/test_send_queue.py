@@ -0,0 +1,102 @@
+import unittest
+import threading
+import time
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from telegram.error import RetryAfter
+
+from modules.send_queue import SendQueue
+
+
+class FakeBot:
+    def __init__(self, flood_first=0):
+        self.calls = []
+        self.flood_first = flood_first
+        self.release = threading.Event()
+        self.release.set()
+        self.username = "bidu_bot"
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.release.wait(5)
+        if self.flood_first > 0:
+            self.flood_first -= 1
+            raise RetryAfter(0.05)
+        self.calls.append(("send_message", chat_id, text))
+        return {"message_id": len(self.calls)}
+
+    def send_chat_action(self, chat_id, action):
+        self.calls.append(("send_chat_action", chat_id, action))
+        return True
+
+
+class TestSendQueue(unittest.TestCase):
+    def test_returns_result_and_forwards_other_attributes(self):
+        bot = SendQueue().wrap(FakeBot())
+
+        self.assertEqual(bot.send_message(chat_id=1, text="oi"), {"message_id": 1})
+        self.assertEqual(bot.username, "bidu_bot")
+
+    def test_retries_after_flood_control(self):
+        fake = FakeBot(flood_first=2)
+        bot = SendQueue().wrap(fake)
+
+        self.assertEqual(bot.send_message(chat_id=1, text="oi"), {"message_id": 1})
+        self.assertEqual(fake.calls, [("send_message", 1, "oi")])
+
+    def test_merges_typing_actions(self):
+        fake = FakeBot()
+        queue = SendQueue()
+        bot = queue.wrap(fake)
+
+        for _ in range(3):
+            bot.send_chat_action(chat_id=1, action="typing")
+        queue.join(5)
+        bot.send_chat_action(chat_id=1, action="typing")
+        queue.join(5)
+
+        self.assertEqual(fake.calls, [("send_chat_action", 1, "typing")])
+
+    def test_replies_before_notices(self):
+        fake = FakeBot()
+        queue = SendQueue(workers=1)
+        bot = queue.wrap(fake)
+
+        # hold the only worker so the other calls pile up in the queue
+        fake.release.clear()
+        threading.Thread(target=bot.send_message, kwargs={"chat_id": 1, "text": "first"}).start()
+        while not queue._in_flight:
+            time.sleep(0.001)
+
+        notice = threading.Thread(
+            target=bot.send_message, kwargs={"chat_id": 2, "text": "notice", "priority": SendQueue.PRIORITY_NOTICE}
+        )
+        notice.start()
+        reply = threading.Thread(target=bot.send_message, kwargs={"chat_id": 3, "text": "reply"})
+        reply.start()
+        while len(queue._jobs) < 2:
+            time.sleep(0.001)
+
+        fake.release.set()
+        queue.join(5)
+        self.assertEqual([call[2] for call in fake.calls], ["first", "reply", "notice"])
+
+    def test_saturated_chat_does_not_delay_other_chats(self):
+        fake = FakeBot()
+        queue = SendQueue(group_rate=1)
+        bot = queue.wrap(fake)
+
+        # the group only gets its burst, the rest waits for minutes
+        futures = [bot.send_message(chat_id=-100, text=f"group {i}", block=False) for i in range(SendQueue.GROUP_BURST + 3)]
+
+        start = time.monotonic()
+        bot.send_message(chat_id=1, text="private")
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertIn(("send_message", 1, "private"), fake.calls)
+        self.assertFalse(futures[-1].done())
+
+
+if __name__ == '__main__':
+    unittest.main()
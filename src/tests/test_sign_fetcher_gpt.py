@@ -0,0 +1,174 @@
+import unittest
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from clients.model_router import ModelRouter
+from commands.sign_gpt import SignGPT
+from fetchers.sign_fetcher_gpt import SignFetcherGPT
+from modules.prediction_module import PredictionModule
+from modules.singleton import Singleton
+from modules.token_usage import TokenUsage
+
+
+class FakeClient:
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def make_request(self, messages, model=None, max_tokens=None, task=None):
+        self.requests.append({"max_tokens": max_tokens, "task": task})
+        return self.response
+
+
+class TestSignFetcherGPTBatch(unittest.TestCase):
+    def make_fetcher(self, response):
+        # skip __init__, which builds the real OpenAI client and astro module
+        fetcher = SignFetcherGPT.__new__(SignFetcherGPT)
+        fetcher._image_url = "https://joaobidu.com.br/static/img/ico-{sign}.png"
+        fetcher._client = FakeClient(response)
+        fetcher._make_system_prompt = lambda: "system"
+        fetcher.fallbacks = []
+
+        def fetch(sign):
+            fetcher.fallbacks.append(sign)
+            return {"sign": sign, "prediction": "alone", "guess_of_the_day": "1, 2, 3.", "color_of_the_day": "azul"}
+
+        fetcher.fetch = fetch
+        return fetcher
+
+    def entry(self, prediction_chars=SignFetcherGPT.PREDICTION_SIZE_CHARS, color="âmbar-elétrico"):
+        return {"previsao": "a" * prediction_chars, "cor": color}
+
+    def test_parse_batch_tolerates_fences_and_extra_text(self):
+        fetcher = self.make_fetcher("")
+        body = json.dumps({"aries": self.entry()})
+
+        self.assertEqual(fetcher._parse_batch(f"```json\n{body}\n```"), {"aries": self.entry()})
+        self.assertEqual(fetcher._parse_batch(f"Aqui estão as previsões:\n{body}\nBoa sorte!"), {"aries": self.entry()})
+        self.assertEqual(fetcher._parse_batch("sem json nenhum"), {})
+        self.assertEqual(fetcher._parse_batch("{quebrado: }"), {})
+        self.assertEqual(fetcher._parse_batch("[1, 2]"), {})
+
+    def test_validate_batch_entry(self):
+        fetcher = self.make_fetcher("")
+
+        data = fetcher._validate_batch_entry(self.entry(color=" verde-jade. "))
+        self.assertEqual(data["color_of_the_day"], "verde-jade")
+        self.assertIsNone(fetcher._validate_batch_entry(self.entry(prediction_chars=SignFetcherGPT.BATCH_MAX_CHARS + 1)))
+        self.assertIsNone(fetcher._validate_batch_entry(self.entry(prediction_chars=SignFetcherGPT.BATCH_MIN_CHARS - 1)))
+        self.assertIsNone(fetcher._validate_batch_entry(self.entry(color="verde jade místico")))
+        self.assertIsNone(fetcher._validate_batch_entry({"previsao": "a" * 400}))
+        self.assertIsNone(fetcher._validate_batch_entry("aries"))
+
+    def test_fetch_all_falls_back_per_sign(self):
+        response = json.dumps(
+            {
+                "aries": self.entry(),
+                "touro": self.entry(prediction_chars=SignFetcherGPT.BATCH_MAX_CHARS * 2),
+                "gemeos": self.entry(color="azul e verde"),
+            }
+        )
+        fetcher = self.make_fetcher(f"```json\n{response}\n```")
+
+        predictions = fetcher.fetch_all(["aries", "touro", "gemeos", "cancer"])
+
+        self.assertEqual(sorted(fetcher.fallbacks), ["cancer", "gemeos", "touro"])
+        self.assertEqual(predictions["aries"]["sign"], "aries")
+        self.assertEqual(predictions["aries"]["image"], "https://joaobidu.com.br/static/img/ico-aries.png")
+        self.assertEqual(predictions["touro"]["prediction"], "alone")
+        self.assertEqual(fetcher._client.requests[0]["task"], ModelRouter.TASK_BATCH)
+
+
+class TestPersonalSignPrediction(unittest.TestCase):
+    BASE = {
+        "sign": "leao",
+        "prediction": "base",
+        "guess_of_the_day": "1, 2, 3.",
+        "color_of_the_day": "azul",
+        "image": "leao.png",
+        "date": "2024-05-10",
+    }
+
+    def setUp(self):
+        Singleton._instances.pop(TokenUsage, None)
+        TokenUsage(daily_budget=0)
+
+    def make_fetcher(self):
+        fetcher = SignFetcherGPT.__new__(SignFetcherGPT)
+        fetcher._client = FakeClient("variação")
+        return fetcher
+
+    def test_variation_is_a_short_request_seeded_by_user(self):
+        fetcher = self.make_fetcher()
+
+        first = fetcher.fetch_variation(self.BASE, 1234)
+        again = fetcher.fetch_variation(self.BASE, 1234)
+
+        self.assertEqual(first["prediction"], "variação")
+        self.assertEqual(first["color_of_the_day"], "azul")
+        self.assertEqual(first["guess_of_the_day"], again["guess_of_the_day"])
+        self.assertEqual(fetcher._client.requests[0]["task"], ModelRouter.TASK_SHORT)
+        self.assertEqual(fetcher._client.requests[0]["max_tokens"], SignFetcherGPT.VARIATION_MAX_TOKENS)
+
+    def test_variations_share_the_base_and_are_evicted(self):
+        # skip __init__, which builds the real fetchers and state backend
+        module = PredictionModule.__new__(PredictionModule)
+        module._variations = OrderedDict()
+        module._variations_lock = threading.Lock()
+        module._fetchers = {"sign": self.make_fetcher()}
+        bases = []
+        module.get_sign_prediction = lambda sign: bases.append(sign) or dict(self.BASE)
+        module._is_expired = lambda request_date: False
+
+        original_size = PredictionModule.VARIATION_CACHE_SIZE
+        PredictionModule.VARIATION_CACHE_SIZE = 2
+        try:
+            module.get_personal_sign_prediction(1, "leao")
+            module.get_personal_sign_prediction(1, "leao")
+            module.get_personal_sign_prediction(2, "leao")
+            module.get_personal_sign_prediction(3, "leao")
+        finally:
+            PredictionModule.VARIATION_CACHE_SIZE = original_size
+
+        self.assertEqual(len(module._fetchers["sign"]._client.requests), 3)
+        self.assertEqual(bases, ["leao"] * 3)
+        self.assertIsNone(module.get_cached_personal_sign_prediction(1, "leao"))
+        self.assertIsNotNone(module.get_cached_personal_sign_prediction(3, "leao"))
+
+    def test_failed_variation_is_not_cached(self):
+        module = PredictionModule.__new__(PredictionModule)
+        module._variations = OrderedDict()
+        module._variations_lock = threading.Lock()
+        module._fetchers = {"sign": SignFetcherGPT.__new__(SignFetcherGPT)}
+        # the client answers "" when the model fails
+        module._fetchers["sign"]._client = FakeClient("")
+        module.get_sign_prediction = lambda sign: dict(self.BASE)
+        module._is_expired = lambda request_date: False
+
+        self.assertEqual(module.get_personal_sign_prediction(1, "leao")["prediction"], self.BASE["prediction"])
+        self.assertIsNone(module.get_cached_personal_sign_prediction(1, "leao"))
+
+    def test_cache_probe_does_not_save_the_sign(self):
+        class Users:
+            def __getattr__(self, name):
+                raise AssertionError(f"users module used: {name}")
+
+        sign_gpt = SignGPT.__new__(SignGPT)
+        sign_gpt._users_module = Users()
+        sign_gpt._request = threading.local()
+        sign_gpt._request.sign = None
+        update = SimpleNamespace(message=SimpleNamespace(from_user=SimpleNamespace(id=1)))
+
+        reply = sign_gpt._cached_reply(update, SimpleNamespace(args=["eu"]))
+
+        self.assertEqual(reply, SignGPT.PERSONAL_HINT)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import threading
+import time
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.singleton import Singleton
+
+
+class TestSingleton(unittest.TestCase):
+    def test_concurrent_first_calls_build_one_instance(self):
+        built = []
+
+        class Slow(metaclass=Singleton):
+            def __init__(self):
+                built.append(self)
+                # widen the window between the check and the store
+                time.sleep(0.05)
+
+        barrier = threading.Barrier(8)
+        instances = []
+
+        def build():
+            barrier.wait()
+            instances.append(Slow())
+
+        threads = [threading.Thread(target=build) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(built), 1)
+        self.assertTrue(all(instance is built[0] for instance in instances))
+        Singleton._instances.pop(Slow)
+
+    def test_constructor_can_build_other_singletons(self):
+        class Inner(metaclass=Singleton):
+            pass
+
+        class Outer(metaclass=Singleton):
+            def __init__(self):
+                self.inner = Inner()
+
+        self.assertIs(Outer().inner, Inner())
+        Singleton._instances.pop(Outer)
+        Singleton._instances.pop(Inner)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import tempfile
+import shutil
+import time
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.state_backend import MemoryStateBackend, SQLiteStateBackend, StateBackend
+
+
+class StateBackendTests:
+    def make_backend(self):
+        raise NotImplementedError
+
+    def test_set_and_get(self):
+        backend = self.make_backend()
+        backend.set("users", 42, {"display_name": "bidu", "card": None})
+
+        self.assertEqual(backend.get("users", 42), {"display_name": "bidu", "card": None})
+        self.assertEqual(backend.get("users", "42"), {"display_name": "bidu", "card": None})
+        self.assertIsNone(backend.get("users", 43))
+        self.assertEqual(backend.get("other", 42, "default"), "default")
+
+    def test_values_are_copies(self):
+        backend = self.make_backend()
+        backend.set("users", 1, {"card": None})
+
+        user = backend.get("users", 1)
+        user["card"] = "o louco"
+        self.assertEqual(backend.get("users", 1), {"card": None})
+
+    def test_ttl(self):
+        backend = self.make_backend()
+        backend.set("cooldown", 1, 123.0, ttl=0.05)
+        self.assertEqual(backend.get("cooldown", 1), 123.0)
+
+        time.sleep(0.1)
+        self.assertIsNone(backend.get("cooldown", 1))
+
+    def test_setdefault_keeps_first_value(self):
+        backend = self.make_backend()
+
+        self.assertEqual(backend.setdefault("predictions:sign", "aries", {"prediction": "a"}), {"prediction": "a"})
+        self.assertEqual(backend.setdefault("predictions:sign", "aries", {"prediction": "b"}), {"prediction": "a"})
+
+    def test_append_is_bounded(self):
+        backend = self.make_backend()
+        for i in range(5):
+            backend.append("messages", -100, {"text": str(i)}, maxlen=3)
+
+        self.assertEqual(backend.get_list("messages", -100), [{"text": "2"}, {"text": "3"}, {"text": "4"}])
+        self.assertEqual(backend.get_list("messages", -200), [])
+
+        backend.extend("messages", -100, [{"text": "5"}, {"text": "6"}], maxlen=3)
+        self.assertEqual(backend.get_list("messages", -100), [{"text": "4"}, {"text": "5"}, {"text": "6"}])
+
+    def test_set_many(self):
+        backend = self.make_backend()
+        backend.set_many("users", {1: {"sign": "leao"}, 2: {"sign": None}})
+
+        self.assertEqual(backend.get("users", 1), {"sign": "leao"})
+        self.assertEqual(backend.get("users", 2), {"sign": None})
+
+    def test_delete(self):
+        backend = self.make_backend()
+        backend.set("last_word", 1, "mudno")
+        backend.delete("last_word", 1)
+
+        self.assertIsNone(backend.get("last_word", 1))
+
+
+class TestMemoryStateBackend(StateBackendTests, unittest.TestCase):
+    def make_backend(self):
+        return MemoryStateBackend()
+
+
+class TestSQLiteStateBackend(StateBackendTests, unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "state.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def make_backend(self):
+        return SQLiteStateBackend(self.path)
+
+    def test_shared_between_instances(self):
+        first = StateBackend.from_url(f"sqlite:///{self.path}")
+        second = StateBackend.from_url(f"sqlite:///{self.path}")
+
+        first.append("messages", 1, "oi", maxlen=10)
+        second.append("messages", 1, "tudo bem?", maxlen=10)
+        first.set("cooldown", 1, 10.0)
+
+        self.assertEqual(second.get_list("messages", 1), ["oi", "tudo bem?"])
+        self.assertEqual(second.get("cooldown", 1), 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from commands.tarot import Tarot
+from modules.singleton import Singleton
+from modules.tarot_catalog import TarotCatalog
+from tools.tarot_catalog_gen import CARDS, compile_catalog
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+
+
+def load_catalog():
+    """The process-wide catalog, loaded from the repository's data directory."""
+    Singleton._instances.pop(TarotCatalog, None)
+    return TarotCatalog(os.path.join(DATA_DIR, 'tarot_catalog.json'))
+
+
+class TestTarotCatalog(unittest.TestCase):
+    def setUp(self):
+        self.catalog = load_catalog()
+
+    def test_lookup_by_any_name(self):
+        hermit = self.catalog.cards[9]
+
+        for key in ("IX", "ix", "Hermit", "o eremita", "O Eremita", "o hermita", "eremita"):
+            self.assertIs(self.catalog.get(key), hermit, key)
+        self.assertIs(self.catalog.get("a temperança"), self.catalog.get("temperanca"))
+        self.assertIsNone(self.catalog.get("o curinga"))
+
+    def test_match_below_trigram_cutoff(self):
+        # shares a trigram with some name but scores under the cutoff, difflib decides
+        self.assertIsNotNone(self.catalog.match("hoje"))
+        self.assertIsNotNone(self.catalog.match("qualquer coisa"))
+        self.assertIsNone(self.catalog.match("xyz"))
+
+    def test_unknown_arcana_reply(self):
+        tarot = Tarot.__new__(Tarot)
+        tarot._catalog = self.catalog
+
+        reply = tarot._cached_reply(None, SimpleNamespace(args=["xyz"]))
+
+        self.assertIn("xyz", reply)
+        self.assertIn("Não encontrei", reply)
+
+    def test_one_card_per_number(self):
+        self.assertEqual(len(self.catalog), 22)
+        self.assertEqual([card.number for card in self.catalog.cards], list(range(22)))
+        self.assertEqual(len({card.portuguese for card in self.catalog.cards}), 22)
+
+    def test_is_read_only(self):
+        card = self.catalog.cards[0]
+        with self.assertRaises(TypeError):
+            card.personas[0]["name"] = "Joker"
+
+        # the plain copy can be changed and stored
+        personas = card.persona_list()
+        personas[0]["name"] = "Joker"
+        self.assertEqual(card.personas[0]["name"], "Fool")
+        json.dumps(personas)
+
+    def test_compiled_catalog_is_up_to_date(self):
+        with open(os.path.join(DATA_DIR, 'arcanas.json'), 'r') as f:
+            personas = json.load(f)
+        with open(os.path.join(DATA_DIR, 'tarot_catalog.json'), 'r', encoding='utf-8') as f:
+            compiled = json.load(f)
+
+        self.assertEqual(compile_catalog(personas), compiled)
+        self.assertEqual(len(CARDS), len(compiled["cards"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
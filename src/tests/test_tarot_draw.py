@@ -0,0 +1,27 @@
+import unittest
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from commands.tarot import Tarot
+
+
+class TestDailyDraw(unittest.TestCase):
+    def test_never_repeats_the_day_before(self):
+        start = date(2024, 1, 1)
+        for userid in range(50):
+            cards = [Tarot._daily_index(userid, start + timedelta(days=day)) for day in range(3 * Tarot.DECK_SIZE)]
+            for yesterday, today in zip(cards, cards[1:]):
+                self.assertNotEqual(yesterday, today)
+
+    def test_is_deterministic(self):
+        day = date(2024, 5, 10)
+        self.assertEqual(Tarot._daily_index(1234, day), Tarot._daily_index(1234, day))
+        self.assertEqual(Tarot._permutation(1234, 10), Tarot._permutation(1234, 10))
+        self.assertEqual(sorted(Tarot._permutation(1234, 10)), list(range(Tarot.DECK_SIZE)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from commands.tarot_gpt import TarotGPT
+from fetchers.tarot_spread_fetcher_gpt import TarotSpreadFetcherGPT
+
+
+class TestTarotSpread(unittest.TestCase):
+    def make_fetcher(self, delays):
+        # skip __init__, which builds the real OpenAI client and card catalog
+        fetcher = TarotSpreadFetcherGPT.__new__(TarotSpreadFetcherGPT)
+
+        def fetch(card, position=None):
+            time.sleep(delays[card])
+            return {"title": card, "body": f"{card} em {position}", "image": f"{card}.png"}
+
+        fetcher._fetch = fetch
+        return fetcher
+
+    def test_cards_are_generated_concurrently_in_spread_order(self):
+        delays = {"o louco": 0.3, "a lua": 0.1, "o sol": 0.2}
+        fetcher = self.make_fetcher(delays)
+
+        start = time.monotonic()
+        data = fetcher.fetch(list(delays), ["Passado", "Presente", "Futuro"])
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, sum(delays.values()))
+        self.assertEqual([card["title"] for card in data["cards"]], list(delays))
+        self.assertEqual(data["cards"][1]["body"], "a lua em Presente")
+
+    def test_celtic_cross_takes_one_round(self):
+        cards = [f"carta {index}" for index in range(10)]
+        fetcher = self.make_fetcher({card: 0.2 for card in cards})
+
+        start = time.monotonic()
+        data = fetcher.fetch(cards, [str(index) for index in range(10)])
+
+        self.assertLess(time.monotonic() - start, 0.35)
+        self.assertEqual([card["title"] for card in data["cards"]], cards)
+
+    def test_parse_spread(self):
+        command = TarotGPT.__new__(TarotGPT)
+        self.assertEqual(command._parse_spread(["Três"]), "tres")
+        self.assertEqual(command._parse_spread(["cruz", "celta"]), "cruz")
+        self.assertIsNone(command._parse_spread(["louco"]))
+        self.assertIsNone(command._parse_spread([]))
+
+    def test_every_spread_fits_the_deck(self):
+        for _, positions in TarotGPT.SPREADS.values():
+            self.assertLessEqual(len(positions), TarotGPT.DECK_SIZE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from commands.templates import SALMO_TEMPLATE, Template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_fields_are_escaped(self):
+        template = Template("<b>{name}</b> {block}", raw=("block",))
+
+        self.assertEqual(
+            template.render(name="<Zé & cia>", block="<i>ok</i>"),
+            "<b>&lt;Zé &amp; cia&gt;</b> <i>ok</i>",
+        )
+
+    def test_salmo_matches_the_previous_layout(self):
+        message = SALMO_TEMPLATE.render(date="10/05/2024", title="Salmo 23", key_verse="O Senhor", url="https://a.b")
+
+        self.assertEqual(message, '10/05/2024 - Salmo 23\n\nO Senhor\n\n🔗 <a href="https://a.b">Ver salmo completo</a>')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import contextvars
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.singleton import Singleton
+from modules.token_usage import TokenUsage, current_request, usage_context
+
+
+class TestTokenUsage(unittest.TestCase):
+    def setUp(self):
+        Singleton._instances.pop(TokenUsage, None)
+        self.usage = TokenUsage(daily_budget=100)
+
+    def test_usage_is_tagged_by_context(self):
+        with usage_context("GroupSummary", -100):
+            self.usage.record("deepseek-chat", "summary", 40, 20)
+        with usage_context("SignGPT", -100):
+            self.usage.record("deepseek-reasoner", "creative", 30, 5)
+        self.usage.record("deepseek-reasoner", "batch", 500, 500)
+
+        self.assertEqual(self.usage.spent(-100), 95)
+        self.assertEqual(self.usage.usage()[(-100, "GroupSummary", "deepseek-chat")], (40, 20))
+        self.assertEqual(self.usage.usage()[(None, None, "deepseek-reasoner")], (500, 500))
+        self.assertEqual(current_request(), (None, None))
+
+    def test_budget(self):
+        with usage_context("GroupSummary", -100):
+            self.assertFalse(self.usage.over_budget())
+            self.usage.record("deepseek-chat", "summary", 80, 20)
+            self.assertTrue(self.usage.over_budget())
+
+        # outside any chat nothing is degraded
+        self.assertFalse(self.usage.over_budget())
+        self.assertFalse(self.usage.over_budget(-200))
+
+    def test_context_follows_copied_tasks(self):
+        with usage_context("TarotGPT", 42), ThreadPoolExecutor(max_workers=2) as pool:
+            copied = pool.submit(contextvars.copy_context().run, current_request).result()
+
+        self.assertEqual(copied, ("TarotGPT", 42))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.traffic_capture import TrafficCapture, read_traffic
+from tools.load_bench import make_workdir
+from tools.traffic_replay import spawn, synthesize
+
+
+class TestTrafficCapture(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "capture.jsonl.gz")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_anonymize_keeps_repetitions_and_triggers(self):
+        capture = TrafficCapture(self.path)
+
+        first = capture.anonymize("Mudno louco, 6 falam")
+        second = capture.anonymize("mudno")
+
+        self.assertEqual(len(first), len("Mudno louco, 6 falam"))
+        self.assertTrue(first.endswith(", 6 falam"))
+        self.assertEqual(first.split()[0], second)
+        self.assertNotIn("louco", first)
+        # another capture uses another key
+        self.assertNotEqual(TrafficCapture(self.path).anonymize("mudno"), second)
+
+    def test_flushes_append_to_one_stream(self):
+        capture = TrafficCapture(self.path)
+        capture.add(10.0, -100, 1, "primeira mensagem")
+        capture.flush()
+        capture.add(11.5, -100, 2, "legenda", caption=True)
+        capture.flush()
+
+        records = list(read_traffic(self.path))
+
+        self.assertEqual([record["t"] for record in records], [10.0, 11.5])
+        self.assertEqual(records[0]["c"], records[1]["c"])
+        self.assertNotEqual(records[0]["u"], records[1]["u"])
+        self.assertNotEqual(records[0]["u"], 1)
+        self.assertEqual(records[1]["p"], 1)
+
+    def test_synthesize_replaces_the_capture(self):
+        synthesize(self.path, 5, rate=50, seed=1)
+        synthesize(self.path, 5, rate=50, seed=1)
+
+        self.assertEqual(len(list(read_traffic(self.path))), 5)
+
+    def test_replay_runs_offline(self):
+        synthesize(self.path, 20, rate=50, seed=1)
+        args = argparse.Namespace(limit=0, llm_latency=0, llm_jitter=0)
+        workdir = make_workdir()
+        try:
+            result = spawn(self.path, "0", args, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.assertEqual(result["completed"], 20)
+        self.assertEqual(result["chats"], len({record["c"] for record in read_traffic(self.path)}))
+        self.assertGreater(result["buffer_bytes_peak"], 0)
+        self.assertEqual(result["methods"]["TypoDetector._detect_repetition_pattern"]["calls"], 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
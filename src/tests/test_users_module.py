@@ -0,0 +1,106 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.state_backend import MemoryStateBackend
+from modules.users_module import UserRecord, UsersModule
+
+
+class CountingBackend(MemoryStateBackend):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+        self.batches = []
+
+    def get(self, namespace, key, default=None):
+        self.reads += 1
+        return super().get(namespace, key, default)
+
+    def set_many(self, namespace, items, ttl=None):
+        self.batches.append(sorted(items))
+        super().set_many(namespace, items, ttl=ttl)
+
+
+class TestUsersModule(unittest.TestCase):
+    def make_module(self):
+        # not through the singleton, each test gets its own store
+        module = UsersModule.__new__(UsersModule)
+        module.__init__(CountingBackend())
+        module._start_flusher = lambda: None
+        return module
+
+    def test_records_are_compact(self):
+        record = UserRecord(1, "bidu")
+        self.assertFalse(hasattr(record, "__dict__"))
+        self.assertEqual(UserRecord.from_dict(1, record.to_dict()).to_dict(), record.to_dict())
+
+    def test_writes_are_batched_behind(self):
+        module = self.make_module()
+        module.add_user(1, "bidu")
+        module.add_user(2, "fairfruit")
+        module.update_user(1, sign="leao")
+        self.assertIsNone(module._state.get(UsersModule.NAMESPACE, 1))
+
+        module.flush()
+        module.flush()
+
+        self.assertEqual(module._state.batches, [[1, 2]])
+        self.assertEqual(module._state.get(UsersModule.NAMESPACE, 1)["sign"], "leao")
+
+    def test_lazy_loading_and_idle_eviction(self):
+        module = self.make_module()
+        module._state.set(UsersModule.NAMESPACE, 1, {"display_name": "bidu", "card": None})
+        reads = module._state.reads
+
+        self.assertEqual(module.get_user(1)["userid"], 1)
+        self.assertEqual(module.get_user(1)["display_name"], "bidu")
+        self.assertEqual(module._state.reads, reads + 1)
+
+        # changed records stay until stored
+        module.update_user(1, sign="leao")
+        module.IDLE_SECONDS = -1
+        module.evict_idle()
+        self.assertIn(1, module._records)
+
+        module.flush()
+        module.evict_idle()
+        self.assertNotIn(1, module._records)
+        self.assertEqual(module.get_user(1)["sign"], "leao")
+
+    def test_records_stay_until_the_write_succeeds(self):
+        module = self.make_module()
+        module.IDLE_SECONDS = -1
+        module.add_user(1, "bidu")
+        module.add_user(2, "tarot")
+        store = module._state.set_many
+
+        def set_many(namespace, items, ttl=None):
+            # evicting while the batch is being written must not drop it, nor a change made meanwhile
+            module.evict_idle()
+            module.update_user(2, sign="leao" if module._state.fail else "virgem")
+            if module._state.fail:
+                raise IOError("backend down")
+            store(namespace, items, ttl=ttl)
+
+        module._state.set_many = set_many
+        module._state.fail = True
+        with self.assertRaises(IOError):
+            module.flush()
+        self.assertTrue(module._records[1].dirty)
+
+        module._state.fail = False
+        module.flush()
+
+        self.assertFalse(module._records[1].dirty)
+        self.assertTrue(module._records[2].dirty)
+        module.evict_idle()
+        self.assertNotIn(1, module._records)
+        self.assertEqual(module.get_user(1)["display_name"], "bidu")
+        self.assertEqual(module.get_user(2)["sign"], "virgem")
+        self.assertEqual(module._state.get(UsersModule.NAMESPACE, 2)["sign"], "leao")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import threading
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.webhook_server import WebhookServer
+
+
+class FakeDispatcher:
+    def __init__(self, block=False):
+        self.bot = None
+        self.update_ids = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def process_update(self, update):
+        self.started.set()
+        self.release.wait(5)
+        self.update_ids.append(update.update_id)
+
+
+class TestWebhookServer(unittest.TestCase):
+    def start_server(self, dispatcher, **kwargs):
+        server = WebhookServer(dispatcher, "secret", listen="127.0.0.1", port=0, **kwargs)
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def post(self, server, update_id, path="/secret"):
+        body = json.dumps({"update_id": update_id, "message": None}).encode()
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.port}{path}", data=body, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status, response.headers
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers
+
+    def test_processes_updates_once(self):
+        dispatcher = FakeDispatcher()
+        server = self.start_server(dispatcher, workers=2)
+
+        for update_id in [1, 2, 2, 3, 1]:
+            self.assertEqual(self.post(server, update_id)[0], 200)
+        server.join()
+
+        self.assertEqual(sorted(dispatcher.update_ids), [1, 2, 3])
+
+    def test_rejects_unknown_path(self):
+        dispatcher = FakeDispatcher()
+        server = self.start_server(dispatcher)
+
+        self.assertEqual(self.post(server, 1, path="/wrong")[0], 404)
+        server.join()
+        self.assertEqual(dispatcher.update_ids, [])
+
+    def test_backpressure_when_workers_are_busy(self):
+        dispatcher = FakeDispatcher(block=True)
+        server = self.start_server(dispatcher, workers=1, queue_size=1)
+
+        self.assertEqual(self.post(server, 1)[0], 200)
+        dispatcher.started.wait(5)
+        self.assertEqual(self.post(server, 2)[0], 200)
+
+        status, headers = self.post(server, 3)
+        self.assertEqual(status, 503)
+        self.assertEqual(headers["Retry-After"], "1")
+
+        # the rejected update is accepted once Telegram retries it
+        dispatcher.release.set()
+        server.join()
+        self.assertEqual(self.post(server, 3)[0], 200)
+        server.join()
+        self.assertEqual(sorted(dispatcher.update_ids), [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,488 @@
+"""Drives the real handlers offline and reports throughput and latency per scenario.
+
+Each scenario runs in a fresh interpreter, in a scratch directory holding the
+data files, so caches and singletons start cold. Updates go through the
+`python-telegram-bot` dispatcher built by `bot.build`, with a `Bot` whose
+requests never leave the process, and every model call goes to a local
+OpenAI-compatible server that answers after `--llm-latency` seconds.
+
+Scenarios:
+  group  text traffic in monitored groups, with repeated typos and "6 falam"
+  bidu   a burst of /bidu from different users, some of them personal
+  tarot  a burst of /tarot, some of them spreads
+  salmo  a burst of /salmo
+
+Reported per scenario: updates per second, p50/p95 latency from enqueueing an
+update to its reply (to the end of its handlers for group traffic), model
+calls and tokens, and the peak RSS of the process.
+
+Usage: python -m src.tools.load_bench [--scenario all] [--updates 200] [--llm-latency 0.2]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+DATA_FILES = ["planet_data.bin", "tarot_catalog.json", "arcanas.json"]
+
+SCENARIOS = ["group", "bidu", "tarot", "salmo"]
+GROUPS = [-1001000000001, -1001000000002, -1001000000003, -1001000000004]
+BOT_TOKEN = "123456:fake-token-for-load-bench"
+PLACEHOLDER = "Processando comando..."
+
+WORDS = (
+    "hoje amanhã trabalho reunião café almoço jogo ontem cedo tarde projeto chuva praia cerveja série "
+    "filme livro viagem ônibus trânsito mercado festa aniversário domingo segunda academia corrida"
+).split()
+TYPOS = ["mudno", "fazedo", "tendeyu", "cachoro", "pessoa1"]
+
+LOREM = (
+    "Mercúrio sussurra segredos antigos enquanto a Lua atravessa territórios inesperados, e aquilo que "
+    "parecia rotina ganha contornos de aventura. Uma conversa atravessada no fim da tarde muda o rumo da "
+    "semana; aceite o convite que parece despretensioso, porque ele esconde uma oportunidade rara. No "
+    "trabalho, alguém finalmente reconhece o seu esforço, e o dinheiro que parecia perdido volta por um "
+    "caminho torto. Evite decisões às pressas depois das nove da noite."
+)
+SALMO_PAGE = (
+    "<html><body><h1>Salmo 23 do dia</h1><div class='salmo_dia_card_content'>"
+    "O Senhor é o meu pastor; de nada terei falta. Em verdes pastagens me faz repousar e me conduz a "
+    "águas tranquilas; restaura-me o vigor.</div></body></html>"
+)
+
+
+def percentile(values, pct):
+    """nearest-rank percentile of an unsorted list, None when empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+class FakeLLMServer:
+    """OpenAI-compatible chat completions that answer with canned text after a delay.
+
+    Also serves the psalm page on any GET, standing in for the site the psalm is read from.
+    """
+
+    def __init__(self, latency, jitter):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def answer(self, messages):
+        prompt = messages[-1]["content"]
+        if "YES or NO" in prompt:
+            return "YES"
+        if "única palavra para uma cor" in prompt:
+            return "violeta-cósmico"
+        return LOREM
+
+    def complete(self, request):
+        text = self.answer(request["messages"])
+        prompt_tokens = sum(len(message["content"]) for message in request["messages"]) // 4
+        completion_tokens = len(text) // 4
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "bench"),
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self._reply(json.dumps(server.complete(json.loads(self.rfile.read(length)))), "application/json")
+
+            def do_GET(self):
+                self._reply(SALMO_PAGE, "text/html; charset=utf-8")
+
+            def _reply(self, body, content_type):
+                body = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+
+class Recorder:
+    """Completion time of every update: its first real reply, or the end of its handlers.
+    `finished` is set once `expected` updates, or all enqueued so far, are complete.
+    """
+
+    def __init__(self, expected=None):
+        self.expected = expected
+        self.enqueued = {}  # update id -> time
+        self.done = {}  # update id -> time
+        self.errors = 0
+        self._pending = {}  # private chat id -> update id waiting for a reply
+        self._lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def enqueue(self, update_id, chat_id=None):
+        with self._lock:
+            self.enqueued[update_id] = time.perf_counter()
+            if chat_id is not None:
+                self._pending[chat_id] = update_id
+
+    def complete(self, update_id):
+        with self._lock:
+            if update_id in self.done or update_id not in self.enqueued:
+                return
+            self.done[update_id] = time.perf_counter()
+            # with paced sends, the dispatcher may catch up before the last one is enqueued
+            if len(self.done) == (self.expected or len(self.enqueued)):
+                self.finished.set()
+
+    def reply(self, chat_id, text):
+        if text == PLACEHOLDER:
+            return
+        with self._lock:
+            update_id = self._pending.pop(chat_id, None)
+            if text.startswith("Ops!"):
+                self.errors += 1
+        if update_id is not None:
+            self.complete(update_id)
+
+    def latencies(self):
+        return [self.done[update_id] - self.enqueued[update_id] for update_id in self.done]
+
+
+class BenchRequest:
+    """Stands in for `telegram.utils.request.Request`, answering every Bot API call locally."""
+
+    con_pool_size = 64
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.calls = 0
+        self._message_ids = iter(range(1, 10**9))
+        self._lock = threading.Lock()
+
+    def post(self, url, data, timeout=None):
+        method = url.rsplit("/", 1)[-1]
+        with self._lock:
+            self.calls += 1
+            message_id = next(self._message_ids)
+
+        if method == "getMe":
+            return {"id": 123456, "is_bot": True, "first_name": "Bidu", "username": "bidu_bench_bot"}
+        if method == "getMyCommands":
+            return []
+        if method in ("sendMessage", "editMessageText"):
+            self.recorder.reply(data.get("chat_id"), data.get("text", ""))
+            return {
+                "message_id": data.get("message_id", message_id),
+                "date": int(time.time()),
+                "chat": {"id": data.get("chat_id"), "type": "private"},
+                "text": data.get("text", ""),
+            }
+        return True
+
+    def get(self, url, timeout=None):
+        return self.post(url, {}, timeout=timeout)
+
+    def stop(self):
+        pass
+
+
+def make_message(update_id, chat_id, user_id, text, group):
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "supergroup" if group else "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"User {user_id}", "username": f"user{user_id}"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def group_traffic(count, rng):
+    """(chat id, user id, text) of chatter in the monitored groups. Every so often three
+    people repeat a typo, and now and then someone asks for a summary.
+    """
+    updates = []
+    while len(updates) < count:
+        chat_id = rng.choice(GROUPS)
+        roll = rng.random()
+        if roll < 0.05:
+            typo = rng.choice(TYPOS)
+            for user_id in rng.sample(range(1, 40), 3):
+                updates.append((chat_id, user_id, f"{rng.choice(WORDS)} {typo} {rng.choice(WORDS)}"))
+        elif roll < 0.07:
+            updates.append((chat_id, rng.randrange(1, 40), "6 falam"))
+        else:
+            updates.append((chat_id, rng.randrange(1, 40), " ".join(rng.choices(WORDS, k=rng.randint(3, 12)))))
+    return updates[:count]
+
+
+def command_burst(scenario, count, rng):
+    """(chat id, user id, text) of commands, each from its own user in a private chat."""
+    signs = ["aries", "touro", "gemeos", "cancer", "leao", "virgem", "libra", "escorpiao", "sagitario"]
+    updates = []
+    for user_id in range(1000, 1000 + count):
+        if scenario == "bidu":
+            text = f"/bidu eu {rng.choice(signs)}" if rng.random() < 0.2 else f"/bidu {rng.choice(signs)}"
+        elif scenario == "tarot":
+            text = "/tarot tres" if rng.random() < 0.2 else "/tarot"
+        else:
+            text = "/salmo"
+        updates.append((user_id, user_id, text))
+    return updates
+
+
+def bench_env(llm_url, groups):
+    """Environment of a bot that talks to `llm_url` and monitors `groups`, with its limits lifted."""
+    os.environ.update(
+        {
+            "TELEGRAM_TOKEN": BOT_TOKEN,
+            "OPENAI_API_KEY": "fake-key",
+            "OPENAI_BASE_URL": llm_url,
+            "MONITORED_GROUP_IDS": ",".join(str(group) for group in groups),
+            "PRELOAD_COMMANDS": "true",
+            "PREGENERATE_SIGNS": "false",
+            "STATE_BACKEND": "memory",
+            # measure the bot, not the limits that protect it
+            "COMMAND_USER_RATE": "100000",
+            "COMMAND_USER_BURST": "100000",
+            "COMMAND_CHAT_RATE": "100000",
+            "COMMAND_CHAT_BURST": "100000",
+            "COMMAND_COALESCE_SECONDS": "0",
+            "SEND_GLOBAL_RATE": "100000",
+            "SEND_CHAT_RATE": "100000",
+            "SEND_GROUP_RATE": "100000",
+        }
+    )
+    for key in [key for key in os.environ if key.startswith("OPENAI_ROUTE_") or key == "WEBHOOK_URL"]:
+        del os.environ[key]
+    os.environ.pop("TRAFFIC_CAPTURE_PATH", None)
+
+
+def start_bot(recorder, mark_done=False):
+    """Builds the bot with `bench_env` set and starts its dispatcher. With `mark_done`,
+    an update completes when every handler group is done with it. Returns the updater
+    and the `BenchRequest` answering its Bot API calls.
+    """
+    import logging
+
+    logging.disable(logging.WARNING)
+
+    from telegram import Bot
+    from telegram.ext import Filters, MessageHandler
+
+    import bot as bidu
+    from environment import Environment
+
+    request = BenchRequest(recorder)
+    updater = bidu.build(Environment(), bot=Bot(BOT_TOKEN, request=request))
+    dispatcher = updater.dispatcher
+
+    # runs after every other handler group, so it marks the end of synchronous handling
+    if mark_done:
+        def done(update, context):
+            recorder.complete(update.update_id)
+
+        dispatcher.add_handler(MessageHandler(Filters.all, done), group=99)
+
+    dispatcher_thread = threading.Thread(target=dispatcher.start, daemon=True)
+    dispatcher_thread.start()
+    while not dispatcher.running:
+        if not dispatcher_thread.is_alive():
+            raise RuntimeError("The dispatcher did not start")
+        time.sleep(0.01)
+
+    return updater, request
+
+
+def peak_rss_mb():
+    # linux reports kilobytes, macos bytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != "darwin" else 1024**2)
+
+
+def run_scenario(scenario, count, llm_latency, llm_jitter, rate, seed):
+    """Runs one scenario in this process, which must be fresh. Returns the results."""
+    server = FakeLLMServer(llm_latency, llm_jitter)
+    server.start()
+    bench_env(server.url, GROUPS)
+
+    from telegram import Update
+
+    from modules import PredictionModule
+
+    group = scenario == "group"
+    recorder = Recorder(expected=count)
+    updater, request = start_bot(recorder, mark_done=group)
+    dispatcher = updater.dispatcher
+
+    # the psalm page comes from the fake server too
+    PredictionModule()._fetchers["salmo"]._base_fetcher._url = f"{server.url}/salmo_do_dia/"
+
+    rng = random.Random(seed)
+    traffic = group_traffic(count, rng) if group else command_burst(scenario, count, rng)
+    interval = 1 / rate if rate else 0
+    start = time.perf_counter()
+    for update_id, (chat_id, user_id, text) in enumerate(traffic, 1):
+        update = Update.de_json(make_message(update_id, chat_id, user_id, text, group), dispatcher.bot)
+        recorder.enqueue(update_id, None if group else chat_id)
+        dispatcher.update_queue.put(update)
+        if interval:
+            time.sleep(max(0.0, start + update_id * interval - time.perf_counter()))
+
+    finished = recorder.finished.wait(timeout=max(60, count * (llm_latency + 0.1)))
+    elapsed = (max(recorder.done.values()) if recorder.done else time.perf_counter()) - start
+    dispatcher.stop()
+
+    latencies = recorder.latencies()
+    return {
+        "scenario": scenario,
+        "updates": count,
+        "completed": len(recorder.done),
+        "timed_out": not finished,
+        "errors": recorder.errors,
+        "seconds": elapsed,
+        "updates_per_second": len(recorder.done) / elapsed if elapsed > 0 else None,
+        "p50_ms": percentile(latencies, 50) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 95) * 1000 if latencies else None,
+        "llm_calls": server.calls,
+        "llm_tokens": server.prompt_tokens + server.completion_tokens,
+        "telegram_calls": request.calls,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def spawn(scenario, args, workdir):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = SRC_DIR
+    command = [
+        sys.executable,
+        "-m",
+        "tools.load_bench",
+        "--run",
+        scenario,
+        "--updates",
+        str(args.updates),
+        "--llm-latency",
+        str(args.llm_latency),
+        "--llm-jitter",
+        str(args.llm_jitter),
+        "--rate",
+        str(args.rate),
+        "--seed",
+        str(args.seed),
+    ]
+    result = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Scenario {scenario} failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def make_workdir():
+    # the bot reads and writes data/ relative to its working directory, keep the repo out of it
+    workdir = tempfile.mkdtemp(prefix="load_bench_")
+    os.makedirs(os.path.join(workdir, "data"))
+    for name in DATA_FILES:
+        source = os.path.join(ROOT_DIR, "data", name)
+        if os.path.exists(source):
+            os.symlink(source, os.path.join(workdir, "data", name))
+    return workdir
+
+
+def report(results):
+    def number(value, digits=1):
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    columns = ["updates", "upd/s", "p50 ms", "p95 ms", "llm", "tokens", "rss MB"]
+    print(f"{'scenario':<8} " + " ".join(f"{column:>8}" for column in columns))
+    for result in results:
+        print(
+            f"{result['scenario']:<8} {result['completed']:>8} {number(result['updates_per_second']):>8} "
+            f"{number(result['p50_ms']):>8} {number(result['p95_ms']):>8} {result['llm_calls']:>8} "
+            f"{result['llm_tokens']:>8} {number(result['peak_rss_mb']):>8}"
+        )
+        if result["timed_out"] or result["errors"]:
+            unfinished = result["updates"] - result["completed"]
+            print(f"  {result['scenario']}: {unfinished} unfinished, {result['errors']} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=" ".join(__doc__.split("\n\n")[0].split()))
+    parser.add_argument("--scenario", choices=["all"] + SCENARIOS, default="all")
+    parser.add_argument("--updates", type=int, default=200, help="updates per scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="mean seconds per model call")
+    parser.add_argument("--llm-jitter", type=float, default=0.05, help="standard deviation of the model latency")
+    parser.add_argument("--rate", type=float, default=0, help="updates per second, 0 sends them all at once")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--run", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        result = run_scenario(args.run, args.updates, args.llm_latency, args.llm_jitter, args.rate, args.seed)
+        print(json.dumps(result))
+        sys.stdout.flush()
+        # handler threads and the send queue don't need a clean shutdown
+        os._exit(0)
+
+    workdir = make_workdir()
+    try:
+        scenarios = SCENARIOS if args.scenario == "all" else [args.scenario]
+        results = [spawn(scenario, args, workdir) for scenario in scenarios]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compares sign and arcana parsing with the fuzzy index against the old
+`difflib.get_close_matches` calls, over `match_corpus.tsv`.
+
+Reports the accuracy and the time per lookup of each. Every input that the
+index gets wrong is listed.
+
+Usage: python -m src.tools.match_bench [--repeat 200]
+"""
+
+import argparse
+import difflib
+import os
+import time
+
+from commands.sign import Sign
+from modules import TarotCatalog
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "match_corpus.tsv")
+
+
+def load_corpus(path=CORPUS_PATH):
+    """(kind, input, expected) for each line, `kind` being "sign" or "arcana"."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [tuple(line.rstrip("\n").split("\t")) for line in f if line.strip() and not line.startswith("#")]
+
+
+def difflib_match(kind, text):
+    if kind == "sign":
+        match = difflib.get_close_matches(text, Sign.sign_map.keys(), n=1, cutoff=Sign.CUTOFF)
+        return match[0] if match else Sign.DEFAULT_SIGN
+    names = [card.name for card in TarotCatalog().cards]
+    match = difflib.get_close_matches(text, names, n=1, cutoff=TarotCatalog.CUTOFF)
+    return match[0] if match else None
+
+
+def index_match(kind, text):
+    if kind == "sign":
+        return Sign.sign_index.match(text) or Sign.DEFAULT_SIGN
+    card = TarotCatalog().match(text)
+    return card.name if card else None
+
+
+def measure(matcher, corpus, repeat):
+    results = [matcher(kind, text) for kind, text, _ in corpus]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for kind, text, _ in corpus:
+            matcher(kind, text)
+    elapsed = time.perf_counter() - start
+
+    correct = sum(result == expected for result, (_, _, expected) in zip(results, corpus))
+    return results, correct, elapsed / (repeat * len(corpus))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=" ".join(__doc__.split("\n\n")[0].split()))
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    print(f"{len(corpus)} inputs")
+    for name, matcher in [("difflib", difflib_match), ("index", index_match)]:
+        results, correct, per_lookup = measure(matcher, corpus, args.repeat)
+        print(f"{name:>8}: {correct}/{len(corpus)} correct, {per_lookup * 1e6:.1f}µs per lookup")
+
+    # `results` are the index's, the last one measured
+    for (kind, text, expected), result in zip(corpus, results):
+        if result != expected:
+            print(f"  {kind} {text!r}: got {result!r}, expected {expected!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import json
 
 from bs4 import BeautifulSoup
 
+from tools.tarot_catalog_gen import generate
+
 html = """
 <table class="table p1" align="center" style="text-align:center; margin:auto;">
 <tbody><tr>
@@ -638,3 +640,6 @@ arcanas["XXI"]["Universe"]["characters"].append(
 # save to json
 with open("data/arcanas.json", "wb") as f:
     f.write(json.dumps(arcanas, indent=4).encode("utf-8"))
+
+# compile the card catalog the bot reads
+generate()
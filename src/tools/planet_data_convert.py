@@ -0,0 +1,36 @@
+"""Converts the legacy `planet_data.json` (date -> planet -> sign) into the
+binary day table read by `AstroModule`.
+
+Usage: python -m src.tools.planet_data_convert [json_path] [bin_path]
+"""
+
+import json
+import sys
+from datetime import date, timedelta
+
+from modules import AstroModule, DayTable
+
+
+def convert(json_path, bin_path):
+    astro = AstroModule()
+    with open(json_path, "r", encoding="utf-8") as f:
+        positions = json.load(f)
+
+    days = sorted(date.fromisoformat(day) for day in positions)
+    start, end = days[0], days[-1]
+
+    records = []
+    current = start
+    while current <= end:
+        day_positions = positions.get(current.isoformat())
+        records.append(astro.encode_positions(day_positions) if day_positions else None)
+        current += timedelta(days=1)
+
+    DayTable.write(bin_path, start, records, len(astro.planets))
+    print(f"Wrote {len(records)} days ({start} to {end}) to {bin_path}")
+
+
+if __name__ == "__main__":
+    json_path = sys.argv[1] if len(sys.argv) > 1 else "data/planet_data.json"
+    bin_path = sys.argv[2] if len(sys.argv) > 2 else AstroModule.POSITIONS_PATH
+    convert(json_path, bin_path)
@@ -1,40 +1,94 @@
-import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import date, timedelta
+"""Generates the precomputed planet positions (`data/planet_data.bin`) and
+astro events (`data/astro_events.bin`) tables.
 
-from modules import AstroModule
+Missing days are split into shards of consecutive days, each computed with a
+single vectorized ephemeris pass in a worker process. Shards are written to
+the tables as they finish, so an interrupted run resumes where it stopped.
 
-astro = AstroModule()
-years = [2024, 2025, 2026, 2027, 2028]
+Usage: python -m src.tools.planet_data_gen [--start 2024-01-01] [--end 2028-12-31] [--workers N]
+"""
 
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
 
-def process_date(d):
-    print(f"Processing {d}...")
-    date_iso = f"{d}T00:00:00"
-    return (d, astro.get_astro_for_signs(date_iso))
+from modules import AstroModule, DayTable
 
+SHARD_DAYS = 366
+
+
+def compute_shard(days):
+    astro = AstroModule()
+    times = astro.make_times([datetime(day.year, day.month, day.day) for day in days])
+    longitudes = astro.get_longitudes(times)
+    next_longitudes = astro.get_longitudes(astro.ts.tt_jd(times.tt + 1))
+
+    signs = astro.longitudes_to_signs(longitudes)
+    events = astro.compute_events(longitudes, next_longitudes)
+    return days[0], [bytes(row) for row in signs], [bytes(row) for row in events]
+
+
+def make_shards(days, shard_days=SHARD_DAYS):
+    """Splits sorted days into runs of consecutive days, at most `shard_days` long."""
+    shards = []
+    for day in days:
+        if shards and len(shards[-1]) < shard_days and shards[-1][-1] + timedelta(days=1) == day:
+            shards[-1].append(day)
+        else:
+            shards.append([day])
+    return shards
 
-def main():
-    results = {}
 
-    with ThreadPoolExecutor() as executor:
-        futures = []
-        for year in years:
-            start_date = date(year, 1, 1)
-            end_date = date(year, 12, 31)
+def write_missing(path, days, records, missing):
+    """Writes only the records of `days` that `missing` lists, keeping the rest of the table."""
+    offsets = {day: offset for offset, day in enumerate(days)}
+    for run in make_shards([day for day in days if day in missing], len(days)):
+        first = offsets[run[0]]
+        DayTable.write_records(path, run[0], records[first : first + len(run)])
 
-            current_date = start_date
-            while current_date <= end_date:
-                d = current_date.strftime("%Y-%m-%d")
-                futures.append(executor.submit(process_date, d))
-                current_date += timedelta(days=1)
 
+def generate(positions_path, events_path, start, end, workers=None, shard_days=SHARD_DAYS):
+    astro = AstroModule()
+    # each table may lack different days, shards cover both but only fill what is missing
+    missing_by_path = {}
+    for path, record_size in [(positions_path, len(astro.planets)), (events_path, astro.events_record_size)]:
+        DayTable.ensure_range(path, start, end, record_size)
+        table = DayTable(path)
+        missing_by_path[path] = set(table.missing_days(start, end))
+        table.close()
+
+    missing = missing_by_path[positions_path] | missing_by_path[events_path]
+    if not missing:
+        print(f"Tables already cover {start} to {end}.")
+        return
+
+    # load (and download, if needed) the ephemeris once before the workers race for it
+    astro.planets_ephem
+
+    shards = make_shards(sorted(missing), shard_days)
+    print(f"Computing {len(missing)} days in {len(shards)} shards...")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(compute_shard, shard) for shard in shards]
         for future in as_completed(futures):
-            d, astro_data = future.result()
-            results[d] = astro_data
+            first_day, positions, events = future.result()
+            days = [first_day + timedelta(days=offset) for offset in range(len(positions))]
+            write_missing(positions_path, days, positions, missing_by_path[positions_path])
+            write_missing(events_path, days, events, missing_by_path[events_path])
+            print(f"Wrote {first_day} to {first_day + timedelta(days=len(positions) - 1)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=" ".join(__doc__.split("\n\n")[0].split()))
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2024, 1, 1))
+    parser.add_argument("--end", type=date.fromisoformat, default=date(2028, 12, 31))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--shard-days", type=int, default=SHARD_DAYS)
+    parser.add_argument("--positions-output", default=AstroModule.POSITIONS_PATH)
+    parser.add_argument("--events-output", default=AstroModule.EVENTS_PATH)
+    args = parser.parse_args()
 
-    with open("data/planet_data.json", "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=4)
+    generate(args.positions_output, args.events_output, args.start, args.end, args.workers, args.shard_days)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+"""Measures how long the bot takes to import and register its handlers.
+
+Runs `bot.build` in a fresh interpreter with `-X importtime` (the Telegram
+token is fake and polling is never started) and reports the wall time and the
+imports with the highest cumulative cost. `--eager` also preloads every
+command, to compare against the old startup.
+
+Usage: python -m src.tools.startup_bench [--eager] [--runs 3] [--top 15]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+
+SCRIPT = """
+import bot
+from environment import Environment
+bot.build(Environment())
+"""
+
+
+def run_once(eager):
+    env = dict(os.environ)
+    env["TELEGRAM_TOKEN"] = "123456:fake-token-for-startup-bench"
+    env["OPENAI_API_KEY"] = env.get("OPENAI_API_KEY", "fake-key")
+    env["PRELOAD_COMMANDS"] = "true" if eager else "false"
+    env["PYTHONPATH"] = SRC_DIR
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup failed:\n{result.stderr[-2000:]}")
+
+    return elapsed, parse_importtime(result.stderr)
+
+
+def parse_importtime(output):
+    """(cumulative microseconds, module) for each line of `-X importtime` output."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        imports.append((int(cumulative), name.strip()))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=" ".join(__doc__.split("\n\n")[0].split()))
+    parser.add_argument("--eager", action="store_true", help="preload every command at startup")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    times = []
+    for _ in range(args.runs):
+        elapsed, imports = run_once(args.eager)
+        times.append(elapsed)
+
+    mode = "eager" if args.eager else "lazy"
+    print(f"Startup ({mode}): best {min(times) * 1000:.0f} ms, worst {max(times) * 1000:.0f} ms over {args.runs} runs")
+
+    print("\nSlowest imports (cumulative, last run):")
+    for cumulative, name in sorted(imports, reverse=True)[: args.top]:
+        print(f"{cumulative / 1000:>9.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Compiles the tarot card catalog (`data/tarot_catalog.json`) from the card
+metadata below and the persona data scraped by `tools/persona_scrape.py`
+(`data/arcanas.json`).
+
+The bot only reads the compiled catalog, see `modules/tarot_catalog.py`.
+
+Usage: python -m src.tools.tarot_catalog_gen [--personas data/arcanas.json] [--output data/tarot_catalog.json]
+"""
+
+import argparse
+import json
+
+PERSONAS_PATH = "data/arcanas.json"
+CATALOG_PATH = "data/tarot_catalog.json"
+
+# (numeral, name in the Persona wiki, portuguese names, image, description), in deck order.
+# the first portuguese name is the one predictions are made and cached for
+CARDS = [
+    (
+        "0",
+        "Fool",
+        ("o louco",),
+        "https://static.wikia.nocookie.net/megamitensei/images/5/53/Fool-0.png/revision/latest/scale-to-width-down/130?cb=20160404201043",  # noqa
+        "O Louco representa novos começos, espontaneidade e inocência. Eles são frequentemente vistos como despreocupados e aventureiros, mas também podem ser ingênuos e propensos a cometer erros.",  # noqa
+    ),
+    (
+        "I",
+        "Magician",
+        ("o mago",),
+        "https://static.wikia.nocookie.net/megamitensei/images/c/cb/Magician-0.png/revision/latest/scale-to-width-down/130?cb=20160404201629",  # noqa
+        "O Mago é um mestre em sua arte, usando suas habilidades e conhecimento para manifestar seus desejos. Eles são versáteis e engenhosos, mas também podem ser manipuladores e enganosos.",  # noqa
+    ),
+    (
+        "II",
+        "Priestess",
+        ("a papisa",),
+        "https://static.wikia.nocookie.net/megamitensei/images/a/ad/Priestess-0.png/revision/latest/scale-to-width-down/130?cb=20160404201724",  # noqa
+        "A Sacerdotisa é uma guardiã de segredos e mistérios, representando intuição e conhecimento oculto. Elas são frequentemente vistas como sábias e intuitivas, mas também podem ser secretas e distantes.",  # noqa
+    ),
+    (
+        "III",
+        "Empress",
+        ("a imperatriz",),
+        "https://static.wikia.nocookie.net/megamitensei/images/6/63/Empress-0.png/revision/latest/scale-to-width-down/130?cb=20160404201807",  # noqa
+        "A Imperatriz personifica a nutrição e a abundância, representando fertilidade e criação. Ela é frequentemente vista como carinhosa e solidária, mas também pode ser possessiva e controladora.",  # noqa
+    ),
+    (
+        "IV",
+        "Emperor",
+        ("o imperador",),
+        "https://static.wikia.nocookie.net/megamitensei/images/e/e6/Emperor-0.png/revision/latest/scale-to-width-down/130?cb=20160404201848",  # noqa
+        "O Imperador representa autoridade e estrutura, personificando liderança e estabilidade. Ele é frequentemente visto como disciplinado e responsável, mas também pode ser rígido e dominador.",  # noqa
+    ),
+    (
+        "V",
+        "Hierophant",
+        ("o papa",),
+        "https://static.wikia.nocookie.net/megamitensei/images/f/f6/Hierophant-0.png/revision/latest/scale-to-width-down/130?cb=20160404201947",  # noqa
+        "O Papa representa a tradição e a conformidade, personificando religião e espiritualidade. Ele é frequentemente visto como sábio e conhecedor, mas também pode ser dogmático e inflexível.",  # noqa
+    ),
+    (
+        "VI",
+        "Lovers",
+        ("os enamorados",),
+        "https://static.wikia.nocookie.net/megamitensei/images/a/a5/Lovers-0.png/revision/latest/scale-to-width-down/130?cb=20160404202019",  # noqa
+        "Os Enamorados representam escolha e parceria, personificando amor e paixão. Eles são frequentemente vistos como apaixonados e românticos, mas também podem ser indecisos e propensos a conflitos.",  # noqa
+    ),
+    (
+        "VII",
+        "Chariot",
+        ("o carro",),
+        "https://static.wikia.nocookie.net/megamitensei/images/1/15/Chariot-0.png/revision/latest/scale-to-width-down/130?cb=20160404202048",  # noqa
+        "O Carro representa força de vontade e determinação, personificando vitória e sucesso. Ele é frequentemente visto como motivado e ambicioso, mas também pode ser competitivo e agressivo.",  # noqa
+    ),
+    (
+        "VIII",
+        "Justice",
+        ("a justiça",),
+        "https://static.wikia.nocookie.net/megamitensei/images/8/83/Justice-0.png/revision/latest/scale-to-width-down/130?cb=20160404202153",  # noqa
+        "A Justiça representa equilíbrio e justiça, personificando lei e ordem. Ela é frequentemente vista como objetiva e imparcial, mas também pode ser julgadora e inflexível.",  # noqa
+    ),
+    (
+        "IX",
+        "Hermit",
+        ("o eremita", "o hermita"),
+        "https://static.wikia.nocookie.net/megamitensei/images/a/ab/Hermit-0.png/revision/latest/scale-to-width-down/130?cb=20160404202218",  # noqa
+        "O Eremita representa introspecção e solidão, personificando sabedoria e autodescoberta. Ele é frequentemente visto como perspicaz e reflexivo, mas também pode ser recluso e isolado.",  # noqa
+    ),
+    (
+        "X",
+        "Fortune",
+        ("a roda da fortuna",),
+        "https://static.wikia.nocookie.net/megamitensei/images/f/f3/Fortune-0.png/revision/latest/scale-to-width-down/130?cb=20160404202245",  # noqa
+        "A Fortuna representa sorte e destino, personificando mudança e incerteza. Ela é frequentemente vista como aventureira e imprevisível, mas também pode ser impulsiva e imprudente.",  # noqa
+    ),
+    (
+        "XI",
+        "Strength",
+        ("a força",),
+        "https://static.wikia.nocookie.net/megamitensei/images/b/b0/Strength-0.png/revision/latest/scale-to-width-down/130?cb=20160404202121",  # noqa
+        "A Força representa coragem e resiliência, personificando força interior e determinação. Ela é frequentemente vista como poderosa e destemida, mas também pode ser teimosa e dominadora.",  # noqa
+    ),
+    (
+        "XII",
+        "Hanged Man",
+        ("o enforcado",),
+        "https://static.wikia.nocookie.net/megamitensei/images/2/2f/Hanged_Man.png/revision/latest/scale-to-width-down/130?cb=20160404202318",  # noqa
+        "O Enforcado representa sacrifício e entrega, personificando altruísmo e iluminação. Ele é frequentemente visto como não convencional e espiritual, mas também pode ser passivo e indeciso.",  # noqa
+    ),
+    (
+        "XIII",
+        "Death",
+        ("a morte",),
+        "https://static.wikia.nocookie.net/megamitensei/images/d/df/Death-0.png/revision/latest/scale-to-width-down/130?cb=20160404202413",  # noqa
+        "A Morte representa transformação e renovação, personificando o fim e novos começos. Ela é frequentemente vista como transformadora e libertadora, mas também pode ser assustadora e intimidante.",  # noqa
+    ),
+    (
+        "XIV",
+        "Temperance",
+        ("a temperança",),
+        "https://static.wikia.nocookie.net/megamitensei/images/2/2d/Temperance-0.png/revision/latest/scale-to-width-down/130?cb=20160404202449",  # noqa
+        "A Temperança representa equilíbrio e harmonia, personificando moderação e autocontrole. Ela é frequentemente vista como paciente e harmoniosa, mas também pode ser indecisa e passiva.",  # noqa
+    ),
+    (
+        "XV",
+        "Devil",
+        ("o diabo",),
+        "https://static.wikia.nocookie.net/megamitensei/images/4/4b/Devil-0.png/revision/latest/scale-to-width-down/130?cb=20160404202521",  # noqa
+        "O Diabo representa tentação e materialismo, personificando prazeres e desejos mundanos. Ele é frequentemente visto como sedutor e atraente, mas também pode ser manipulador e egoísta.",  # noqa
+    ),
+    (
+        "XVI",
+        "Tower",
+        ("a torre",),
+        "https://static.wikia.nocookie.net/megamitensei/images/1/1f/Tower-0.png/revision/latest/scale-to-width-down/130?cb=20160404202557",  # noqa
+        "A Torre representa o caos e a agitação, personificando destruição e mudança. Ela é frequentemente vista como catastrófica e destrutiva, mas também pode ser transformadora e libertadora.",  # noqa
+    ),
+    (
+        "XVII",
+        "Star",
+        ("a estrela",),
+        "https://static.wikia.nocookie.net/megamitensei/images/1/15/Star-0.png/revision/latest/scale-to-width-down/130?cb=20160404202628",  # noqa
+        "A Estrela representa esperança e inspiração, personificando positividade e otimismo. Ela é frequentemente vista como radiante e inspiradora, trazendo calor e luz para aqueles ao seu redor.",  # noqa
+    ),
+    (
+        "XVIII",
+        "Moon",
+        ("a lua",),
+        "https://static.wikia.nocookie.net/megamitensei/images/c/ce/Moon-0.png/revision/latest/scale-to-width-down/130?cb=20160404202708",  # noqa
+        "A Lua representa intuição e ilusão, personificando mistério e subconsciência. Ela é frequentemente vista como elusiva e enigmática, mas também pode ser confusa e perturbadora.",  # noqa
+    ),
+    (
+        "XIX",
+        "Sun",
+        ("o sol",),
+        "https://static.wikia.nocookie.net/megamitensei/images/f/ff/Sun-0.png/revision/latest/scale-to-width-down/130?cb=20160404202738",  # noqa
+        "O Sol representa vitalidade e iluminação, personificando alegria e sucesso. Ele é frequentemente visto como positivo e radiante, trazendo calor e luz para aqueles ao seu redor.",  # noqa
+    ),
+    (
+        "XX",
+        "Judgement",
+        ("o julgamento",),
+        "https://static.wikia.nocookie.net/megamitensei/images/b/b0/Judgement.png/revision/latest/scale-to-width-down/130?cb=20160404202809",  # noqa
+        "O Julgamento representa renascimento e renovação, personificando julgamento e despertar. Ele é frequentemente visto como um chamado à ação ou um toque de despertar, fazendo com que alguém assuma a responsabilidade por suas ações e siga em frente com clareza e propósito.",  # noqa
+    ),
+    (
+        "XXI",
+        "World",
+        ("o mundo", "o aeon"),
+        "https://static.wikia.nocookie.net/megamitensei/images/a/a9/World-0.png/revision/latest/scale-to-width-down/130?cb=20160404202908",  # noqa
+        "O Mundo representa realização e cumprimento, personificando realização e conquista. Ele é frequentemente visto como um símbolo de sucesso e realização, representando uma sensação de completude e unidade com o universo.",  # noqa
+    ),
+]
+
+
+def compile_catalog(personas):
+    """Catalog data for `CARDS`, with the personas of each numeral from `personas`."""
+    cards = []
+    for number, (numeral, name, portuguese, image, description) in enumerate(CARDS):
+        # the other portuguese names, and all of them without the article
+        aliases = list(portuguese[1:]) + [alias.split(" ", 1)[1] for alias in portuguese]
+        cards.append(
+            {
+                "number": number,
+                "numeral": numeral,
+                "name": name,
+                "portuguese": portuguese[0],
+                "aliases": aliases,
+                "image": image,
+                "description": description,
+                "personas": list(personas.get(numeral, {}).values()),
+            }
+        )
+    return {"cards": cards}
+
+
+def generate(personas_path=PERSONAS_PATH, output_path=CATALOG_PATH):
+    with open(personas_path, "r") as f:
+        personas = json.load(f)
+
+    catalog = compile_catalog(personas)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, indent=4, ensure_ascii=False)
+        f.write("\n")
+    print(f"Wrote {len(catalog['cards'])} cards to {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=" ".join(__doc__.split("\n\n")[0].split()))
+    parser.add_argument("--personas", default=PERSONAS_PATH)
+    parser.add_argument("--output", default=CATALOG_PATH)
+    args = parser.parse_args()
+
+    generate(args.personas, args.output)
+
+
+if __name__ == "__main__":
+    main()
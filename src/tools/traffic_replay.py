@@ -0,0 +1,374 @@
+"""Replays captured group traffic through the real group handlers and reports what it costs.
+
+A capture is the gzip JSON lines file the bot writes to `TRAFFIC_CAPTURE_PATH`,
+with chats, users and words already anonymized (see `modules/traffic_capture.py`);
+`--synthesize N` writes one from the load benchmark's group chatter instead.
+Each speed runs in a fresh interpreter, set up like `tools/load_bench.py`: the
+updates go through the dispatcher built by `bot.build`, Telegram calls never
+leave the process and model calls go to a local fake server. Messages are sent
+at their captured pace divided by `--speed`; captured chats become monitored
+groups. Cooldowns still count real seconds, so fast replays trigger fewer
+summaries than the capture did.
+
+Reported per speed:
+  cpu/msg    CPU time of GroupSummary and TypoDetector per message (their threads only),
+             and of the whole process (dispatcher, parsing, send queue, fake server, sampling)
+  buffers    bytes of the per-group message buffers, peak and per chat
+  llm        model calls, by typo classifications and summaries
+  queue      updates waiting for the dispatcher, sampled every 50ms
+and the CPU of `_store_message` and `_detect_repetition_pattern` per call, by how
+full the group's buffer was.
+
+Usage: python -m src.tools.traffic_replay CAPTURE [--speed 1,10,100] [--limit 2000] [--llm-latency 0.2]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+from tools.load_bench import (
+    SRC_DIR,
+    FakeLLMServer,
+    Recorder,
+    bench_env,
+    group_traffic,
+    make_message,
+    make_workdir,
+    peak_rss_mb,
+    percentile,
+    start_bot,
+)
+
+# captured chats are replayed as these groups, in order of appearance
+GROUP_BASE = -1002000000000
+SAMPLE_SECONDS = 0.05
+# buffer fill buckets, as fractions of the handler's buffer size
+FILL_BUCKETS = [(0.25, "<25%"), (0.5, "<50%"), (1.0, "<100%"), (None, "full")]
+
+
+def load_traffic(path, limit=None):
+    from modules.traffic_capture import read_traffic
+
+    records = []
+    for record in read_traffic(path):
+        records.append(record)
+        if limit and len(records) >= limit:
+            break
+    records.sort(key=lambda record: record["t"])
+    return records
+
+
+def synthesize(path, count, rate, seed):
+    """Writes `count` messages of load benchmark chatter, `rate` per second on average, as a capture,
+    replacing the file if there is one.
+    """
+    from modules.traffic_capture import TrafficCapture
+
+    # captures are appended to, start from an empty file
+    open(path, "wb").close()
+    rng = random.Random(seed)
+    capture = TrafficCapture(path)
+    now = time.time()
+    for chat_id, user_id, text in group_traffic(count, rng):
+        now += rng.expovariate(rate)
+        capture.add(now, chat_id, user_id, text)
+    capture.flush()
+
+
+class ReplayLLMServer(FakeLLMServer):
+    """The benchmark's fake server, counting calls by what they were for."""
+
+    def __init__(self, latency, jitter):
+        super().__init__(latency, jitter)
+        self.kinds = {"typo": 0, "summary": 0, "other": 0}
+
+    def answer(self, messages):
+        prompt = messages[-1]["content"]
+        kind = "typo" if "YES or NO" in prompt else "summary" if prompt.startswith("Resuma") else "other"
+        with self._lock:
+            self.kinds[kind] += 1
+        return super().answer(messages)
+
+
+class Profile:
+    """Thread CPU and wall time of instrumented methods, and how full the buffer was on each call."""
+
+    def __init__(self):
+        self.calls = {}  # label -> [(cpu seconds, wall seconds, fill)]
+        self._lock = threading.Lock()
+
+    def wrap(self, obj, name, label, fill=lambda *args: None):
+        method = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            level = fill(*args)
+            cpu, wall = time.thread_time(), time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                sample = (time.thread_time() - cpu, time.perf_counter() - wall, level)
+                with self._lock:
+                    self.calls.setdefault(label, []).append(sample)
+
+        setattr(obj, name, timed)
+
+    def cpu(self, label):
+        return sum(cpu for cpu, _, _ in self.calls.get(label, []))
+
+    def summary(self, label):
+        samples = self.calls.get(label, [])
+        cpus = [cpu * 1e6 for cpu, _, _ in samples]
+        walls = [wall * 1e3 for _, wall, _ in samples]
+        by_fill = {}
+        for cpu, _, level in samples:
+            if level is not None:
+                bucket = next(name for limit, name in FILL_BUCKETS if limit is None or level < limit)
+                by_fill.setdefault(bucket, []).append(cpu * 1e6)
+        return {
+            "calls": len(samples),
+            "cpu_us_mean": sum(cpus) / len(cpus) if cpus else None,
+            "cpu_us_p95": percentile(cpus, 95),
+            "wall_ms_p95": percentile(walls, 95),
+            "cpu_us_by_fill": {name: sum(values) / len(values) for name, values in by_fill.items()},
+        }
+
+
+class Sampler:
+    """Samples the dispatcher's queue depth and the size of the group buffers in the background."""
+
+    def __init__(self, dispatcher, buffers, chats):
+        self.dispatcher = dispatcher
+        self.buffers = buffers
+        self.chats = chats
+        self.depths = []
+        self.peak_buffer_bytes = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def buffer_bytes(self):
+        # the size of their json encoding, which is how the backends store them too
+        return sum(len(json.dumps(buffer.get(chat))) for buffer in self.buffers for chat in self.chats)
+
+    def _run(self):
+        samples = 0
+        while not self._stopped.wait(SAMPLE_SECONDS):
+            self.depths.append(self.dispatcher.update_queue.qsize())
+            samples += 1
+            # reading every buffer is not free, do it every tenth sample
+            if samples % 10 == 0:
+                self.peak_buffer_bytes = max(self.peak_buffer_bytes, self.buffer_bytes())
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self.peak_buffer_bytes = max(self.peak_buffer_bytes, self.buffer_bytes())
+
+
+def make_update(update_id, chat_id, record):
+    update = make_message(update_id, chat_id, record["u"], record["x"], True)
+    if record.get("p"):
+        message = update["message"]
+        message["caption"] = message.pop("text")
+        message.pop("entities", None)
+        message["photo"] = [{"file_id": "photo", "file_unique_id": "photo", "width": 1, "height": 1}]
+    return update
+
+
+def run_replay(path, speed, limit, llm_latency, llm_jitter):
+    """Replays the capture at `speed` in this process, which must be fresh. Returns the results."""
+    records = load_traffic(path, limit)
+    chats = {}
+    for record in records:
+        chats.setdefault(record["c"], GROUP_BASE - len(chats))
+
+    server = ReplayLLMServer(llm_latency, llm_jitter)
+    server.start()
+    bench_env(server.url, list(chats.values()))
+
+    from telegram import Update
+
+    from commands import GroupSummary, TypoDetector
+
+    recorder = Recorder(expected=len(records))
+    updater, request = start_bot(recorder, mark_done=True)
+    dispatcher = updater.dispatcher
+
+    # both are singletons, these are the instances the dispatcher calls
+    profile = Profile()
+    stored = {}  # (handler, chat id) -> messages stored, so how full its buffer is
+
+    def buffer_fill(label, size):
+        return lambda message: min(stored.get((label, message.chat_id), 0), size) / size
+
+    for handler in (GroupSummary(), TypoDetector()):
+        label = type(handler).__name__
+
+        def store(message, label=label, store_message=handler._store_message):
+            store_message(message)
+            stored[(label, message.chat_id)] = stored.get((label, message.chat_id), 0) + 1
+
+        handler._store_message = store
+        fill = buffer_fill(label, handler._buffer_size)
+        profile.wrap(handler, "_store_message", f"{label}._store_message", fill)
+        if label == "TypoDetector":
+            profile.wrap(handler, "_detect_repetition_pattern", f"{label}._detect_repetition_pattern", fill)
+        profile.wrap(handler, "_process", label)
+
+    sampler = Sampler(dispatcher, [GroupSummary()._buffers, TypoDetector()._buffers], list(chats.values()))
+    sampler.start()
+
+    first = records[0]["t"] if records else 0
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for update_id, record in enumerate(records, 1):
+        if speed:
+            time.sleep(max(0.0, start + (record["t"] - first) / speed - time.perf_counter()))
+        update = Update.de_json(make_update(update_id, chats[record["c"]], record), dispatcher.bot)
+        recorder.enqueue(update_id)
+        dispatcher.update_queue.put(update)
+
+    capture_seconds = (records[-1]["t"] - first) if records else 0
+    finished = recorder.finished.wait(timeout=max(60, len(records) * (llm_latency + 0.1))) if records else True
+    elapsed = (max(recorder.done.values()) if recorder.done else time.perf_counter()) - start
+    process_cpu = time.process_time() - cpu_start
+    sampler.stop()
+    dispatcher.stop()
+
+    messages = len(recorder.done)
+    handler_cpu = profile.cpu("GroupSummary") + profile.cpu("TypoDetector")
+    latencies = recorder.latencies()
+    return {
+        "speed": speed,
+        "messages": len(records),
+        "completed": messages,
+        "timed_out": not finished,
+        "chats": len(chats),
+        "capture_seconds": capture_seconds,
+        "seconds": elapsed,
+        "messages_per_second": messages / elapsed if elapsed > 0 else None,
+        "handler_cpu_us_per_message": handler_cpu / messages * 1e6 if messages else None,
+        "process_cpu_us_per_message": process_cpu / messages * 1e6 if messages else None,
+        "p95_ms": percentile(latencies, 95) * 1000 if latencies else None,
+        "queue_depth_max": max(sampler.depths, default=0),
+        "queue_depth_mean": sum(sampler.depths) / len(sampler.depths) if sampler.depths else 0,
+        "queue_depth_p95": percentile(sampler.depths, 95) or 0,
+        "buffer_bytes_peak": sampler.peak_buffer_bytes,
+        "buffer_bytes_per_chat": sampler.peak_buffer_bytes / len(chats) if chats else 0,
+        "llm_calls": server.calls,
+        "llm_calls_by_kind": dict(server.kinds),
+        "telegram_calls": request.calls,
+        "peak_rss_mb": peak_rss_mb(),
+        "methods": {label: profile.summary(label) for label in sorted(profile.calls)},
+    }
+
+
+def spawn(path, speed, args, workdir):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = SRC_DIR
+    command = [
+        sys.executable,
+        "-m",
+        "tools.traffic_replay",
+        path,
+        "--run",
+        str(speed),
+        "--limit",
+        str(args.limit),
+        "--llm-latency",
+        str(args.llm_latency),
+        "--llm-jitter",
+        str(args.llm_jitter),
+    ]
+    result = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Replay at {speed}x failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def report(results):
+    def number(value, digits=1):
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    columns = ["msgs", "msg/s", "cpu us", "proc us", "p95 ms", "q max", "q mean", "buf KB", "llm", "rss MB"]
+    print(f"{'speed':<7} " + " ".join(f"{column:>8}" for column in columns))
+    for result in results:
+        cells = [
+            result["completed"],
+            number(result["messages_per_second"]),
+            number(result["handler_cpu_us_per_message"], 0),
+            number(result["process_cpu_us_per_message"], 0),
+            number(result["p95_ms"]),
+            result["queue_depth_max"],
+            number(result["queue_depth_mean"]),
+            number(result["buffer_bytes_peak"] / 1024),
+            result["llm_calls"],
+            number(result["peak_rss_mb"]),
+        ]
+        print(f"{str(result['speed']) + 'x':<7} " + " ".join(f"{cell:>8}" for cell in cells))
+        kinds = ", ".join(f"{count} {kind}" for kind, count in result["llm_calls_by_kind"].items() if count)
+        print(
+            f"  {result['chats']} chats, {number(result['buffer_bytes_per_chat'] / 1024)} KB of buffers per chat, "
+            f"model calls: {kinds or 'none'}"
+        )
+        for label, method in result["methods"].items():
+            by_fill = method["cpu_us_by_fill"]
+            fills = " ".join(f"{name} {by_fill[name]:.0f}" for _, name in FILL_BUCKETS if name in by_fill)
+            print(
+                f"  {label:<40} {method['calls']:>6} calls, cpu us mean {number(method['cpu_us_mean'], 0)} "
+                f"p95 {number(method['cpu_us_p95'], 0)}" + (f", by buffer fill: {fills}" if fills else "")
+            )
+        if result["timed_out"]:
+            print(f"  {result['messages'] - result['completed']} messages unfinished")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=" ".join(__doc__.split("\n\n")[0].split()))
+    parser.add_argument("capture", help="capture file written by TRAFFIC_CAPTURE_PATH")
+    parser.add_argument("--speed", default="1,10,100", help="comma separated speed ups, 0 sends everything at once")
+    parser.add_argument("--limit", type=int, default=2000, help="replay the first messages only, 0 for all")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="mean seconds per model call")
+    parser.add_argument("--llm-jitter", type=float, default=0.05, help="standard deviation of the model latency")
+    parser.add_argument(
+        "--synthesize", type=int, metavar="N", help="first write N messages of made-up chatter to CAPTURE, replacing it"
+    )
+    parser.add_argument("--rate", type=float, default=2.0, help="messages per second of the synthetic chatter")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--run", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    path = os.path.abspath(args.capture)
+
+    if args.run is not None:
+        speed = int(args.run) if args.run.is_integer() else args.run
+        result = run_replay(path, speed, args.limit, args.llm_latency, args.llm_jitter)
+        print(json.dumps(result))
+        sys.stdout.flush()
+        # handler threads and the send queue don't need a clean shutdown
+        os._exit(0)
+
+    if args.synthesize:
+        synthesize(path, args.synthesize, args.rate, args.seed)
+
+    workdir = make_workdir()
+    try:
+        results = [spawn(path, speed.strip(), args, workdir) for speed in args.speed.split(",")]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,25 @@
-import difflib
+import importlib
+import sys
 from datetime import datetime
 
 
+def lazy_exports(package, exports):
+    """
+    Build a module `__getattr__` that imports each exported name from its submodule
+    on first access, so importing a package does not pull in every dependency.
+    """
+
+    def __getattr__(name):
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+        value = getattr(importlib.import_module(f"{package}.{exports[name]}"), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    return __getattr__
+
+
 def create_message_data(message):
     """
     Create standardized message data structure for handlers that need to store messages.
@@ -20,7 +38,7 @@ def create_message_data(message):
             "user": user_name,
             "user_id": message.from_user.id,
             "text": message.text,
-            "timestamp": message.date,
+            "timestamp": message.date.isoformat() if message.date else None,
             "message_id": message.message_id,
             "chat_id": message.chat_id,
         }
@@ -60,25 +78,6 @@ def prepare_message(message):
 
 
 def parse_sign(sign):
-    sign_map = {
-        "aries": "Áries",
-        "touro": "Touro",
-        "gemeos": "Gêmeos",
-        "cancer": "Câncer",
-        "leao": "Leão",
-        "virgem": "Virgem",
-        "libra": "Libra",
-        "escorpiao": "Escorpião",
-        "sagitario": "Sagitário",
-        "capricornio": "Capricórnio",
-        "aquario": "Aquário",
-        "peixes": "Peixes",
-    }
-    cutoff = 0.2
-    default_sign = "aries"
-
-    match = difflib.get_close_matches(sign, sign_map.keys(), n=1, cutoff=cutoff)
-    if len(match) == 0:
-        return default_sign
-
-    return match[0]
+    from commands.sign import Sign
+
+    return Sign.sign_index.match(sign) or Sign.DEFAULT_SIGN